@@ -1,58 +1,158 @@
+import os
+import argparse
 import pandas as pd
 import json
 from datetime import datetime
 from meteostat import Hourly, Daily
 
+from src.utils.cache import evict_cache
+from API.storage import write_partitioned_parquet
+from API.windows import split_date_range, run_concurrently, stitch, WindowCheckpoint
+
+# Ordem dos DataFrames retornados por estação: (daily, hourly)
+KINDS = ('daily', 'hourly')
+
+
 class MeteostatAPI:
-    def __init__(self, start_date, end_date):
+    def __init__(self, start_date, end_date, max_workers=4, window_years=5,
+                 checkpoint_dir='./data/cache/checkpoints/meteostat', cache_dir='./data/cache/meteostat',
+                 max_age=24 * 60 * 60, max_cache_bytes=2 * 1024 ** 3, mirror_dir=None):
+        """
+        Args:
+            start_date (str): First date, 'YYYY-MM-DD'.
+            end_date (str): Last date, 'YYYY-MM-DD'.
+            max_workers (int): Stations fetched at the same time (daily and hourly are separate fetches).
+            window_years (int): Years of each fetch; the date range is split into windows of this size.
+            checkpoint_dir (str): Directory where each fetched window is saved, so an interrupted
+                download resumes from the windows already done.
+            cache_dir (str): Persistent cache of the Meteostat bulk files, so repeated runs read them from disk.
+            max_age (int): Time to live of the cached bulk files, in seconds.
+            max_cache_bytes (int): Size limit of the cache; the least recently written files are removed
+                after each run. None disables the limit.
+            mirror_dir (str): Local copy of the bulk files (same layout as the bulk endpoint), used instead
+                of the network, e.g. in tests. None downloads from Meteostat.
+        """
         # Converting the string dates to datetime objects
         self.start_date = datetime.strptime(start_date, "%Y-%m-%d")
         self.end_date = datetime.strptime(end_date, "%Y-%m-%d")
         self.path_to_save = './data/raw/base_3/'
+        self.max_workers = max_workers
+        self.window_years = window_years
+        self.checkpoint = WindowCheckpoint(checkpoint_dir)
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+        self.max_cache_bytes = max_cache_bytes
 
-    def process_hourly_data(self, station):
+        # Subclasses com a configuração desta instância, sem alterar os atributos globais de Hourly/Daily
+        settings = {'cache_dir': os.path.abspath(cache_dir), 'max_age': max_age}
+        if mirror_dir is not None:
+            settings['endpoint'] = os.path.join(os.path.abspath(mirror_dir), '')
+        self.sources = {'daily': type('Daily', (Daily,), settings), 'hourly': type('Hourly', (Hourly,), settings)}
+
+    def process_hourly_data(self, station, start=None, end=None):
         # Fetching hourly data for the station
-        data = Hourly(station, self.start_date, self.end_date)
+        data = self.sources['hourly'](station, start or self.start_date, end or self.end_date)
         data = data.fetch()
         return data
 
-    def process_daily_data(self, station):
+    def process_daily_data(self, station, start=None, end=None):
         # Fetching daily data for the station
-        data = Daily(station, self.start_date, self.end_date)
+        data = self.sources['daily'](station, start or self.start_date, end or self.end_date)
         data = data.fetch()
         return data
 
     def fetch_weather_data(self, city, station):
-        print(f'===================={city}====================')
-        
-        # Process and display hourly data
-        hourly_df = pd.DataFrame(self.process_hourly_data(station))
-        print("Hourly Data:")
-        print(hourly_df.head(5))
-
-        # Process and display daily data
-        daily_df = pd.DataFrame(self.process_daily_data(station))
-        print("Daily Data:")
-        print(daily_df.head(5))
-        
+        data, errors = self.fetch_stations({city: station})
+        if errors:
+            raise RuntimeError(errors[city])
+        daily_df, hourly_df = data[city]
         return daily_df, hourly_df
 
-    def get_weather_data_for_all_cities(self, locations):
-        # Loop through all cities and fetch the data
+    def window_bounds(self, kind, window):
+        """Return the first and last timestamps of a window; the hourly data goes until the last hour of its last day."""
+        if kind == 'daily':
+            return window
+        # A janela horária vai até a última hora do seu último dia, para não deixar buracos entre janelas
+        return window[0], window[1] + pd.Timedelta(hours=23)
+
+    def fetch_station(self, job):
+        """
+        Fetch the daily or hourly data of a station for all its pending windows and save the checkpoint
+        of each window. The data is fetched once, from the first to the last pending window, and sliced
+        into windows locally, so the bulk file of a station is read a single time per kind and two jobs
+        never download the same file.
+        Returns:
+            dict: DataFrame of each window.
+        """
+        city, station, kind, windows = job
+        start, end = self.window_bounds(kind, windows[0])[0], self.window_bounds(kind, windows[-1])[1]
+        fetch = self.process_daily_data if kind == 'daily' else self.process_hourly_data
+        df = fetch(station, start.to_pydatetime(), end.to_pydatetime())
+        parts = {}
+        for window in windows:
+            window_start, window_end = self.window_bounds(kind, window)
+            parts[window] = df.loc[window_start:window_end]
+            self.checkpoint.save(city, kind, window, {'station': station}, parts[window])
+        return parts
+
+    def fetch_stations(self, locations):
+        """
+        Fetch the whole date range of the stations in windows of window_years. The daily and hourly
+        data of each station are separate jobs, up to max_workers at the same time; each job fetches
+        its station once and saves the windows not yet in the checkpoint directory. The windows of each
+        station are stitched in order and the bulk file cache is trimmed at the end.
+        Returns:
+            tuple: ({city: (daily_df, hourly_df)}, {city: error message})
+        """
+        windows = split_date_range(self.start_date, self.end_date, self.window_years)
+        saved = {(city, kind, window): self.checkpoint.load(city, kind, window, {'station': station})
+                 for city, station in locations.items() for kind in KINDS for window in windows}
+        jobs = []
         for city, station in locations.items():
-            print(f'City: {city} Station: {station}')
-            daily_df, hourly_df = self.fetch_weather_data(city, station)
-            # Save the data to CSV files
-            self.save_data_frame_to_csv(daily_df, self.path_to_save, city, 'daily')
-            self.save_data_frame_to_csv(hourly_df, self.path_to_save, city, 'hourly')
-
-    def save_data_frame_to_csv(self, data_frame, file_path, city_name, data_type):
-        """Save a pandas DataFrame to a CSV file with a personalized name based on the city."""
-        name_file = f"{file_path}{city_name}_{data_type}_1973_2024.csv"
-        # Save the DataFrame to the file
-        data_frame.to_csv(name_file, index=True)
-
-        
+            for kind in KINDS:
+                pending = tuple(window for window in windows if saved[(city, kind, window)] is None)
+                if pending:
+                    jobs.append((city, station, kind, pending))
+        print(f'{len(windows)} janelas por estação, {sum(len(job[3]) for job in jobs)} pendentes em {len(jobs)} buscas')
+        results, failed = run_concurrently(self.fetch_station, jobs, self.max_workers)
+
+        data, errors = {}, {}
+        for (city, _, kind, pending), error in failed.items():
+            errors[city] = f'{kind} from {pending[0][0]:%Y-%m-%d}: {error}'
+            print(f'Erro ao buscar os dados de {city}: {errors[city]}')
+        for (city, _, kind, _), parts in results.items():
+            for window, part in parts.items():
+                saved[(city, kind, window)] = part
+        for city in locations:
+            if city not in errors:
+                data[city] = tuple(stitch([saved[(city, kind, window)] for window in windows]) for kind in KINDS)
+
+        removed, freed = evict_cache(self.cache_dir, self.max_age, self.max_cache_bytes)
+        if removed:
+            print(f'Cache: {removed} arquivos removidos ({freed / 1024 ** 2:.1f} MB)')
+        return data, errors
+
+    def get_weather_data_for_all_cities(self, locations):
+        """
+        Fetch and save the data of all stations.
+        Returns:
+            dict: Error message of each city that failed (its completed windows stay saved for the next run).
+        """
+        data, errors = self.fetch_stations(locations)
+        for city, (daily_df, hourly_df) in data.items():
+            print(f'City: {city} Station: {locations[city]} ({len(daily_df)} dias, {len(hourly_df)} horas)')
+            # Save the data to parquet datasets
+            self.save_data_frame_to_parquet(daily_df, self.path_to_save, city, 'daily')
+            self.save_data_frame_to_parquet(hourly_df, self.path_to_save, city, 'hourly')
+        return errors
+
+    def save_data_frame_to_parquet(self, data_frame, file_path, city_name, data_type):
+        """Save a DataFrame as a parquet dataset partitioned by year, named after the city and the date range."""
+        name_file = f"{file_path}{city_name}_{data_type}_{self.start_date.year}_{self.end_date.year}.parquet"
+        # O índice de datas ('time') vira coluna
+        write_partitioned_parquet(data_frame.reset_index(), name_file, date_column='time')
+
+
 def load_stations_from_file(file_path):
     """Load cities and coordinates from a JSON file."""
     with open(file_path, 'r') as file:
@@ -61,14 +161,29 @@ def load_stations_from_file(file_path):
         locations = {entry['city']: entry['sation'] for entry in data}  # Corrected 'sation' to 'station'
     return locations
 
+def parse_args():
+    parser = argparse.ArgumentParser(description='Baixa os dados diários e horários das estações do Meteostat.')
+    parser.add_argument('--stations', default='./configs/stations.json', help='Arquivo JSON com as estações')
+    parser.add_argument('--start', default='1973-01-01', help='Data inicial (YYYY-MM-DD)')
+    parser.add_argument('--end', default='2024-12-31', help='Data final (YYYY-MM-DD)')
+    parser.add_argument('--workers', type=int, default=4, help='Estações baixadas ao mesmo tempo')
+    parser.add_argument('--cache-dir', default='./data/cache/meteostat', help='Cache dos arquivos bulk')
+    parser.add_argument('--cache-hours', type=float, default=24, help='Validade do cache, em horas')
+    parser.add_argument('--cache-mb', type=float, default=2048, help='Tamanho máximo do cache, em MB')
+    parser.add_argument('--mirror', default=None,
+                        help='Cópia local dos arquivos bulk (modo offline, sem acessar a rede)')
+    return parser.parse_args()
+
+
 if __name__ == '__main__':
+    args = parse_args()
     # Load stations from the JSON file
-    file_path = './configs/stations.json'  # Path to your JSON file with city data
-    locations = load_stations_from_file(file_path)
+    locations = load_stations_from_file(args.stations)
     print(locations)
-    
+
     # Initialize the weather data fetcher
-    weather_fetcher = MeteostatAPI(start_date="1973-01-01", end_date="2024-12-31")
+    weather_fetcher = MeteostatAPI(start_date=args.start, end_date=args.end, max_workers=args.workers,
+                                   cache_dir=args.cache_dir, max_age=int(args.cache_hours * 3600),
+                                   max_cache_bytes=int(args.cache_mb * 1024 ** 2), mirror_dir=args.mirror)
     # Fetch and process weather data for all cities
     weather_fetcher.get_weather_data_for_all_cities(locations)
-    #print(datetime(2018, 1, 1))
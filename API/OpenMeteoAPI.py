@@ -1,82 +1,114 @@
 import openmeteo_requests
 import requests_cache
-import pandas as pd
+import numpy as np
+import pyarrow as pa
 from retry_requests import retry
 import json
+from types import MappingProxyType
+
+from API.storage import write_partitioned_parquet
+from API.windows import split_date_range, run_concurrently, stitch, WindowCheckpoint
+
+ARCHIVE_URL = "https://archive-api.open-meteo.com/v1/archive"
+
 
 class OpenMeteoAPI:
-    def __init__(self, start_date, end_date, timezone="America/Sao_Paulo"):
+    def __init__(self, start_date, end_date, timezone="America/Sao_Paulo", url=ARCHIVE_URL, cache_name='.cache',
+                 max_workers=4, locations_per_request=1, window_years=5,
+                 checkpoint_dir='./data/cache/checkpoints/openmeteo'):
+        """
+        Args:
+            start_date (str): First date, 'YYYY-MM-DD'.
+            end_date (str): Last date, 'YYYY-MM-DD'.
+            timezone (str): Timezone of the daily aggregation.
+            url (str): Archive API endpoint (a local stub server in tests).
+            cache_name (str): Name of the requests_cache cache.
+            max_workers (int): Requests running at the same time.
+            locations_per_request (int): Cities sent in each request, using the multi-location form
+                of the API (comma-separated coordinates). 1 sends one request per city.
+            window_years (int): Years of each request; the date range is split into windows of this size.
+            checkpoint_dir (str): Directory where each fetched window is saved, so an interrupted
+                download resumes from the windows already done.
+        """
         self.start_date = start_date
         self.end_date = end_date
         self.timezone = timezone
         self.path_to_save = './data/raw/base_1/'
+        self.max_workers = max_workers
+        self.locations_per_request = locations_per_request
+        self.window_years = window_years
+        self.checkpoint = WindowCheckpoint(checkpoint_dir)
 
         # Setup the Open-Meteo API client with cache and retry on error
-        self.cache_session = requests_cache.CachedSession('.cache', expire_after=3600)
+        self.cache_session = requests_cache.CachedSession(cache_name, expire_after=3600)
         self.retry_session = retry(self.cache_session, retries=5, backoff_factor=0.2)
         self.openmeteo = openmeteo_requests.Client(session=self.retry_session)
 
-        self.url = "https://archive-api.open-meteo.com/v1/archive"
-        self.params = {
-            "hourly": ["relative_humidity_2m", "pressure_msl", "surface_pressure"],
-            "daily": [
-                "temperature_2m_max", "temperature_2m_min", "temperature_2m_mean", "rain_sum", "showers_sum", 
+        self.url = url
+        # Parâmetros comuns, somente leitura: cada requisição monta a sua cópia com as coordenadas
+        self.params = MappingProxyType({
+            "hourly": ("relative_humidity_2m", "pressure_msl", "surface_pressure"),
+            "daily": (
+                "temperature_2m_max", "temperature_2m_min", "temperature_2m_mean", "rain_sum", "showers_sum",
                 "snowfall_sum", "wind_speed_10m_max", "wind_gusts_10m_max", "wind_direction_10m_dominant"
-            ],
+            ),
             "timezone": self.timezone,
             "start_date": self.start_date,
             "end_date": self.end_date
-        }
+        })
+
+    def build_params(self, latitudes, longitudes, start_date=None, end_date=None):
+        """Build the params of a single request, with the comma-separated coordinates of its locations."""
+        params = dict(self.params)
+        if start_date is not None:
+            params["start_date"], params["end_date"] = start_date, end_date
+        params["latitude"] = ",".join(str(latitude) for latitude in latitudes)
+        params["longitude"] = ",".join(str(longitude) for longitude in longitudes)
+        return params
+
+    def request_identity(self, coordinates):
+        """Params that identify the data of a city in the checkpoints (dates excluded: they are in the window)."""
+        return {"url": self.url, "coordinates": coordinates, "timezone": self.params["timezone"],
+                "daily": self.params["daily"], "hourly": self.params["hourly"]}
 
     def fetch_weather_data(self, latitude, longitude):
         """Fetch weather data from Open-Meteo API."""
-        self.params["latitude"] = latitude
-        self.params["longitude"] = longitude
-        responses = self.openmeteo.weather_api(self.url, params=self.params)
-        return responses[0]  # Assuming we have only one response for the given coordinates
+        return self.fetch_weather_data_batch([(latitude, longitude)])[0]
+
+    def fetch_weather_data_batch(self, coordinates, start_date=None, end_date=None):
+        """Fetch the weather data of several locations in one request (one response per location, in order)."""
+        latitudes, longitudes = zip(*coordinates)
+        params = self.build_params(latitudes, longitudes, start_date, end_date)
+        responses = self.openmeteo.weather_api(self.url, params=params)
+        if len(responses) != len(coordinates):
+            raise ValueError(f"Expected {len(coordinates)} responses, got {len(responses)}")
+        return responses
+
+    def process_variables(self, section, names):
+        """
+        Assemble a response section (Hourly() or Daily()) into an Arrow table.
+        The columns are the requested variables, in the order of the request, and reference the
+        float32 arrays of the flatbuffer without copies; the dates are built from the time range.
+        """
+        if section.VariablesLength() != len(names):
+            raise ValueError(f"Expected {len(names)} variables, got {section.VariablesLength()}")
+        seconds = np.arange(section.Time(), section.TimeEnd(), section.Interval(), dtype=np.int64)
+        columns = {"date": pa.array(seconds * 1_000_000_000, pa.timestamp("ns", tz="UTC"))}
+        for i, name in enumerate(names):
+            columns[name] = pa.array(section.Variables(i).ValuesAsNumpy())
+        return pa.table(columns)
+
+    def to_data_frame(self, table):
+        """Convert an Arrow table to a DataFrame keeping one block per column (no consolidation copy)."""
+        return table.to_pandas(split_blocks=True, self_destruct=True)
 
     def process_hourly_data(self, response):
         """Process hourly weather data."""
-        hourly = response.Hourly()
-        hourly_data = {
-            "date": pd.date_range(
-                start=pd.to_datetime(hourly.Time(), unit="s", utc=True),
-                end=pd.to_datetime(hourly.TimeEnd(), unit="s", utc=True),
-                freq=pd.Timedelta(seconds=hourly.Interval()),
-                inclusive="left"
-            )
-        }
-        hourly_data["relative_humidity_2m"] = hourly.Variables(0).ValuesAsNumpy()
-        hourly_data["pressure_msl"] = hourly.Variables(1).ValuesAsNumpy()
-        hourly_data["surface_pressure"] = hourly.Variables(2).ValuesAsNumpy()
-
-        hourly_dataframe = pd.DataFrame(data=hourly_data)
-        return hourly_dataframe
+        return self.to_data_frame(self.process_variables(response.Hourly(), self.params["hourly"]))
 
     def process_daily_data(self, response):
         """Process daily weather data."""
-        daily = response.Daily()
-        daily_data = {
-            "date": pd.date_range(
-                start=pd.to_datetime(daily.Time(), unit="s", utc=True),
-                end=pd.to_datetime(daily.TimeEnd(), unit="s", utc=True),
-                freq=pd.Timedelta(seconds=daily.Interval()),
-                inclusive="left"
-            )
-        }
-        daily_data["temperature_2m_max"] = daily.Variables(0).ValuesAsNumpy()
-        daily_data["temperature_2m_min"] = daily.Variables(1).ValuesAsNumpy()
-        
-        daily_data["temperature_2m_mean"] = daily.Variables(2).ValuesAsNumpy()
-        daily_data["rain_sum"] = daily.Variables(3).ValuesAsNumpy()
-        daily_data["showers_sum"] = daily.Variables(4).ValuesAsNumpy()
-        daily_data["snowfall_sum"] = daily.Variables(5).ValuesAsNumpy()
-        daily_data["wind_speed_10m_max"] = daily.Variables(6).ValuesAsNumpy()
-        daily_data["wind_gusts_10m_max"] = daily.Variables(7).ValuesAsNumpy()
-        daily_data["wind_direction_10m_dominant"] = daily.Variables(8).ValuesAsNumpy()
-
-        daily_dataframe = pd.DataFrame(data=daily_data)
-        return daily_dataframe
+        return self.to_data_frame(self.process_variables(response.Daily(), self.params["daily"]))
 
     def display_location_info(self, response, city):
         """Display basic information about the location."""
@@ -88,36 +120,82 @@ class OpenMeteoAPI:
 
     def get_weather_data_for_city(self, city, latitude, longitude):
         """Fetch, process, and display the weather data for a single city."""
-        response = self.fetch_weather_data(latitude, longitude)
-
-        # Display location info
-        self.display_location_info(response, city)
-
-        # Process and display hourly data
-        hourly_df = pd.DataFrame(self.process_hourly_data(response))
+        data, errors = self.fetch_cities({city: (latitude, longitude)})
+        if errors:
+            raise RuntimeError(errors[city])
+        daily_df, hourly_df = data[city]
         print("Hourly Data:")
         print(hourly_df.head(5))
-
-        # Process and display daily data
-        daily_df = pd.DataFrame(self.process_daily_data(response))
         print("Daily Data:")
         print(daily_df.head(5))
         return daily_df,hourly_df
 
-    def get_weather_data_for_all_cities(self, locations):
-        """Fetch and display weather data for all cities in the provided dictionary."""
-        for city, (latitude, longitude) in locations.items():
-            daily_df,hourly_df=self.get_weather_data_for_city(city, latitude, longitude)
-            self.save_data_frame_to_csv(daily_df,self.path_to_save,city,data_type="daily")
-            self.save_data_frame_to_csv(hourly_df,self.path_to_save,city,data_type="hourly")
-    def save_data_frame_to_csv(self,data_frame, file_path, city_name,data_type):
-        """Save a pandas DataFrame to a CSV file with a personalized name based on city."""
-        # Criação do nome do arquivo com base no city_name
-        name_file = f"{file_path}{city_name}_{data_type}_1973_2024.csv"
-    
-        # Salva o DataFrame com o nome do arquivo personalizado
-        data_frame.to_csv(name_file, index=False)
+    def fetch_window(self, job):
+        """Fetch a window of a group of cities and save a checkpoint of each city."""
+        cities, window = job
+        start_date, end_date = (date.strftime("%Y-%m-%d") for date in window)
+        responses = self.fetch_weather_data_batch([coordinates for _, coordinates in cities], start_date, end_date)
+        data = {}
+        for (city, coordinates), response in zip(cities, responses):
+            data[city] = (self.process_daily_data(response), self.process_hourly_data(response))
+            identity = self.request_identity(coordinates)
+            self.checkpoint.save(city, "daily", window, identity, data[city][0])
+            self.checkpoint.save(city, "hourly", window, identity, data[city][1])
+        return data
+
+    def fetch_cities(self, locations):
+        """
+        Fetch the whole date range of the cities in windows of window_years.
+        Windows already saved in the checkpoint directory are not fetched again. The other windows
+        are grouped into requests of locations_per_request cities and up to max_workers requests run
+        at the same time on the shared cache/retry session. The windows of each city are stitched in order.
+        Returns:
+            tuple: ({city: (daily_df, hourly_df)}, {city: error message})
+        """
+        windows = split_date_range(self.start_date, self.end_date, self.window_years)
+        cities = list(locations.items())
+        groups = [tuple(cities[i:i + self.locations_per_request])
+                  for i in range(0, len(cities), self.locations_per_request)]
+        saved = {(city, window): (self.checkpoint.load(city, "daily", window, self.request_identity(coordinates)),
+                                  self.checkpoint.load(city, "hourly", window, self.request_identity(coordinates)))
+                 for city, coordinates in cities for window in windows}
+        jobs = [(group, window) for group in groups for window in windows
+                if any(df is None for city, _ in group for df in saved[(city, window)])]
+        print(f"{len(windows)} janelas por cidade, {len(jobs)} requisições pendentes")
+        results, failed = run_concurrently(self.fetch_window, jobs, self.max_workers)
+
+        data, errors = {}, {}
+        for (group, window), error in failed.items():
+            for city, _ in group:
+                errors[city] = f"window {window[0]:%Y-%m-%d}: {error}"
+                print(f"Erro ao buscar os dados de {city}: {errors[city]}")
+        for (group, window), result in results.items():
+            for city, _ in group:
+                saved[(city, window)] = result[city]
+        for city, _ in cities:
+            if city not in errors:
+                daily = stitch([saved[(city, window)][0] for window in windows], "date")
+                hourly = stitch([saved[(city, window)][1] for window in windows], "date")
+                data[city] = (daily.reset_index(drop=True), hourly.reset_index(drop=True))
+        return data, errors
 
+    def get_weather_data_for_all_cities(self, locations):
+        """
+        Fetch and save weather data for all cities in the provided dictionary.
+        Returns:
+            dict: Error message of each city that failed (its completed windows stay saved for the next run).
+        """
+        data, errors = self.fetch_cities(locations)
+        for city, (daily_df, hourly_df) in data.items():
+            print(f"{city}: {len(daily_df)} dias, {len(hourly_df)} horas")
+            self.save_data_frame_to_parquet(daily_df,self.path_to_save,city,data_type="daily")
+            self.save_data_frame_to_parquet(hourly_df,self.path_to_save,city,data_type="hourly")
+        return errors
+
+    def save_data_frame_to_parquet(self, data_frame, file_path, city_name, data_type):
+        """Save a DataFrame as a parquet dataset partitioned by year, named after the city and the date range."""
+        name_file = f"{file_path}{city_name}_{data_type}_{self.start_date[:4]}_{self.end_date[:4]}.parquet"
+        write_partitioned_parquet(data_frame, name_file, date_column="date")
 
 
 def load_locations_from_file(file_path):
@@ -0,0 +1,59 @@
+import os
+import shutil
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+
+def write_partitioned_parquet(df, dataset_path, date_column='date', compression='zstd'):
+    """
+    Write a DataFrame as a parquet dataset partitioned by year (dataset_path/year=YYYY/part-0.parquet).
+    Measurements are stored as float32 and dates keep their native timestamp type (and timezone).
+    The dataset is written next to the old one and swapped in when complete: the old dataset is renamed
+    to a backup, the new one is renamed into place and only then the backup is deleted. Readers never
+    see a partial dataset (only, between the two renames, no dataset), years that are no longer present
+    are removed, and if the swap fails the old dataset is put back.
+    Args:
+        df (pd.DataFrame): Data of a city, with the dates in date_column.
+        dataset_path (str): Dataset directory, e.g. data/raw/base_1/dallas_daily_1973_2024.parquet.
+        date_column (str): Column with the dates, used for the year partitions.
+        compression (str): Parquet compression codec.
+    Returns:
+        int: Number of rows written.
+    """
+    float_columns = df.select_dtypes(include='float64').columns
+    df = df.astype({col: np.float32 for col in float_columns})
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    years = df[date_column].dt.year.to_numpy(dtype=np.int16)
+    table = table.append_column('year', pa.array(years, pa.int16()))
+
+    temp_path = f'{dataset_path}.tmp'
+    shutil.rmtree(temp_path, ignore_errors=True)
+    ds.write_dataset(table, temp_path, format='parquet',
+                     partitioning=ds.partitioning(pa.schema([('year', pa.int16())]), flavor='hive'),
+                     file_options=ds.ParquetFileFormat().make_write_options(compression=compression),
+                     basename_template='part-{i}.parquet')
+    backup_path = f'{dataset_path}.old'
+    if os.path.exists(backup_path) and not os.path.exists(dataset_path):
+        # Troca interrompida numa execução anterior: o backup é o último dataset completo
+        os.replace(backup_path, dataset_path)
+    remove_path(backup_path)
+    if os.path.exists(dataset_path):
+        os.replace(dataset_path, backup_path)
+    try:
+        os.replace(temp_path, dataset_path)
+    except OSError:
+        if os.path.exists(backup_path):
+            os.replace(backup_path, dataset_path)
+        raise
+    remove_path(backup_path)
+    return table.num_rows
+
+
+def remove_path(path):
+    """Remove a file or a directory tree, if it exists."""
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
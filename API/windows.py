@@ -0,0 +1,103 @@
+import os
+import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+# Dias de atraso dos dados históricos (o ERA5 da Open-Meteo chega com alguns dias de atraso):
+# janelas que terminam dentro desse intervalo ainda podem mudar
+FINAL_LAG_DAYS = 7
+
+
+def split_date_range(start_date, end_date, window_years=5):
+    """
+    Split a date range into windows aligned to calendar years.
+    Args:
+        start_date: First date.
+        end_date: Last date (inclusive).
+        window_years (int): Years per window.
+    Returns:
+        list: (start, end) Timestamps of each window, in order.
+    """
+    start, end = pd.Timestamp(start_date).normalize(), pd.Timestamp(end_date).normalize()
+    windows = []
+    while start <= end:
+        window_end = min(pd.Timestamp(year=start.year + window_years, month=1, day=1) - pd.Timedelta(days=1), end)
+        windows.append((start, window_end))
+        start = window_end + pd.Timedelta(days=1)
+    return windows
+
+
+def run_concurrently(function, items, max_workers=4):
+    """
+    Run function(item) for each item in a thread pool.
+    Returns:
+        tuple: (results by item, error messages by item)
+    """
+    results, errors = {}, {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(function, item): item for item in items}
+        for future in as_completed(futures):
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                errors[futures[future]] = f"{type(e).__name__}: {e}"
+    return results, errors
+
+
+def stitch(frames, date_column=None):
+    """
+    Concatenate the frames of consecutive windows in order, keeping the last copy of a repeated date.
+    Args:
+        frames (list): DataFrames in window order.
+        date_column (str): Date column, or None if the dates are the index.
+    """
+    df = pd.concat(frames)
+    dates = df.index if date_column is None else df[date_column]
+    return df[~pd.Index(dates).duplicated(keep='last')]
+
+
+def params_hash(params):
+    """
+    Short hash of the params of a request (station, coordinates, timezone, variables...).
+    """
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+
+class WindowCheckpoint:
+    """
+    Data of each (city, kind, window) saved to disk as soon as the window is fetched, so an interrupted
+    download resumes from the windows already done.
+    The path has a hash of the request params, so a window fetched for another station, coordinates,
+    timezone or set of variables is never reused.
+    Windows that end more than lag_days before today are final and never fetched again; the recent
+    windows, whose data may still be filled in by the source, are fetched again on every run, so an
+    update only downloads the last window.
+    """
+    def __init__(self, checkpoint_dir, lag_days=FINAL_LAG_DAYS):
+        self.checkpoint_dir = checkpoint_dir
+        self.lag = pd.Timedelta(days=lag_days)
+
+    def path(self, city, kind, window, params):
+        start, end = window
+        return os.path.join(self.checkpoint_dir, city, params_hash(params),
+                            f"{kind}_{start:%Y%m%d}_{end:%Y%m%d}.parquet")
+
+    def is_final(self, window, today=None):
+        today = today if today is not None else pd.Timestamp.today().normalize()
+        return window[1] < today - self.lag
+
+    def load(self, city, kind, window, params):
+        """Return the saved data of a final window, or None if it must be fetched."""
+        path = self.path(city, kind, window, params)
+        if self.is_final(window) and os.path.exists(path):
+            return pd.read_parquet(path)
+        return None
+
+    def save(self, city, kind, window, params, df):
+        """Save the data of a window (written to a temporary file and renamed)."""
+        path = self.path(city, kind, window, params)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        df.to_parquet(f"{path}.tmp", engine='pyarrow')
+        os.replace(f"{path}.tmp", path)
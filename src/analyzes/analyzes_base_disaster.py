@@ -5,14 +5,17 @@ import numpy as np
 import seaborn as sns
 import matplotlib.pyplot as plt
 import src.utils.Utils as utils
+from src.utils.catalog import DataCatalog
 
 
 
 
 class DisasterAnalysis:
-    def __init__(self, path):
+    def __init__(self, path, catalog=None):
         self.path = path
         self.city = None
+        # Catálogo opcional: evita listar a pasta e casar cidades por substring
+        self.catalog = catalog
     def show_analysis_base_disaster(self, df):
         print(f"\n--- Análise base de desastres ---")
         print(f"Cidade: {self.city}")
@@ -132,8 +135,8 @@ class DisasterAnalysis:
             print("Coluna 'date' não encontrada.")
             return
         df['date'] = pd.to_datetime(df['date'], errors='coerce')
-        df['season'] = df['date'].apply(utils.get_season)
-        disaster_by_season = df.groupby('season').size().reset_index(name='count')
+        df['season'] = utils.encode_season(df['date'])
+        disaster_by_season = df.groupby('season', observed=False).size().reset_index(name='count')
         print(disaster_by_season.head(3))
         
         plt.figure(figsize=(10, 5))
@@ -153,13 +156,18 @@ class DisasterAnalysis:
         print(f'Analisando pasta: {self.path} ...')
         dfs_by_city = {}
 
-        for file in os.listdir(self.path):
-            if file.endswith('.parquet'):
-                file_path = os.path.join(self.path, file)
-                city = file.split('_')[0]
-                df = utils.read_data_from_parquet(file_path)
-                if df is not None:
-                    dfs_by_city[city] = df
+        if self.catalog is not None:
+            files_by_city = {}
+            for city in self.catalog.cities_in('silver', 'base_disaster'):
+                files_by_city[city] = self.catalog.get_disaster_path(city)
+        else:
+            files_by_city = {file.split('_')[0]: os.path.join(self.path, file)
+                             for file in os.listdir(self.path) if file.endswith('.parquet')}
+
+        for city, file_path in files_by_city.items():
+            df = utils.read_data_from_parquet(file_path)
+            if df is not None:
+                dfs_by_city[city] = df
 
         self.show_count_disaster_by_city(dfs_by_city)
 
@@ -171,5 +179,6 @@ class DisasterAnalysis:
 
 if __name__ == '__main__':
     silver_data_path = 'data/silver/base_disaster'
-    analysis = DisasterAnalysis(silver_data_path)
+    catalog = DataCatalog('data', 'configs/citys.json', layers=['silver'])
+    analysis = DisasterAnalysis(silver_data_path, catalog)
     analysis.analysis_sub_folders()
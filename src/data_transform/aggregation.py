@@ -0,0 +1,65 @@
+import pandas as pd
+
+STATISTICS = ['mean', 'min', 'max', 'sum', 'std', 'count']
+
+
+class DailyAggregator:
+    """
+    Aggregates hourly data to days with a datetime-indexed resample.
+    Several statistics per column are computed in a single pass; the mean keeps the name of the
+    column and the other statistics are named '<column>_<statistic>'. The output is float32.
+
+    Timezone-aware timestamps (e.g. UTC from OpenMeteo and Meteostat) are converted to the given
+    timezone before the days are cut, so they line up with the daily series of the same source.
+    Naive timestamps are taken as already being in local time.
+    """
+    def __init__(self, statistics=None, timezone=None, date_column='date'):
+        """
+        Args:
+            statistics (list | dict): Statistics applied to every numeric column, or a dictionary
+                column -> list of statistics. Default is ['mean'].
+            timezone (str): Timezone of the days, e.g. 'America/Sao_Paulo'. Default is None (UTC for aware timestamps).
+            date_column (str): Name of the date column.
+        """
+        self.statistics = statistics or ['mean']
+        self.timezone = timezone
+        self.date_column = date_column
+        for stats in (self.statistics.values() if isinstance(self.statistics, dict) else [self.statistics]):
+            invalid = [stat for stat in stats if stat not in STATISTICS]
+            if invalid:
+                raise ValueError(f"Invalid statistics {invalid}. Use {STATISTICS}.")
+
+    def get_spec(self, df):
+        """
+        Builds the aggregation spec (column -> list of statistics) for the numeric columns of a DataFrame.
+        """
+        numeric_columns = [col for col in df.select_dtypes('number').columns if col != self.date_column]
+        if isinstance(self.statistics, dict):
+            return {col: list(stats) for col, stats in self.statistics.items() if col in numeric_columns}
+        return {col: list(self.statistics) for col in numeric_columns}
+
+    def to_local_time(self, dates):
+        """
+        Converts timezone-aware timestamps to naive timestamps in the configured timezone.
+        """
+        if getattr(dates.dt, 'tz', None) is None:
+            return dates
+        return dates.dt.tz_convert(self.timezone or 'UTC').dt.tz_localize(None)
+
+    def aggregate(self, df):
+        """
+        Aggregates hourly data to days.
+        Args:
+            df (pd.DataFrame): Hourly data with a date column.
+        Returns:
+            pd.DataFrame: One row per day with the date column and the float32 statistics.
+        """
+        spec = self.get_spec(df)
+        dates = self.to_local_time(pd.to_datetime(df[self.date_column]))
+        data = df[list(spec)].set_axis(pd.DatetimeIndex(dates, name=self.date_column), axis=0)
+        resampler = data.resample('D')
+        daily = resampler.agg(spec)
+        daily.columns = [col if stat == 'mean' else f'{col}_{stat}' for col, stat in daily.columns]
+        # Mantém só os dias com dados, como no groupby por data
+        daily = daily[resampler.size() > 0]
+        return daily.astype('float32').reset_index()
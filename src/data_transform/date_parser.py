@@ -0,0 +1,139 @@
+import importlib.util
+import pandas as pd
+
+# Formatos aceitos, em ordem de prioridade (usada para desempate entre formatos ambíguos)
+DATE_FORMATS = ['%m/%d/%Y', '%Y-%m-%d', '%d/%m/%Y']
+
+
+class DateParser:
+    """
+    Vectorized date parser for the raw bases.
+    The format is detected from a sample of the column and the whole column is parsed in one pass.
+    Rows that do not match the detected format are routed to the other formats, and the rows
+    that match no format are counted and left as NaT.
+    For daily series only the date is kept: any time component after the date (e.g. '03:00:00+00:00')
+    is ignored. Sub-daily series (e.g. hourly files) keep the full timestamp, as UTC, so that they can
+    be aggregated to days in the local timezone later.
+    """
+    def __init__(self, formats=None, sample_size=1000):
+        self.formats = formats or DATE_FORMATS
+        self.sample_size = sample_size
+        # Strings do pyarrow tornam o corte da hora bem mais rápido que strings do Python
+        self.string_dtype = 'string[pyarrow]' if importlib.util.find_spec('pyarrow') is not None else str
+
+    def strip_time(self, values):
+        """
+        Keeps only the date part of the values, removing anything after the first space.
+
+        Parameters:
+        - values: Series without null values.
+        Returns:
+        - Series of strings with only the date.
+        """
+        return values.astype(self.string_dtype).str.replace(r'\s.*$', '', regex=True)
+
+    def to_datetime(self, values, fmt):
+        """
+        Parses the values with a single format.
+
+        Parameters:
+        - values: Series of strings.
+        - fmt: strftime format of the date.
+        Returns:
+        - Series of datetimes, NaT where the value does not match the format.
+        """
+        return pd.to_datetime(values, format=fmt, errors='coerce')
+
+    def is_sub_daily(self, series, sample_size=48):
+        """
+        Checks whether a series has more than one timestamp per day, looking at its first values.
+        The distinct timestamps of the sample are sorted and the series is sub-daily when the median
+        step between them is shorter than a day. Repeated dates (several stations or events on the
+        same day) and a constant time of day (daily values stamped at 03:00 UTC) do not count.
+
+        Parameters:
+        - series: Series of dates as strings or datetimes, without null values.
+        - sample_size: Number of consecutive values inspected.
+        Returns:
+        - True if the timestamps of the sample are less than a day apart.
+        """
+        sample = series.iloc[:sample_size]
+        if not pd.api.types.is_datetime64_any_dtype(sample):
+            sample = pd.to_datetime(sample.astype(str), format='ISO8601', utc=True, errors='coerce').dropna()
+        timestamps = pd.DatetimeIndex(sample.unique()).sort_values()
+        if len(timestamps) < 2:
+            return False
+        return timestamps.to_series().diff().median() < pd.Timedelta(days=1)
+
+    def parse_timestamps(self, series):
+        """
+        Parses a sub-daily column keeping the time, as UTC. Timestamps without timezone are taken as UTC.
+
+        Parameters:
+        - series: Series of ISO 8601 timestamps as strings (or datetimes).
+        Returns:
+        - Tuple with the Series of UTC datetimes and the number of non-null rows that could not be parsed.
+        """
+        if pd.api.types.is_datetime64_any_dtype(series):
+            if getattr(series.dt, 'tz', None) is None:
+                return series.dt.tz_localize('UTC'), 0
+            return series.dt.tz_convert('UTC'), 0
+        parsed = pd.to_datetime(series, format='ISO8601', utc=True, errors='coerce')
+        return parsed, int((parsed.isna() & series.notna()).sum())
+
+    def detect_format(self, values):
+        """
+        Detects the date format from an evenly spaced sample of the values.
+
+        Parameters:
+        - values: Series of strings without null values.
+        Returns:
+        - The format that parses most of the sample, or None if no format matches.
+        """
+        if values.empty:
+            return None
+        step = max(len(values) // self.sample_size, 1)
+        sample = values.iloc[::step]
+        scores = {fmt: self.to_datetime(sample, fmt).notna().sum() for fmt in self.formats}
+        best = max(self.formats, key=lambda fmt: scores[fmt])
+        return best if scores[best] > 0 else None
+
+    def parse(self, series):
+        """
+        Parses a column to datetime.
+
+        Parameters:
+        - series: Series of dates as strings (or datetimes).
+        Returns:
+        - Tuple with the Series of datetimes (dates only, or UTC timestamps for sub-daily series)
+          and the number of non-null rows that could not be parsed.
+        """
+        if self.is_sub_daily(series.dropna()):
+            return self.parse_timestamps(series)
+
+        if pd.api.types.is_datetime64_any_dtype(series):
+            if getattr(series.dt, 'tz', None) is not None:
+                series = series.dt.tz_localize(None)
+            return series.dt.normalize(), 0
+
+        not_null = series.notna()
+        values = self.strip_time(series[not_null])
+
+        fmt = self.detect_format(values)
+        if fmt is None:
+            parsed = pd.Series(pd.NaT, index=series.index, dtype='datetime64[ns]')
+            return parsed, int(not_null.sum())
+
+        # Passada única com o formato detectado; só as linhas que falharem seguem para os demais formatos
+        parsed = self.to_datetime(values, fmt).reindex(series.index)
+        pending = values[parsed[not_null].isna()]
+        for other in self.formats:
+            if pending.empty:
+                break
+            if other == fmt:
+                continue
+            result = self.to_datetime(pending, other)
+            matched = result.notna()
+            parsed.loc[result.index[matched]] = result[matched]
+            pending = pending[~matched]
+        return parsed, len(pending)
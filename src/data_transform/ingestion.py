@@ -0,0 +1,238 @@
+import io
+import importlib.util
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+
+# Colunas de destino (após o mapeamento) com tipos especiais
+DATE_COLUMNS = ['date']
+CATEGORICAL_COLUMNS = ['eventType', 'location', 'name_station']
+
+
+def resolve_engine(engine='auto'):
+    """
+    Resolves the CSV engine to be used.
+
+    Parameters:
+    - engine: 'auto', 'pyarrow' or 'c'. 'auto' uses pyarrow when it is installed.
+    Returns:
+    - Name of the engine accepted by pd.read_csv.
+    """
+    if engine == 'auto':
+        return 'pyarrow' if importlib.util.find_spec('pyarrow') is not None else 'c'
+    return engine
+
+
+class InvalidRows:
+    """
+    invalid_row_handler of the pyarrow CSV readers, following the bad-line policy of pd.read_csv:
+    rows with extra fields are skipped and counted, rows with missing trailing fields (e.g. a stray quote
+    in a narrative) are kept aside to be parsed again with the C engine, which reads them with nulls.
+    """
+    def __init__(self, header_line):
+        self.header_line = header_line
+        self.short_rows = []
+        self.skipped = 0
+
+    def __call__(self, row):
+        if row.actual_columns < row.expected_columns:
+            self.short_rows.append(row.text)
+        else:
+            self.skipped += 1
+        return 'skip'
+
+
+class IngestionSchema:
+    """
+    Per-base ingestion schema derived from the column mapping config.
+    Only the mapped columns of each base are read, with compact dtypes:
+    float32 for measurements, category for names and event types and text for dates,
+    which are parsed afterwards by the processing step.
+    Parquet datasets written by the API clients are already typed and are read as they are.
+    """
+    def __init__(self, map_column, engine='auto'):
+        self.map_column = map_column
+        self.engine = resolve_engine(engine)
+
+    def has_base(self, base):
+        """
+        Checks whether there is a schema for the base.
+        """
+        return base in self.map_column
+
+    def get_dtype(self, base, column):
+        """
+        Returns the dtype used to read a source column of a base.
+
+        Parameters:
+        - base: Name of the base (key of the column mapping).
+        - column: Name of the column in the raw file.
+        Returns:
+        - dtype accepted by pd.read_csv.
+        """
+        target = self.map_column[base][column]
+        if target in DATE_COLUMNS:
+            return str
+        if target in CATEGORICAL_COLUMNS:
+            return 'category'
+        return 'float32'
+
+    def get_columns(self, base, file_path):
+        """
+        Returns the mapped columns of the base that are present in the file header.
+
+        Parameters:
+        - base: Name of the base (key of the column mapping).
+        - file_path: Path to the CSV file.
+        Returns:
+        - List of column names, in the order of the file.
+        """
+        header = pd.read_csv(file_path, nrows=0).columns
+        return [col for col in header if col in self.map_column[base]]
+
+    def get_header_line(self, file_path):
+        """
+        Returns the first line of a CSV file, without the line break.
+        """
+        with open(file_path, encoding='utf-8', newline='') as file:
+            return file.readline().rstrip('\r\n')
+
+    def read_csv(self, file_path, base):
+        """
+        Reads a raw CSV file projecting only the mapped columns of the base with explicit dtypes.
+        If the pyarrow engine fails, the file is read again with the C engine.
+
+        Parameters:
+        - file_path: Path to the CSV file.
+        - base: Name of the base (key of the column mapping).
+        Returns:
+        - DataFrame with the raw column names.
+        """
+        usecols = self.get_columns(base, file_path)
+        dtypes = {col: self.get_dtype(base, col) for col in usecols}
+        try:
+            return pd.read_csv(file_path, usecols=usecols, dtype=dtypes, engine=self.engine, on_bad_lines='skip')
+        except Exception as e:
+            if self.engine == 'c':
+                raise
+            print(f"Error reading file {file_path} with engine {self.engine}: {e}. Retrying with engine c.")
+            return pd.read_csv(file_path, usecols=usecols, dtype=dtypes, engine='c', on_bad_lines='skip')
+
+    def get_arrow_options(self, base, file_path):
+        """
+        Returns the pyarrow CSV options shared by read_csv_records and read_csv_chunks.
+        Quoted line breaks are kept inside their values, so the streaming reader splits the file on record
+        boundaries, and rows with a different number of fields are handed to an InvalidRows handler.
+        Every mapped column is read as text and converted to the dtype of the schema by to_frame.
+        """
+        usecols = self.get_columns(base, file_path)
+        invalid_rows = InvalidRows(self.get_header_line(file_path))
+        parse_options = pacsv.ParseOptions(newlines_in_values=True, invalid_row_handler=invalid_rows)
+        convert_options = pacsv.ConvertOptions(include_columns=usecols, strings_can_be_null=True,
+                                               column_types={col: pa.string() for col in usecols})
+        dtypes = {col: self.get_dtype(base, col) for col in usecols}
+        return parse_options, convert_options, dtypes, invalid_rows
+
+    def read_short_rows(self, invalid_rows, columns):
+        """
+        Parses the rows with missing trailing fields with the C engine, one at a time, so that a stray quote
+        does not run into the next rows. The missing fields are null, as in pd.read_csv.
+
+        Parameters:
+        - invalid_rows: InvalidRows handler used by the pyarrow reader.
+        - columns: Names of the projected columns.
+        Returns:
+        - pyarrow Table with the projected columns as text.
+        """
+        schema = pa.schema([(col, pa.string()) for col in columns])
+        frames = [pd.read_csv(io.StringIO(invalid_rows.header_line + '\n' + text), usecols=columns, dtype=str,
+                              engine='c', on_bad_lines='skip')
+                  for text in invalid_rows.short_rows]
+        if not frames:
+            return schema.empty_table()
+        return pa.Table.from_pandas(pd.concat(frames, ignore_index=True)[columns], schema=schema,
+                                    preserve_index=False)
+
+    def report_invalid_rows(self, file_path, invalid_rows):
+        if invalid_rows.skipped or invalid_rows.short_rows:
+            print(f"File {file_path}: {invalid_rows.skipped} rows with extra fields skipped, "
+                  f"{len(invalid_rows.short_rows)} rows with missing fields read with engine c")
+
+    def to_frame(self, table, dtypes):
+        return table.to_pandas().astype(dtypes)
+
+    def read_csv_records(self, file_path, base):
+        """
+        Reads a whole raw CSV file with the pyarrow CSV reader, with the same rows as the
+        concatenation of read_csv_chunks. Rows with missing fields come after the other rows.
+
+        Parameters:
+        - file_path: Path to the CSV file.
+        - base: Name of the base (key of the column mapping).
+        Returns:
+        - DataFrame with the raw column names.
+        """
+        parse_options, convert_options, dtypes, invalid_rows = self.get_arrow_options(base, file_path)
+        # Um só thread: o handler recebe as linhas inválidas na ordem do arquivo
+        read_options = pacsv.ReadOptions(use_threads=False)
+        table = pacsv.read_csv(file_path, read_options=read_options, parse_options=parse_options,
+                               convert_options=convert_options)
+        short_rows = self.read_short_rows(invalid_rows, table.column_names)
+        self.report_invalid_rows(file_path, invalid_rows)
+        return self.to_frame(pa.concat_tables([table, short_rows]), dtypes)
+
+    def read_csv_chunks(self, file_path, base, chunksize, block_size=1 << 20):
+        """
+        Reads a raw CSV file in chunks with the streaming pyarrow CSV reader, with the same projection,
+        dtypes and bad-line policy as read_csv_records (pandas' chunked C reader does not check the
+        number of fields of the first line of each chunk, so its output depends on the chunk size).
+        Rows with missing fields are yielded in a last chunk, so the rows do not depend on the block size.
+
+        Parameters:
+        - file_path: Path to the CSV file.
+        - base: Name of the base (key of the column mapping).
+        - chunksize: Minimum number of rows per chunk.
+        - block_size: Bytes parsed at a time by the reader; must hold the longest record.
+        Returns:
+        - Iterator of DataFrames with the raw column names.
+        """
+        parse_options, convert_options, dtypes, invalid_rows = self.get_arrow_options(base, file_path)
+        batches, n_rows = [], 0
+        read_options = pacsv.ReadOptions(block_size=block_size, use_threads=False)
+        with pacsv.open_csv(file_path, read_options=read_options, parse_options=parse_options,
+                            convert_options=convert_options) as reader:
+            columns = reader.schema.names
+            for batch in reader:
+                batches.append(batch)
+                n_rows += batch.num_rows
+                if n_rows >= chunksize:
+                    yield self.to_frame(pa.Table.from_batches(batches), dtypes)
+                    batches, n_rows = [], 0
+        if batches:
+            yield self.to_frame(pa.Table.from_batches(batches), dtypes)
+        short_rows = self.read_short_rows(invalid_rows, columns)
+        self.report_invalid_rows(file_path, invalid_rows)
+        if short_rows.num_rows:
+            yield self.to_frame(short_rows, dtypes)
+
+    def read_parquet(self, file_path, base=None):
+        """
+        Reads a raw parquet file or dataset directory (e.g. partitioned by year), projecting only the
+        mapped columns of the base. The columns keep their stored types (float32, native timestamps)
+        and are handed to pandas without consolidating them into new blocks.
+
+        Parameters:
+        - file_path: Path to the parquet file or dataset directory.
+        - base: Name of the base (key of the column mapping). If None, every column is read.
+        Returns:
+        - DataFrame with the raw column names, sorted by the date column if there is one.
+        """
+        dataset = ds.dataset(file_path, format='parquet', partitioning='hive')
+        columns = [col for col in dataset.schema.names if base is None or col in self.map_column[base]]
+        table = dataset.to_table(columns=columns)
+        # Partições por ano são lidas na ordem dos diretórios; a data garante a ordem das linhas
+        date_columns = [col for col in columns if base is not None and self.map_column[base][col] in DATE_COLUMNS]
+        if date_columns:
+            table = table.sort_by(date_columns[0])
+        return table.to_pandas(split_blocks=True, self_destruct=True)
@@ -0,0 +1,76 @@
+import re
+import pandas as pd
+
+# Prefixo das colunas alvo por tipo de evento (multi-hot)
+EVENT_TARGET_PREFIX = 'event_'
+LABEL_COLUMNS = ['eventType', 'event_count', 'disaster_occurred']
+
+
+def event_column_name(event_type):
+    """
+    Builds the name of the target column of an event type, e.g. 'Thunderstorm Wind' -> 'event_thunderstorm_wind'.
+
+    Parameters:
+    - event_type: Name of the event type.
+    Returns:
+    - Column name.
+    """
+    return EVENT_TARGET_PREFIX + re.sub(r'[^0-9a-z]+', '_', str(event_type).lower()).strip('_')
+
+
+def get_label_columns(df):
+    """
+    Returns the label columns present in a gold DataFrame (which must not be used as features).
+
+    Parameters:
+    - df: Gold DataFrame.
+    Returns:
+    - List of column names.
+    """
+    return [col for col in df.columns if col in LABEL_COLUMNS or col.startswith(EVENT_TARGET_PREFIX)]
+
+
+def build_disaster_labels(df_disaster, event_targets=False):
+    """
+    Aggregates the disaster events per day, so the merge with the weather data
+    yields one row per day.
+
+    Parameters:
+    - df_disaster: Silver disaster DataFrame with the 'date' and 'eventType' columns.
+    - event_targets: If True, adds one multi-hot column per event type.
+    Returns:
+    - DataFrame with one row per date with the events of the day joined by '|' ('eventType'),
+      the number of events ('event_count') and, optionally, the per-event-type targets.
+    """
+    df = df_disaster[['date', 'eventType']].dropna()
+    df = df.assign(eventType=df['eventType'].astype(str))
+    grouped = df.groupby('date')['eventType']
+    labels = pd.DataFrame({
+        'eventType': grouped.agg(lambda events: '|'.join(sorted(set(events)))),
+        'event_count': grouped.size().astype('int16'),
+    })
+    if event_targets:
+        multi_hot = pd.crosstab(df['date'], df['eventType']).gt(0).astype('uint8')
+        multi_hot.columns = [event_column_name(col) for col in multi_hot.columns]
+        labels = labels.join(multi_hot)
+    return labels.reset_index()
+
+
+def merge_disaster_labels(df, labels, how='outer'):
+    """
+    Merges the daily labels into the weather data and builds the binary target.
+
+    Parameters:
+    - df: Weather DataFrame with a 'date' column (one row per day).
+    - labels: DataFrame returned by build_disaster_labels.
+    - how: Type of merge. Default is 'outer', which keeps the days with events but without weather data.
+    Returns:
+    - DataFrame with the labels and the 'disaster_occurred' target (1 if there was any event in the day).
+    """
+    base = pd.merge(df, labels, on='date', how=how)
+    base['event_count'] = base['event_count'].fillna(0).astype('int16')
+    base['disaster_occurred'] = (base['event_count'] > 0).astype('int8')
+    for col in labels.columns:
+        if col.startswith(EVENT_TARGET_PREFIX) and col != 'event_count':
+            base[col] = base[col].fillna(0).astype('uint8')
+    return base
@@ -0,0 +1,146 @@
+import os
+import json
+import hashlib
+
+
+def dataset_files(path):
+    """
+    Returns the files of a path: the path itself, or every file under it (sorted) if it is a
+    directory, e.g. a parquet dataset partitioned by year.
+    """
+    if not os.path.isdir(path):
+        return [path]
+    return sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+
+
+def file_hash(file_path, chunk_size=1024 * 1024):
+    """
+    Computes the SHA-256 hash of the content of a file (or of the files of a dataset directory,
+    including their relative paths).
+
+    Parameters:
+    - file_path: Path to the file or dataset directory.
+    - chunk_size: Number of bytes read at a time.
+    Returns:
+    - Hexadecimal digest of the file content.
+    """
+    sha256 = hashlib.sha256()
+    for path in dataset_files(file_path):
+        if path != file_path:
+            sha256.update(os.path.relpath(path, file_path).encode())
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(chunk_size), b''):
+                sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def path_stat(path):
+    """
+    Returns the total size and the latest mtime of a file or dataset directory.
+    """
+    stats = [os.stat(file) for file in dataset_files(path)]
+    return sum(stat.st_size for stat in stats), max((stat.st_mtime for stat in stats), default=0.0)
+
+
+class Manifest:
+    """
+    Stores, for each output file of a stage, the fingerprint (size, mtime and content hash)
+    of its inputs, the processor used and the hash of the column mapping config.
+    An output is valid while all of these are unchanged, so only stale outputs are rebuilt.
+    """
+    def __init__(self, manifest_path, config_path=None):
+        self.manifest_path = manifest_path
+        self.config_hash = file_hash(config_path) if config_path else None
+        self.data = self.load()
+
+    def load(self):
+        """
+        Loads the manifest from disk.
+
+        Returns:
+        - Dictionary with one entry per stage, empty if the manifest does not exist or is invalid.
+        """
+        if not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            with open(self.manifest_path, 'r') as file:
+                return json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"Error reading manifest {self.manifest_path}: {e}")
+            return {}
+
+    def save(self):
+        """
+        Saves the manifest to disk, replacing the previous file atomically.
+        """
+        dir_path = os.path.dirname(self.manifest_path)
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w') as file:
+            json.dump(self.data, file, indent=4, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def fingerprint(self, file_path):
+        """
+        Builds the fingerprint of an input file.
+
+        Parameters:
+        - file_path: Path to the input file.
+        Returns:
+        - Dictionary with the size, mtime and content hash of the file.
+        """
+        size, mtime = path_stat(file_path)
+        return {'size': size, 'mtime': mtime, 'hash': file_hash(file_path)}
+
+    def is_valid(self, stage, output_path, input_paths, processor_name):
+        """
+        Checks whether an output is still valid for its inputs.
+        The content hash is only computed when the size matches but the mtime changed.
+
+        Parameters:
+        - stage: Name of the stage ('silver' or 'gold').
+        - output_path: Path to the output file.
+        - input_paths: List of paths to the input files.
+        - processor_name: Name of the processing function.
+        Returns:
+        - True if the output exists and nothing it depends on has changed.
+        """
+        entry = self.data.get(stage, {}).get(os.path.normpath(output_path))
+        if entry is None or not os.path.exists(output_path):
+            return False
+        if entry['processor'] != processor_name or entry['config_hash'] != self.config_hash:
+            return False
+        inputs = {os.path.normpath(path): path for path in input_paths}
+        if set(inputs) != set(entry['inputs']):
+            return False
+        for key, path in inputs.items():
+            recorded = entry['inputs'][key]
+            if not os.path.exists(path):
+                return False
+            size, mtime = path_stat(path)
+            if size != recorded['size']:
+                return False
+            if mtime != recorded['mtime']:
+                if file_hash(path) != recorded['hash']:
+                    return False
+                # Conteúdo igual: atualiza o mtime para evitar recalcular o hash
+                recorded['mtime'] = mtime
+        return True
+
+    def record(self, stage, output_path, input_paths, processor_name):
+        """
+        Records a freshly built output and saves the manifest.
+
+        Parameters:
+        - stage: Name of the stage ('silver' or 'gold').
+        - output_path: Path to the output file.
+        - input_paths: List of paths to the input files.
+        - processor_name: Name of the processing function.
+        """
+        self.data.setdefault(stage, {})[os.path.normpath(output_path)] = {
+            'inputs': {os.path.normpath(path): self.fingerprint(path) for path in input_paths},
+            'processor': processor_name,
+            'config_hash': self.config_hash,
+        }
+        self.save()
@@ -3,27 +3,52 @@ import json
 import time
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from src.data_transform.manifest import Manifest
+from src.data_transform.ingestion import IngestionSchema
+from src.data_transform.date_parser import DateParser
+from src.utils.jobs import new_result, capture_job, run_jobs, print_summary
 
 class DataProcessor:
-    def __init__(self, raw_data_path, output_data_path, file_path_mapping_column):
+    def __init__(self, raw_data_path, output_data_path, file_path_mapping_column, manifest_path=None, engine='auto',
+                 chunksize=None):
         self.raw_data_path = raw_data_path
         self.output_data_path = output_data_path
+        # Número de linhas por bloco na leitura em streaming da base de desastres (None lê o arquivo inteiro)
+        self.chunksize = chunksize
         self.map_column = self.load_mapping_column(file_path_mapping_column)
+        # Esquema de leitura tipado por base, derivado do mapeamento de colunas
+        self.schema = IngestionSchema(self.map_column, engine)
+        self.date_parser = DateParser()
+        # Manifesto opcional para o processamento incremental
+        self.manifest = Manifest(manifest_path, file_path_mapping_column) if manifest_path else None
         # Criar o diretório de saída, se necessário
         os.makedirs(self.output_data_path, exist_ok=True)
     
-    def read_file(self, file_path):
+    def read_file(self, file_path, subpasta=None):
         """
         Reads a CSV file into a DataFrame,Skipping bad lines.
+        If the subfolder has an ingestion schema, only its mapped columns are read, with compact dtypes.
+        Parquet files and datasets (written by the API clients) are read with their stored types.
 
         Parameters:
-        -  file_path: Path to the CSV file to read.
+        -  file_path: Path to the CSV file (or parquet file/dataset) to read.
+        -  subpasta: Name of the subfolder of the file. Default is None (all columns, inferred dtypes).
 
         Returns:
         - DataFrame containing the data from the CSV file.
 
         """
         try:
+            if file_path.endswith('.parquet'):
+                base = subpasta if subpasta is not None and self.schema.has_base(subpasta) else None
+                return self.schema.read_parquet(file_path, base)
+            if subpasta == 'base_disaster':
+                # Mesmo leitor da leitura em blocos, para que a saída não dependa do chunksize
+                return self.schema.read_csv_records(file_path, subpasta)
+            if subpasta is not None and self.schema.has_base(subpasta):
+                return self.schema.read_csv(file_path, subpasta)
             return pd.read_csv(file_path,on_bad_lines='skip')
         except Exception as e:
             print(f"Error reading file {file_path}: {e}")
@@ -48,12 +73,16 @@ class DataProcessor:
         Parameters:
         - df:DataFrame to be saved.
         - file_path: Path to the Parquet file to be saved. 
+        Returns:
+        - True if the file was saved, False otherwise.
         """
         try:
             df.to_parquet(file_path, index=False, engine='pyarrow', compression='snappy')
             print(f"File saved to {file_path}")
+            return True
         except Exception as e:
             print(f"Error saving file {file_path}: {e}")
+            return False
     
     def count_null_values(self,df):
         """
@@ -194,24 +223,45 @@ class DataProcessor:
     def convert_to_datetime(self,df,column_name):
         """
         Converts a column to a datetime format.
+        The date format is detected from a sample and rows in other formats are parsed with their own format.
+        Rows that match no format become NaT and are reported.
         Parameters:
         - df : DataFrame to be processed.
         - column_name: Name of the column to be converted.
         Returns:
         - DataFrame with the column converted to datetime format.
         """
-        formats = ['%m/%d/%Y', '%Y-%m-%d', '%d/%m/%Y']  
-        df[column_name] = df[column_name].astype(str).str.split(' ').str[0] 
-        for fmt in formats:
-            try:
-                df[column_name] = pd.to_datetime(df[column_name], format=fmt)
-                return df
-            except Exception as e:
-                #print(f"Error converting to datetime: {e}")
-                continue  
-        
+        df[column_name], unparsed = self.date_parser.parse(df[column_name])
+        if unparsed:
+            print(f"Warning: {unparsed} rows of column {column_name} could not be converted to datetime.")
         return df 
     
+    def clean_disaster_data(self, df):
+        """
+        Selects the disaster columns, drops null values, renames the columns and converts the dates.
+        Parameters:
+        - df: DataFrame (or chunk) to be processed.
+        Returns:
+        - Cleaned DataFrame.
+        """
+        select_columns =['CZ_NAME_STR','BEGIN_DATE','EVENT_TYPE']
+        df = df.loc[:, select_columns]
+        df = df.dropna()
+        df = self.rename_collumns(df,"base_disaster")
+        df = self.convert_to_datetime(df,'date')
+        # Linhas sem data válida vêm de linhas quebradas do CSV
+        df = df.dropna(subset=['date'])
+        return df
+
+    def remove_unused_categories(self, df):
+        """
+        Removes the categories that no longer appear in the categorical columns of a DataFrame.
+        """
+        df = df.copy()
+        for col in df.select_dtypes('category').columns:
+            df[col] = df[col].cat.remove_unused_categories()
+        return df
+
     def process_base_disaster(self,df):
         """
         Processes the base_disaster data,incluind renaming columns,
@@ -223,11 +273,7 @@ class DataProcessor:
         """
         print("Processing disaster data...")
         print(f"Number of rows: {df.shape[0]}")
-        select_columns =['CZ_NAME_STR','BEGIN_DATE','EVENT_TYPE']
-        df = df.loc[:, select_columns]
-        df = df.dropna()
-        df = self.rename_collumns(df,"base_disaster")
-        df = self.convert_to_datetime(df,'date')
+        df = self.clean_disaster_data(df)
         print("Displaying the first  rows of the DataFrame...")
         print(df.head(3))
         num_duplicates = df.duplicated(subset=['date'], keep=False).sum()  # Conta quantas duplicatas existem
@@ -235,21 +281,65 @@ class DataProcessor:
         duplicates = df[df.duplicated(subset=['date'], keep=False)] # Mostra todas as duplicatas
         print(duplicates)
         df = df.drop_duplicates(subset=['date','eventType'], keep='first')  # Remove duplicatas, mantendo a primeira ocorrência
+        df = self.remove_unused_categories(df)
         self.count_null_values(df)
         print("\n")
         return df
+
+    def process_base_disaster_chunked(self, file_path, output_file_path):
+        """
+        Streaming version of process_base_disaster for very large Storm Events files.
+        The file is read in chunks of self.chunksize rows; each chunk is cleaned, deduplicated on
+        (date, eventType) against the keys already written and appended to the Parquet file as a
+        row group, so memory is bounded by the chunk size and the number of distinct keys.
+        Parameters:
+        - file_path: Path to the raw CSV file.
+        - output_file_path: Path to the Parquet file to be saved.
+        Returns:
+        - Number of rows written.
+        """
+        print("Processing disaster data in chunks...")
+        # Categorias variam entre blocos: grava como dicionário com índice int32 em todos os row groups
+        schema = pa.schema([
+            ('location', pa.dictionary(pa.int32(), pa.string())),
+            ('date', pa.timestamp('ns')),
+            ('eventType', pa.dictionary(pa.int32(), pa.string())),
+        ])
+        seen = set()
+        rows_read = 0
+        rows_written = 0
+        with pq.ParquetWriter(output_file_path, schema, compression='snappy') as writer:
+            for chunk in self.schema.read_csv_chunks(file_path, 'base_disaster', self.chunksize):
+                rows_read += len(chunk)
+                chunk = self.clean_disaster_data(chunk)
+                chunk = chunk.drop_duplicates(subset=['date','eventType'], keep='first')
+                keys = list(zip(chunk['date'].values.astype('int64'), chunk['eventType'].astype(str)))
+                is_new = np.fromiter((key not in seen for key in keys), dtype=bool, count=len(keys))
+                seen.update(keys)
+                chunk = self.remove_unused_categories(chunk[is_new])
+                if chunk.empty:
+                    continue
+                writer.write_table(pa.Table.from_pandas(chunk[schema.names], schema=schema, preserve_index=False))
+                rows_written += len(chunk)
+            if rows_written == 0:
+                writer.write_table(schema.empty_table())
+        print(f"Number of rows: {rows_read}")
+        print(f"Rows written: {rows_written}")
+        print(f"File saved to {output_file_path}")
+        return rows_written
     
     def process_generic(self, df):
         print("Processando dados genéricos...")
         # Implementar o tratamento genérico
         return df
     
-    def get_processor(self, subpasta):
+    def get_processor(self, subpasta, verbose=True):
         """
         Maps subfolders to processing functions.
 
         Parameters:
         - subfolder: Name of the subfolder to be processed.
+        - verbose: If True, prints the processor chosen for the subfolder.
         Returns:
         - the processing funcition corresponding to the subfolder.
         """
@@ -260,53 +350,144 @@ class DataProcessor:
             'base_disaster': self.process_base_disaster, # concluido
             'disaster':self.process_generic,
         }
-        print(f"Processor for subfolder {subpasta}: {processors.get(subpasta, self.process_generic).__name__}")
+        if verbose:
+            print(f"Processor for subfolder {subpasta}: {processors.get(subpasta, self.process_generic).__name__}")
         return processors.get(subpasta, self.process_generic)  # Função genérica por padrão
 
-    def process_subfolders(self):
+    def list_tasks(self):
         """
-        Process all subfolders and files in the raw data directory
-        for each subfolder, the corresponding processing function is called.
+        Lists the (subfolder, file) pairs to be processed and creates the output subfolders.
+
+        Returns:
+        - List of (subfolder, file) tuples, one for each CSV file or parquet file/dataset in the raw data directory.
         """
-        for subpasta in os.listdir(self.raw_data_path):
+        tasks = []
+        for subpasta in sorted(os.listdir(self.raw_data_path)):
             subpasta_path = os.path.join(self.raw_data_path, subpasta)
-            
             if os.path.isdir(subpasta_path):
-                print(f"Processing subfolder {subpasta_path}...")
-
                 # Criar a pasta de saída para a subpasta
-                output_subpasta_path = os.path.join(self.output_data_path, subpasta)
-                os.makedirs(output_subpasta_path, exist_ok=True)
-
-                # Obter a função de processamento com base no nome da subpasta
-                processor = self.get_processor(subpasta)
-
-                # Processar os arquivos na subpasta
-                for file in os.listdir(subpasta_path):
-                    file_path = os.path.join(subpasta_path, file)
-                    if file.endswith('.csv'):
-                        print(f"Processing file {file_path}")
-                        df = self.read_file(file_path)
-                        if df is not None:
-                            # Aplicar o tratamento específico para a subpasta
-                            df = processor(df)
-                            # Salvar o arquivo em Parquet
-                            self.save_to_parquet(df, os.path.join(output_subpasta_path, file.replace('.csv', '.parquet')))
+                os.makedirs(os.path.join(self.output_data_path, subpasta), exist_ok=True)
+                files = sorted(os.listdir(subpasta_path))
+                for file in files:
+                    # O parquet gravado pelas APIs substitui o CSV antigo de mesmo nome
+                    if file.endswith('.parquet') or (file.endswith('.csv') and file[:-4] + '.parquet' not in files):
+                        tasks.append((subpasta, file))
+        return tasks
+
+    def get_task_paths(self, subpasta, file):
+        """
+        Returns the input and output paths of a (subfolder, file) task.
+        """
+        input_path = os.path.join(self.raw_data_path, subpasta, file)
+        output_path = os.path.join(self.output_data_path, subpasta, os.path.splitext(file)[0] + '.parquet')
+        return input_path, output_path
+
+    def is_up_to_date(self, subpasta, file):
+        """
+        Checks in the manifest whether the output of a task is still valid.
+
+        Parameters:
+        - subpasta: Name of the subfolder of the file.
+        - file: Name of the CSV file.
+        Returns:
+        - True if the output can be reused, False if it must be rebuilt.
+        """
+        if self.manifest is None:
+            return False
+        input_path, output_path = self.get_task_paths(subpasta, file)
+        return self.manifest.is_valid('silver', output_path, [input_path], self.get_processor(subpasta, verbose=False).__name__)
+
+    def record_task(self, task, result):
+        """
+        Records a successfully processed task in the manifest.
+
+        Parameters:
+        - task: (subfolder, file) pair of the task.
+        - result: Dictionary returned by process_file.
+        """
+        if self.manifest is None or result['status'] != 'ok':
+            return
+        subpasta, file = task
+        input_path, output_path = self.get_task_paths(subpasta, file)
+        self.manifest.record('silver', output_path, [input_path], self.get_processor(subpasta, verbose=False).__name__)
+
+    def process_file(self, subpasta, file, quiet=False):
+        """
+        Reads, processes and saves a single raw file. Each (subfolder, file) pair is
+        independent, so this is the unit of work of the process pool.
+
+        Parameters:
+        - subpasta: Name of the subfolder of the file.
+        - file: Name of the CSV file.
+        - quiet: If True, the output of the processing is captured instead of printed.
+        Returns:
+        - Dictionary with the subfolder, file, status, elapsed time, error and captured log of the task.
+        """
+        result = new_result(subfolder=subpasta, file=file)
+        file_path, output_file_path = self.get_task_paths(subpasta, file)
+        with capture_job(result, quiet):
+            print(f"Processing file {file_path}")
+            if subpasta == 'base_disaster' and self.chunksize and file.endswith('.csv'):
+                # Leitura em streaming, gravando a saída bloco a bloco
+                self.process_base_disaster_chunked(file_path, output_file_path)
+            else:
+                df = self.read_file(file_path, subpasta)
+                if df is None:
+                    raise ValueError(f"could not read file {file_path}")
+                # Aplicar o tratamento específico para a subpasta
+                df = self.get_processor(subpasta)(df)
+                # Salvar o arquivo em Parquet
+                if not self.save_to_parquet(df, output_file_path):
+                    raise IOError(f"could not save file {output_file_path}")
+        return result
+
+    def run_task(self, task, quiet=False):
+        """
+        Processes a (subfolder, file) task; the job function of process_subfolders.
+        """
+        return self.process_file(*task, quiet=quiet)
+
+    def process_subfolders(self, parallel=False, max_workers=None, force=False):
+        """
+        Process all subfolders and files in the raw data directory
+        for each subfolder, the corresponding processing function is called.
+        When a manifest is configured, files whose outputs are still valid are skipped.
+
+        Parameters:
+        - parallel: If True, the files are processed in a process pool, one task per (subfolder, file).
+        - max_workers: Number of worker processes. Default is the number of CPUs.
+        - force: If True, every file is rebuilt regardless of the manifest.
+        Returns:
+        - List of dictionaries with the timing and the errors of each task.
+        """
+        results = []
+        tasks = []
+        for subpasta, file in self.list_tasks():
+            if not force and self.is_up_to_date(subpasta, file):
+                results.append(new_result('skipped', subfolder=subpasta, file=file))
+            else:
+                tasks.append((subpasta, file))
+        results += run_jobs(self.run_task, tasks, parallel, max_workers, on_result=self.record_task)
+        print_summary(results, lambda r: f"{r['subfolder']}/{r['file']}", noun='files')
+        return results
 
 if __name__ == '__main__':        
     # Uso da classe:
     raw_data_path = 'data/raw'
     output_data_path = 'data/silver'
     file_path_mapping_column = 'configs/dataframe_column_mapping.json'
+    manifest_path = 'data/manifest.json'
+    max_workers = os.cpu_count()
+    chunksize = 100_000
 
     # Criar uma instância da classe
-    processor = DataProcessor(raw_data_path, output_data_path,file_path_mapping_column)
+    processor = DataProcessor(raw_data_path, output_data_path,file_path_mapping_column, manifest_path, chunksize=chunksize)
     #print(vars(processor))
 
     start_time = time.time()
 
     # Process the subfolders and files
-    processor.process_subfolders()
+    processor.process_subfolders(parallel=True, max_workers=max_workers)
 
     # Measure the end time of execution
     end_time = time.time()
@@ -2,19 +2,67 @@ import os
 import pandas as pd
 import numpy as np
 import time
-from collections import defaultdict
 import src.utils.Utils as utils
+from src.utils.jobs import new_result, capture_job, run_jobs, print_summary
+from src.utils.catalog import DataCatalog
+from src.data_transform.manifest import Manifest
+from src.data_transform.labels import build_disaster_labels, merge_disaster_labels
+from src.data_transform.aggregation import DailyAggregator
+
+# Fuso horário dos dias de cada base: a OpenMeteo agrega os dados diários no fuso configurado na API
+HOURLY_TIMEZONES = {
+    'base_1': 'America/Sao_Paulo',
+    'base_3': 'UTC',
+}
 
 class SilverToGold:
-    def __init__(self, silver_path, gold_path):
+    def __init__(self, silver_path, gold_path, manifest_path=None, config_path=None, event_targets=False,
+                 cities_path='configs/citys.json', hourly_statistics=None):
         self.silver_path = silver_path
         self.gold_path = gold_path
-        self.silver_path_disaster = 'data/silver/base_disaster'
-    def get_disaster(self, city_name):
-        files_in_path =os.listdir(self.silver_path_disaster)
-        path_file_disaster =[file for file in files_in_path if city_name in file]
-        return path_file_disaster[0] if path_file_disaster else None
+        self.cities_path = cities_path
+        # Estatísticas diárias calculadas a partir dos dados horários (padrão: média)
+        self.hourly_statistics = hourly_statistics
+        # Se True, adiciona uma coluna alvo (multi-hot) por tipo de evento
+        self.event_targets = event_targets
+        # Manifesto opcional para o processamento incremental
+        self.manifest = Manifest(manifest_path, config_path) if manifest_path else None
+        self.catalog = None
+
+    def get_catalog(self, refresh=False):
+        '''
+        Returns the catalog of the silver layer, scanned on the first call (or when refresh is True).
+        '''
+        if self.catalog is None or refresh:
+            data_path = os.path.dirname(os.path.normpath(self.silver_path))
+            layer = os.path.basename(os.path.normpath(self.silver_path))
+            self.catalog = DataCatalog(data_path, self.cities_path, layers=[layer])
+        return self.catalog
+
+    def get_disaster(self, city_name, catalog=None):
+        '''
+        Finds the disaster file of a city.
+        Args:
+            city_name (str): City name.
+            catalog (DataCatalog): Catalog of the silver layer. Default is the catalog of this instance.
+        Returns:
+            str: Path of the disaster file in the silver layer, or None if not found.
+        '''
+        catalog = catalog or self.get_catalog()
+        return catalog.get_disaster_path(city_name, catalog.layers[0])
     
+    def aggregate_hourly(self, df_hourly, subpasta):
+        '''
+        Aggregates the hourly data of a base to days, in the timezone of the base.
+        Args:
+            df_hourly (pd.DataFrame): Hourly data.
+            subpasta (str): Subfolder name.
+        Returns:
+            pd.DataFrame: Daily statistics (float32).
+        '''
+        aggregator = DailyAggregator(self.hourly_statistics, HOURLY_TIMEZONES.get(subpasta))
+        return aggregator.aggregate(df_hourly)
+
     def process_generic(self,files_path,file_disaster ,subpasta):
         print("Processando dados genéricos...")
         # Implementar o tratamento genérico
@@ -26,7 +74,7 @@ class SilverToGold:
         This function processes the data files found in the specified subfolder and merges them with disaster data.
         Args:
             files_path (list): List of file paths to be processed.
-            file_disaster (str):  Disaster file name.
+            file_disaster (str):  Path of the disaster file.
             subpasta (str): Subfolder name.
         '''
         for file in files_path:
@@ -37,16 +85,15 @@ class SilverToGold:
                 print(f'    📄 Arquivo horário encontrado: {file}'  )
                 df_hourly = utils.read_data_from_parquet(os.path.join(self.silver_path,subpasta, file))
         print(f'    📄 Arquivo desastre encontrado: {file_disaster}')
-        df_disaster = utils.read_data_from_parquet(os.path.join(self.silver_path_disaster, file_disaster))
-        df_disaster = df_disaster.drop(columns=['location'])
-        df_daily['season'] = df_daily['date'].apply(utils.get_season)
+        df_disaster = utils.read_data_from_parquet(file_disaster)
+        df_labels = build_disaster_labels(df_disaster, self.event_targets)
+        df_daily['season'] = utils.encode_season(df_daily['date'])
 
-        medias_por_dia = df_hourly.groupby('date').mean(numeric_only=True).reset_index()
+        medias_por_dia = self.aggregate_hourly(df_hourly, subpasta)
 
         base_completa = pd.merge(df_daily, medias_por_dia, on='date', how='left')
 
-        base_final = pd.merge(base_completa, df_disaster, on='date', how='outer')
-        base_final['disaster_occurred']= base_final['eventType'].apply(lambda x:  0 if pd.isna(x) else 1)
+        base_final = merge_disaster_labels(base_completa, df_labels)
         print(f'Top 10 rows of base_final:')
         print(base_final.head(10))
         print(utils.count_null_values(base_final))
@@ -58,18 +105,17 @@ class SilverToGold:
         This function processes the data files found in the specified subfolder and merges them with disaster data.
         Args:
             files_path (list): List of file paths to be processed.
-            file_disaster (str):  Disaster file name.
+            file_disaster (str):  Path of the disaster file.
             subpasta (str): Subfolder name.
         '''
         for file in files_path:
             print(f'    📄 Arquivo diário encontrado: {file}')
             data = utils.read_data_from_parquet(os.path.join(self.silver_path,subpasta, file))
         print(f'    📄 Arquivo desastre encontrado: {file_disaster}')
-        df_disaster = utils.read_data_from_parquet(os.path.join(self.silver_path_disaster, file_disaster))
-        df_disaster = df_disaster.drop(columns=['location'])
-        data['season'] = data['date'].apply(utils.get_season)
-        base_final = pd.merge(data, df_disaster, on='date', how='outer')
-        base_final['disaster_occurred']= base_final['eventType'].apply(lambda x:  0 if pd.isna(x) else 1)
+        df_disaster = utils.read_data_from_parquet(file_disaster)
+        df_labels = build_disaster_labels(df_disaster, self.event_targets)
+        data['season'] = utils.encode_season(data['date'])
+        base_final = merge_disaster_labels(data, df_labels)
         #print(f'Top 10 rows of base_final:')
         #print(base_final.head(10))
 
@@ -84,11 +130,13 @@ class SilverToGold:
                 print(f'    📄 Arquivo horário encontrado: {file}'  )
                 df_hourly = utils.read_data_from_parquet(os.path.join(self.silver_path,subpasta, file))
         print(f'    📄 Arquivo desastre encontrado: {file_disaster}')
-        df_disaster = utils.read_data_from_parquet(os.path.join(self.silver_path_disaster, file_disaster))
-        df_disaster = df_disaster.drop(columns=['location'])
-        medias_por_dia = df_hourly.groupby('date').mean(numeric_only=True).reset_index()
-        medias_por_dia = medias_por_dia[['date','dewpoint','relative_humidity','wind_direction','wind_speed','precipitation']]
-        df_merged = pd.merge(df_daily, medias_por_dia, on=['precipitation', 'wind_direction', 'wind_speed'], how='left', suffixes=('_df1', '_df2'))
+        df_disaster = utils.read_data_from_parquet(file_disaster)
+        df_labels = build_disaster_labels(df_disaster, self.event_targets)
+        medias_por_dia = self.aggregate_hourly(df_hourly, subpasta)
+        extra_columns = [col for col in medias_por_dia.columns if col not in df_hourly.columns]
+        medias_por_dia = medias_por_dia[['date','dewpoint','relative_humidity','wind_direction','wind_speed','precipitation'] + extra_columns]
+        # Preenche as falhas diárias com as médias horárias do mesmo dia
+        df_merged = pd.merge(df_daily[['date']], medias_por_dia, on='date', how='left')
         df_daily['precipitation'] = df_daily['precipitation'].fillna(df_merged['precipitation'])
         df_daily['wind_direction'] = df_daily['wind_direction'].fillna(df_merged['wind_direction'])
         df_daily['wind_speed'] = df_daily['wind_speed'].fillna(df_merged['wind_speed'])
@@ -105,20 +153,20 @@ class SilverToGold:
         
         #print(utils.count_null_values(base_completa))
         
-        base_final = pd.merge(base_completa, df_disaster, on='date', how='outer')
-        base_final['season'] =base_final['date'].apply(utils.get_season)
-        base_final['disaster_occurred']= base_final['eventType'].apply(lambda x:  0 if pd.isna(x) else 1)
+        base_final = merge_disaster_labels(base_completa, df_labels)
+        base_final['season'] = utils.encode_season(base_final['date'])
         #print(f'Top 10 rows of base_final:')
         #print(base_final.head(10))
         
         return base_final
 
-    def get_processor(self, subpasta):
+    def get_processor(self, subpasta, verbose=True):
         """
         Maps subfolders to processing functions.
 
         Parameters:
         - subfolder: Name of the subfolder to be processed.
+        - verbose: If True, prints the processor chosen for the subfolder.
         Returns:
         - the processing funcition corresponding to the subfolder.
         """
@@ -128,53 +176,113 @@ class SilverToGold:
             'base_3':self.process_base_3 # concluido
 
         }
-        print(f"Processor for subfolder {subpasta}: {processors.get(subpasta, self.process_generic).__name__}")
+        if verbose:
+            print(f"Processor for subfolder {subpasta}: {processors.get(subpasta, self.process_generic).__name__}")
         return processors.get(subpasta, self.process_generic)  # Função genérica por padrão
 
-    def process_subfolders(self):
-            list_cities = [
-                'dallas', 'houston', 'miami', 'nashville',
-                'new york', 'oklahoma city', 'albuquerque', 'chicago'
-            ]
-
-            for subpasta in os.listdir(self.silver_path):
+    def plan_jobs(self):
+            '''
+            Resolves, once, the files of every (base, city) job: the silver files of the city,
+            its disaster file and the output path. The silver layer is scanned only once, into a catalog.
+            Returns:
+                list: One dictionary per job.
+            '''
+            catalog = self.get_catalog(refresh=True)
+            layer = catalog.layers[0]
+            jobs = []
+            for subpasta in catalog.bases(layer):
+                if subpasta == 'base_disaster':
+                    continue
                 subpasta_path = os.path.join(self.silver_path, subpasta)
-                print(f'📁 Analisando pasta: {subpasta_path} ...')
-
-                if os.path.isdir(subpasta_path) and subpasta != 'base_disaster':
-                    list_files = os.listdir(subpasta_path)
-
-                    # Cria um dicionário que agrupa arquivos por cidade
-                    city_files = defaultdict(list)
-                    for f in list_files:
-                        for city in list_cities:
-                            if city.lower() in f.lower():
-                                city_files[city].append(f)
-
-                    # Agora só percorre as cidades com arquivos encontrados
-                    for city, files in city_files.items():
-                        file_disaster = self.get_disaster(city)
-                        print(f' {city} :')
-                        print(f'    📄 Arquivos encontrados : {files}')
-                        print(f'    📄 Arquivo desastre : {file_disaster}\n')
-                        processor= self.get_processor(subpasta)
-                        processed_data= processor(files ,file_disaster,subpasta)
-                        file_path_to_save = f'{self.gold_path}/{subpasta}/{city}_1973_2024.parquet'
-                        print(f'    📁 Salvando arquivo em: {file_path_to_save}')
-                        utils.save_data_to_parquet(processed_data, file_path_to_save)
+                for city in catalog.cities_in(layer, subpasta):
+                    files = [entry.file_name for entry in catalog.get(layer, subpasta, city)]
+                    file_disaster = self.get_disaster(city, catalog)
+                    input_paths = [os.path.join(subpasta_path, f) for f in files]
+                    if file_disaster:
+                        input_paths.append(file_disaster)
+                    jobs.append({
+                        'base': subpasta,
+                        'city': city,
+                        'files': files,
+                        'file_disaster': file_disaster,
+                        'input_paths': input_paths,
+                        'output_path': f'{self.gold_path}/{subpasta}/{city}_1973_2024.parquet',
+                    })
+            for path in catalog.unmatched:
+                print(f'🚫 Arquivo ignorado (cidade ou nome não reconhecido): {path}')
+            return jobs
+
+    def run_job(self, job, quiet=False):
+            '''
+            Builds and saves the gold file of a single (base, city) job.
+            Args:
+                job (dict): Job returned by plan_jobs.
+                quiet (bool): If True, the output of the processing is captured instead of printed.
+            Returns:
+                dict: Base, city, status, elapsed time, error and captured log of the job.
+            '''
+            result = new_result(base=job['base'], city=job['city'])
+            with capture_job(result, quiet):
+                print(f' {job["city"]} :')
+                print(f'    📄 Arquivos encontrados : {job["files"]}')
+                print(f'    📄 Arquivo desastre : {job["file_disaster"]}\n')
+                processor = self.get_processor(job['base'])
+                processed_data = processor(job['files'], job['file_disaster'], job['base'])
+                print(f'    📁 Salvando arquivo em: {job["output_path"]}')
+                if not utils.save_data_to_parquet(processed_data, job['output_path']):
+                    raise IOError(f'could not save file {job["output_path"]}')
+            return result
+
+    def record_job(self, job, result):
+            '''
+            Records a successfully built job in the manifest.
+            '''
+            if self.manifest is not None and result['status'] == 'ok':
+                processor_name = self.get_processor(job['base'], verbose=False).__name__
+                self.manifest.record('gold', job['output_path'], job['input_paths'], processor_name)
+
+    def process_subfolders(self, parallel=False, max_workers=None, force=False):
+            '''
+            Builds the gold file of each city of each base.
+            Each (base, city) job only depends on its own silver files and disaster file,
+            so the jobs can run in a process pool.
+            When a manifest is configured, only the cities whose silver or disaster files changed are rebuilt.
+            Args:
+                parallel (bool): If True, the jobs run in a process pool.
+                max_workers (int): Number of worker processes. Default is the number of CPUs.
+                force (bool): If True, every city is rebuilt regardless of the manifest.
+            Returns:
+                list: Dictionaries with the timing and the errors of each job.
+            '''
+            results = []
+            pending = []
+            for job in self.plan_jobs():
+                processor_name = self.get_processor(job['base'], verbose=False).__name__
+                if (self.manifest is not None and not force
+                        and self.manifest.is_valid('gold', job['output_path'], job['input_paths'], processor_name)):
+                    results.append(new_result('skipped', base=job['base'], city=job['city']))
                 else:
-                    print(f'🚫 {subpasta_path} não é uma pasta válida (ou é base_disaster).')
+                    pending.append(job)
+            results += run_jobs(self.run_job, pending, parallel, max_workers, on_result=self.record_job)
+            print_summary(results, lambda r: f"{r['base']}/{r['city']}")
+            return results
+
 if __name__ == '__main__':        
     # Uso da classe:
     silver_data_path = 'data/silver'
     output_data_path = 'data/gold'
+    manifest_path = 'data/manifest.json'
+    file_path_mapping_column = 'configs/dataframe_column_mapping.json'
+    max_workers = os.cpu_count()
+    hourly_statistics = ['mean', 'min', 'max']
 
     # Criar uma instância da classe
-    processor = SilverToGold(silver_data_path, output_data_path)
+    processor = SilverToGold(silver_data_path, output_data_path, manifest_path, file_path_mapping_column,
+                             hourly_statistics=hourly_statistics)
     start_time = time.time()
 
     # Process the subfolders and files
-    processor.process_subfolders()
+    processor.process_subfolders(parallel=True, max_workers=max_workers)
 
     # Measure the end time of execution
     end_time = time.time()
@@ -0,0 +1,191 @@
+import os
+import time
+import importlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from src.train.preprocessing import Preprocessor
+from src.train.resampling import ResamplingCache
+from src.train.tracking import RunLogger
+from src.train.trainer import get_family, fit_model, evaluate
+from src.train.tuning import VALIDATION_SIZE, EARLY_STOPPING_ROUNDS
+
+CV_MODES = ['walk_forward', 'blocked']
+CV_METRICS = ['precision', 'recall', 'f1_score', 'auc_roc']
+
+# Dados do processo, recebidos uma vez por worker e compartilhados por todos os folds
+_FOLD_DATA = {}
+
+
+def time_series_folds(dates, n_splits=5, gap=0, mode='walk_forward'):
+    """
+    Splits rows in time order into folds whose test set is a contiguous block of days.
+    Args:
+        dates (pd.Series): Date of each row, sorted.
+        n_splits (int): Number of folds.
+        gap (int): Days left out between the training rows and the test block, so the
+            autocorrelation of the weather series does not leak the test days into training.
+        mode (str): 'walk_forward' trains on every day before the test block (expanding window);
+            'blocked' trains on the days before and after it, both apart from the block by the gap.
+    Returns:
+        list: (train positions, test positions) of each fold.
+    """
+    if mode not in CV_MODES:
+        raise ValueError(f"Unknown cross-validation mode {mode}. Use {CV_MODES}.")
+    dates = pd.Series(pd.to_datetime(dates)).reset_index(drop=True)
+    positions = np.arange(len(dates))
+    gap = pd.Timedelta(days=gap)
+    # No walk-forward o primeiro bloco só é usado para treino
+    blocks = np.array_split(positions, n_splits + 1 if mode == 'walk_forward' else n_splits)
+    test_blocks = blocks[1:] if mode == 'walk_forward' else blocks
+
+    folds = []
+    for test in test_blocks:
+        start, end = dates.iloc[test[0]], dates.iloc[test[-1]]
+        train = (dates < start - gap).to_numpy()
+        if mode == 'blocked':
+            train |= (dates > end + gap).to_numpy()
+        folds.append((positions[train], test))
+    return folds
+
+
+def init_fold_worker(df, y, modules=()):
+    """
+    Keeps the gold rows in the worker, so they are sent once per process instead of once per fold.
+    The modules of the families are imported so they are registered with any start method.
+    """
+    for module in modules:
+        importlib.import_module(module)
+    _FOLD_DATA['df'], _FOLD_DATA['y'] = df, y
+
+
+def run_fold(fold, train_idx, test_idx, family_name, base, city, balancing_method=None, cache_dir=None,
+             n_trials=50, pruner='median', n_jobs=None, validation_size=VALIDATION_SIZE,
+             early_stopping_rounds=EARLY_STOPPING_ROUNDS):
+    """
+    Tunes, refits and scores a family on a fold, with the data kept by init_fold_worker.
+    The preprocessing is fitted on the training rows of the fold, and each fold has its own
+    in-memory study, tuned on the end of its training window.
+    Returns:
+        dict: Fold number, test metrics, timings, best iteration and test period of the fold.
+    """
+    df, y = _FOLD_DATA['df'], _FOLD_DATA['y']
+    family = get_family(family_name)
+    preprocessor = Preprocessor().fit(df.iloc[train_idx])
+    X_train, y_train = preprocessor.transform_frame(df.iloc[train_idx]), y.iloc[train_idx]
+    X_test, y_test = preprocessor.transform_frame(df.iloc[test_idx]), y.iloc[test_idx]
+    timings = {}
+    cache = ResamplingCache(cache_dir) if cache_dir else None
+    study_name = f"{family.name}_{base}_{city}_{balancing_method}_cv{fold}"
+    model, _, best_iteration = fit_model(family, X_train, y_train, study_name, base, city, balancing_method, cache,
+                                         n_trials, 1, None, pruner, n_jobs, validation_size, early_stopping_rounds,
+                                         time_ordered=True, timings=timings)
+    metrics, _ = evaluate(family, model, X_test, y_test, n_jobs)
+    return {'fold': fold, 'metrics': metrics, 'timings': timings, 'best_iteration': best_iteration,
+            'train_size': len(train_idx), 'test_size': len(test_idx)}
+
+
+def cross_validate(family_name, df, collumn_target, base, city, balancing_method=None, cache_dir=None,
+                   mode='walk_forward', n_splits=5, gap=7, n_trials=50, pruner='median', fold_workers=None,
+                   n_jobs=None, validation_size=VALIDATION_SIZE, early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+                   wait=True):
+    """
+    Time-aware cross-validation of a family, logged as a single MLflow run.
+    The rows are sorted by date and split by time_series_folds; the folds run in parallel
+    processes that share the same gold rows, each fitting its own preprocessing. Each fold reports
+    its metrics as a step of fold_<metric>, and the run gets the mean and standard deviation
+    (<metric>_mean, <metric>_std).
+    Folds whose training or test rows have a single class are skipped.
+    Args:
+        family_name (str): Name of a registered family.
+        df (pd.DataFrame): Gold DataFrame, with the date column.
+        collumn_target (str): Name of the target column.
+        base (str): Base name.
+        city (str): City name.
+        balancing_method (str): Balancing method, or None.
+        cache_dir (str): Directory of the resampling cache shared by the folds, or None.
+        mode (str): 'walk_forward' or 'blocked'.
+        n_splits (int): Number of folds.
+        gap (int): Days between the training rows and the test block.
+        n_trials (int): Number of Optuna trials of each fold.
+        pruner (str): 'median', 'hyperband' or None.
+        fold_workers (int): Folds running at the same time. Default is min(n_splits, CPUs).
+        n_jobs (int): Threads per model. Default is the number of CPUs divided by fold_workers.
+        validation_size (float): Fraction of each training window used to score the trials.
+        early_stopping_rounds (int): Patience of the early stopping (families with training rounds).
+        wait (bool): If True, waits until the run is ended in the background (see train).
+    Returns:
+        bool: True if at least one fold was evaluated and the run was logged.
+    """
+    try:
+        family = get_family(family_name)
+        start_time = time.time()
+        df = df.sort_values('date', kind='stable')
+        y = df[collumn_target]
+
+        folds = []
+        for fold, (train_idx, test_idx) in enumerate(time_series_folds(df['date'], n_splits, gap, mode)):
+            if y.iloc[train_idx].nunique() < 2 or y.iloc[test_idx].nunique() < 2:
+                print(f"Fold {fold} ignorado: treino ou teste com uma só classe.")
+                continue
+            folds.append((fold, train_idx, test_idx))
+        if not folds:
+            raise ValueError("no fold with both classes in the training and test rows")
+
+        fold_workers = min(len(folds), fold_workers or os.cpu_count() or 1)
+        # Threads por modelo, para os folds não disputarem os mesmos núcleos
+        if n_jobs is None:
+            n_jobs = max(1, (os.cpu_count() or 1) // fold_workers)
+        options = dict(family_name=family_name, base=base, city=city, balancing_method=balancing_method,
+                       cache_dir=cache_dir, n_trials=n_trials, pruner=pruner, n_jobs=n_jobs,
+                       validation_size=validation_size, early_stopping_rounds=early_stopping_rounds)
+
+        results = []
+        if fold_workers > 1:
+            with ProcessPoolExecutor(max_workers=fold_workers, initializer=init_fold_worker,
+                                     initargs=(df, y, [type(family).__module__])) as executor:
+                futures = [executor.submit(run_fold, fold, train_idx, test_idx, **options)
+                           for fold, train_idx, test_idx in folds]
+                for future in as_completed(futures):
+                    results.append(future.result())
+        else:
+            init_fold_worker(df, y)
+            try:
+                results = [run_fold(fold, train_idx, test_idx, **options) for fold, train_idx, test_idx in folds]
+            finally:
+                _FOLD_DATA.clear()
+        results.sort(key=lambda result: result['fold'])
+
+        with RunLogger(f"DataBase_{base}", f"{family.run_name} CV - {city}") as run:
+            run.log_params({
+                "balancing_method": balancing_method if balancing_method else "None",
+                "collumn_target": collumn_target,
+                "base": base,
+                "city": city,
+                "n_trials": n_trials,
+                "cv_mode": mode,
+                "cv_splits": n_splits,
+                "cv_gap_days": gap,
+            })
+            for result in results:
+                run.log_metrics({f"fold_{key}": value for key, value in result['metrics'].items()}, step=result['fold'])
+                if result['best_iteration'] is not None:
+                    run.log_metric("fold_best_iteration", result['best_iteration'], step=result['fold'])
+            for metric in CV_METRICS:
+                values = np.array([result['metrics'][metric] for result in results])
+                run.log_metrics({f"{metric}_mean": values.mean(), f"{metric}_std": values.std()})
+            run.log_metrics({
+                "evaluated_folds": len(results),
+                "training_time": time.time() - start_time,
+            })
+        if wait and not run.wait():
+            raise RuntimeError(f"MLflow logging failed (run {run.run_id})")
+        print(f"{family.run_name} CV ({mode}, {len(results)} folds): " + ", ".join(
+            f"{metric} {np.mean([r['metrics'][metric] for r in results]):.3f}" for metric in CV_METRICS))
+        return True
+
+    except Exception as e:
+        print(f"Erro na validação cruzada do modelo {family_name}: {e}")
+        return False
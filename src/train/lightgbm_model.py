@@ -1,99 +1,82 @@
-import os
-import time
-import tempfile
-import mlflow
-import mlflow.sklearn
-import optuna
+import mlflow.lightgbm
 import lightgbm as lgb
-import matplotlib.pyplot as plt
-import seaborn as sns
 
-from sklearn.metrics import (
-    roc_auc_score,
-    confusion_matrix,
-    precision_score,
-    recall_score,
-    f1_score
-)
-from imblearn.over_sampling import SMOTE, ADASYN
-from imblearn.under_sampling import RandomUnderSampler
-from imblearn.combine import SMOTEENN
+from src.train.trainer import ModelFamily, register_family
+from src.train.tuning import report_intermediate, MAX_ROUNDS
 
 
-def train_lightgbm(X_train, y_train, X_test, y_test, collumn_target, base, city, balancing_method=None):
-    metodos_balanceamento = {
-        'SMOTE': SMOTE(random_state=42),
-        'ADASYN': ADASYN(random_state=42),
-        'RandomUnderSampler': RandomUnderSampler(random_state=42),
-        'SMOTEENN': SMOTEENN(random_state=42)
-    }
+def pruning_callback(trial, metric='auc'):
+    '''
+    LightGBM callback that reports the validation score of each boosting round to the trial.
+    '''
+    def callback(env):
+        for _, eval_name, value, _ in env.evaluation_result_list:
+            if eval_name == metric:
+                report_intermediate(trial, env.iteration, value)
+    return callback
 
-    try:
-        if balancing_method in metodos_balanceamento:
-            X_train, y_train = metodos_balanceamento[balancing_method].fit_resample(X_train, y_train)
 
-        def objective(trial):
-            params = {
-                'num_leaves': trial.suggest_int('num_leaves', 20, 100),
-                'max_depth': trial.suggest_int('max_depth', -1, 15),
-                'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.3),
-                'n_estimators': trial.suggest_categorical('n_estimators', [100, 200, 500]),
-                'min_gain_to_split': trial.suggest_float('min_gain_to_split', 0.0, 0.1),
-                'random_state': 42
-            }
+class LightGBMFamily(ModelFamily):
+    '''
+    LightGBM trained with the native API on lgb.Dataset, built once per study.
+    '''
+    name = 'lightgbm'
+    run_name = 'LightGBM Optuna'
+    artifact_path = 'lightgbm_model'
+    flavor = mlflow.lightgbm
+    plot_labels = ['Negativo', 'Positivo']
+    early_stopping = True
 
-            model = lgb.LGBMClassifier(**params)
-            model.fit(X_train, y_train)
-            preds = model.predict(X_test)
-            return recall_score(y_test, preds)
+    def search_space(self, trial):
+        return {
+            'num_leaves': trial.suggest_int('num_leaves', 20, 100),
+            'max_depth': trial.suggest_int('max_depth', -1, 15),
+            'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.3),
+            'min_gain_to_split': trial.suggest_float('min_gain_to_split', 0.0, 0.1),
+        }
 
-        experiment_name = f"DataBase_{base}"
-        mlflow.set_experiment(experiment_name)
-        start_time = time.time()
+    def get_params(self, params, n_jobs=None):
+        '''
+        Completes the hyperparameters of a trial with the fixed parameters of the native API.
+        '''
+        return {**params, 'objective': 'binary', 'metric': 'auc', 'seed': 42, 'num_threads': n_jobs or 0,
+                'verbose': -1}
 
-        with mlflow.start_run(run_name=f"LightGBM Optuna - {city}"):
-            study = optuna.create_study(direction='maximize')
-            study.optimize(objective, n_trials=50)
+    def create_estimator(self, params, n_jobs=None):
+        '''
+        Equivalent sklearn-API classifier, for use outside the engine (e.g. in a sklearn pipeline);
+        the engine trains the native booster.
+        '''
+        return lgb.LGBMClassifier(**params, n_estimators=MAX_ROUNDS, objective='binary', random_state=42,
+                                  n_jobs=n_jobs, verbose=-1)
 
-            best_params = study.best_params
-            best_model = lgb.LGBMClassifier(**best_params, random_state=42)
-            best_model.fit(X_train, y_train)
-            y_pred = best_model.predict(X_test)
+    def build_data(self, X_fit, y_fit, X_val, y_val, n_jobs=None):
+        # Os dados brutos são mantidos (free_raw_data=False) para o Dataset ser reusado em vários treinos;
+        # a validação usa os mesmos bins do treino
+        dataset_params = {'verbose': -1, 'num_threads': n_jobs or 0, 'seed': 42}
+        dtrain = lgb.Dataset(X_fit, y_fit, params=dataset_params, free_raw_data=False).construct()
+        dval = lgb.Dataset(X_val, y_val, reference=dtrain, free_raw_data=False).construct()
+        return dtrain, dval, X_val
 
-            auc_roc = roc_auc_score(y_test, best_model.predict_proba(X_test)[:, 1])
-            precision = precision_score(y_test, y_pred)
-            recall = recall_score(y_test, y_pred)
-            f1 = f1_score(y_test, y_pred)
+    def fit_trial(self, trial, params, data, n_jobs=None, early_stopping_rounds=None):
+        dtrain, dval, X_val = data
+        callbacks = [pruning_callback(trial)]
+        # O número de rodadas é escolhido pelo early stopping na validação, se estiver ligado
+        if early_stopping_rounds is not None:
+            callbacks.append(lgb.early_stopping(early_stopping_rounds, verbose=False))
+        booster = lgb.train(self.get_params(params, n_jobs), dtrain, num_boost_round=MAX_ROUNDS, valid_sets=[dval],
+                            callbacks=callbacks)
+        best_iteration = booster.best_iteration if early_stopping_rounds is not None else None
+        # Sem early stopping, a previsão usa todas as rodadas
+        proba = booster.predict(X_val, num_iteration=best_iteration)
+        return proba, best_iteration
 
-            mlflow.log_param("balancing_method", balancing_method if balancing_method else "None")
-            mlflow.log_params(best_params)
-            mlflow.log_param("collumn_target", collumn_target)
-            mlflow.log_param("base", base)
-            mlflow.log_param("city", city)
-            mlflow.log_metric("training_time", time.time() - start_time)
-            mlflow.log_metric("precision", precision)
-            mlflow.log_metric("recall", recall)
-            mlflow.log_metric("f1_score", f1)
-            mlflow.log_metric("auc_roc", auc_roc)
+    def fit_final(self, params, X_train, y_train, n_jobs=None, n_rounds=None):
+        dtrain = lgb.Dataset(X_train, y_train, params={'verbose': -1}, free_raw_data=False)
+        return lgb.train(self.get_params(params, n_jobs), dtrain, num_boost_round=n_rounds or MAX_ROUNDS)
 
-            mlflow.sklearn.log_model(best_model, "lightgbm_model")
+    def predict_proba(self, model, X, n_jobs=None):
+        return model.predict(X, num_threads=n_jobs or 0)
 
-            # Matriz de confusão
-            cm = confusion_matrix(y_test, y_pred)
-            plt.figure(figsize=(6, 4))
-            sns.heatmap(cm, annot=True, fmt='d', cmap='Blues',
-                        xticklabels=['Negativo', 'Positivo'],
-                        yticklabels=['Negativo', 'Positivo'])
-            plt.xlabel('Predito')
-            plt.ylabel('Real')
-            plt.title('Matriz de Confusão')
 
-            with tempfile.TemporaryDirectory() as temp_dir:
-                timestamp = int(time.time())
-                cm_path = os.path.join(temp_dir, f"confusion_matrix_{timestamp}.png")
-                plt.savefig(cm_path)
-                mlflow.log_artifact(cm_path, artifact_path="plots")
-            plt.close()
-
-    except Exception as e:
-        print(f"Erro ao treinar o modelo : {e}")
+register_family(LightGBMFamily())
@@ -1,12 +1,14 @@
-import src.train.decision_tree as decision_tree
-import src.train.lightgbm_model as lightgbm_model
-import src.train.xgboost_model as xgboost_model
-import src.utils.Utils as utils  
-from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import OneHotEncoder
-import pandas as pd
-import os 
+# Os módulos dos modelos registram suas famílias no motor de treino
+import src.train.decision_tree
+import src.train.lightgbm_model
+import src.train.xgboost_model
+from src.train.trainer import MODEL_FAMILIES, train
+from src.train.cross_validation import cross_validate
+from src.train.preprocessing import Preprocessor, split_dataset
+import src.utils.Utils as utils
+from src.utils.catalog import DataCatalog
+from src.train.resampling import ResamplingCache
+from src.train.tracking import wait_for_logging
 
 # Listas de cidades para cada base
 cities_base_1 = ['albuquerque', 'miami', 'chicago']
@@ -25,20 +27,52 @@ base_to_cities = {
     'base_3': cities_base_3,
 }
 Balancing_Methods = [None,'SMOTE', 'ADASYN', 'RandomUnderSampler', 'SMOTEENN']
-def train_model(df,city,base):
-    X_train, X_test, y_train, y_test = train_test_split(df.drop(columns=['disaster_occurred']), df['disaster_occurred'], test_size=0.3, random_state=42,stratify=df['disaster_occurred'])
+# Busca de hiperparâmetros: trials por estudo, processos por estudo, armazenamento compartilhado e poda
+TUNING = {
+    'n_trials': 50,
+    'n_workers': 4,
+    'storage': 'data/optuna/studies.log',
+    'pruner': 'median',
+}
+# Validação cruzada temporal (None = divisão aleatória treino/teste), ex.: {'mode': 'walk_forward', 'n_splits': 5, 'gap': 7}
+CROSS_VALIDATION = None
+def train_model(df,city,base,cache=None,tuning=None,cv=None):
+    if cv:
+        cross_validate_model(df, city, base, cache, tuning, cv)
+        return
+    # Pré-processamento ajustado só no treino e registrado junto com cada modelo
+    X_train, X_test, y_train, y_test, preprocessor = split_dataset(df, 'disaster_occurred', test_size=0.3, random_state=42)
     #print(f"X_train: {X_train.shape}, y_train: {y_train.shape}, X_test: {X_test.shape}, y_test: {y_test.shape}")
     print(f"base: {base}, city: {city}, column_target: {y_test.name}")
     '''
     decision_tree.train_decision_tree(X_train, y_train, X_test, y_test,y_test.name,base,city)
     lightgbm_model.train_lightgbm(X_train, y_train, X_test, y_test, y_test.name,base,city)
     xgboost_model.train_xgboost(X_train, y_train, X_test, y_test, y_test.name,base,city)'''
+    # Cada conjunto balanceado é calculado uma vez e compartilhado pelos 3 modelos
+    if cache is None:
+        cache = ResamplingCache()
+    tuning = tuning or {}
     for method in Balancing_Methods:
-        decision_tree.train_decision_tree(X_train, y_train, X_test, y_test,y_test.name,base,city,method)
-        lightgbm_model.train_lightgbm(X_train, y_train, X_test, y_test, y_test.name,base,city,method)
-        xgboost_model.train_xgboost(X_train, y_train, X_test, y_test, y_test.name,base,city,method)
+        for family_name in MODEL_FAMILIES:
+            # Gravação do modelo em segundo plano durante o treino do próximo; aguardada no fim (wait_for_logging)
+            train(family_name, X_train, y_train, X_test, y_test, y_test.name, base, city, method, cache, **tuning,
+                  preprocessor=preprocessor, wait=False)
+    print(f"Resampling cache: {cache.hits} hits, {cache.misses} misses")
+    # Os conjuntos desta cidade não são usados pelas próximas
+    cache.clear()
     print("Success in training models")
 
+def cross_validate_model(df, city, base, cache=None, tuning=None, cv=None):
+    """Avalia todas as famílias e métodos de balanceamento com validação cruzada temporal."""
+    print(f"base: {base}, city: {city}, column_target: disaster_occurred, cv: {cv}")
+    tuning = tuning or {}
+    cache_dir = cache.cache_dir if cache is not None else None
+    for method in Balancing_Methods:
+        for family_name in MODEL_FAMILIES:
+            cross_validate(family_name, df, 'disaster_occurred', base, city, method, cache_dir,
+                           n_trials=tuning.get('n_trials', 50), pruner=tuning.get('pruner', 'median'), **cv)
+    print("Success in cross-validating models")
+
 def load_data_for_base(file_path, city, base, dataframe_dict):
     """Função que carrega o DataFrame para a base correspondente."""
     if city in base_to_cities[base]:
@@ -46,47 +80,27 @@ def load_data_for_base(file_path, city, base, dataframe_dict):
         dataframe_dict[city] = df
         print(f"DataFrame para cidade {city} carregado na {base}.")
 def preprocess_dataframe(df):
-    scaler = StandardScaler()
-    encoder = OneHotEncoder(sparse_output=False) 
-
-    cols_to_exclude = ['date', 'season', 'eventType', 'disaster_occurred']
-    cols_to_scale = [col for col in df.columns if col not in cols_to_exclude]
-
-    season_encoded = encoder.fit_transform(df[['season']])
-    df_scaled_values = scaler.fit_transform(df[cols_to_scale])
-    
-    df_scaled = pd.DataFrame(df_scaled_values, columns=cols_to_scale, index=df.index)
-    season_encoded_df = pd.DataFrame(season_encoded, columns=encoder.get_feature_names_out(['season']), index=df.index)
-
-    df_final = pd.concat([df[cols_to_exclude], df_scaled, season_encoded_df], axis=1)
-    df_final = utils.extract_date_components(df_final, 'date')
-    df_final = df_final.drop(columns=['date', 'eventType', 'season'])
-
+    """Pré-processa um DataFrame inteiro (ajuste em todas as linhas); o treino usa split_dataset, ajustado só no treino."""
+    df_final = Preprocessor().fit_transform_frame(df)
+    df_final.insert(0, 'disaster_occurred', df['disaster_occurred'])
     return df_final
 
 
 if __name__ == "__main__":
-    gold_data_path = 'data/gold'
-    
-    for dir in os.listdir(gold_data_path):
-        file_dir = os.path.join(gold_data_path, dir)
-        print(f'Analisando diretório: {file_dir} ...\n')
-        
-        for paths in os.listdir(file_dir):
-            file_path = os.path.join(file_dir, paths)
-            city = paths.split('_')[0]
+    # Índice dos arquivos da camada gold, lido uma única vez
+    catalog = DataCatalog('data', 'configs/citys.json', layers=['gold'])
+    dataframes_by_base = {'base_1': dataframe_base_1, 'base_2': dataframe_base_2, 'base_3': dataframe_base_3}
+
+    for base, dataframe_dict in dataframes_by_base.items():
+        print(f'Analisando base: {base} ...\n')
+        for city in base_to_cities[base]:
+            file_path = catalog.get_path('gold', base, city)
+            if file_path is None:
+                print(f'Arquivo da cidade {city} não encontrado na {base}.')
+                continue
             print(f'Analisando cidade: {city} ...')
-            print(f'Arquivo: {paths} ... \n')
-
-            match dir:
-                case 'base_1':
-                    load_data_for_base(file_path, city, 'base_1', dataframe_base_1)
-                case 'base_2':
-                    load_data_for_base(file_path, city, 'base_2', dataframe_base_2)
-                case 'base_3':
-                    load_data_for_base(file_path, city, 'base_3', dataframe_base_3)
-                case _:
-                    pass
+            print(f'Arquivo: {file_path} ... \n')
+            load_data_for_base(file_path, city, base, dataframe_dict)
 
         print("-----/-----/"*10)
 
@@ -97,12 +111,16 @@ if __name__ == "__main__":
     print(f'Chaves em dataframe_base_2: {list(dataframe_base_2.keys())}')
     print(f'Chaves em dataframe_base_3: {list(dataframe_base_3.keys())}')
     list_dataframes = [dataframe_base_1, dataframe_base_2, dataframe_base_3]
-    
+    # Cache dos conjuntos balanceados, mantido em disco entre execuções
+    resampling_cache = ResamplingCache('data/cache/resampling')
+    resampling_cache.evict()
+
     for base_name, dataframe_dict in zip(['base_1', 'base_2', 'base_3'], list_dataframes):
         for city, df in dataframe_dict.items():
             print(f'Treinando modelos para {city} na {base_name}...')
-            df_final = preprocess_dataframe(df)
-            train_model(df_final, city, base_name)
+            train_model(df, city, base_name, resampling_cache, TUNING, CROSS_VALIDATION)
+    # Espera os modelos e gráficos ainda sendo gravados em segundo plano
+    wait_for_logging()
 
 
 
@@ -0,0 +1,120 @@
+import os
+import tempfile
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+from src.data_transform.labels import get_label_columns
+
+TARGET_COLUMN = 'disaster_occurred'
+PREPROCESSOR_FILE = 'preprocessor.joblib'
+
+
+class Preprocessor:
+    """
+    Preprocessing of the gold DataFrames, fitted on the training rows only.
+    Standardizes the weather columns (like StandardScaler, ignoring missing values), one-hot encodes
+    the season and adds the year/month/day of the date (the features preprocess_dataframe used to
+    build on the whole DataFrame). The fitted state is a few NumPy arrays, saved with joblib next to
+    the model, so new data is transformed without refitting.
+    """
+    def __init__(self, date_column='date', season_column='season'):
+        self.date_column = date_column
+        self.season_column = season_column
+        self.scale_columns = None
+        self.mean = None
+        self.scale = None
+        self.seasons = None
+
+    @property
+    def feature_names(self):
+        return (self.scale_columns + [f'{self.season_column}_{season}' for season in self.seasons]
+                + ['year', 'month', 'day'])
+
+    def fit(self, df):
+        """
+        Learns the columns, the mean and standard deviation of each weather column and the seasons.
+        Args:
+            df (pd.DataFrame): Gold training rows.
+        Returns:
+            Preprocessor: self.
+        """
+        # Colunas de rótulo (eventType, event_count, alvos por evento) não podem virar features
+        excluded = {self.date_column, self.season_column, *get_label_columns(df)}
+        self.scale_columns = [col for col in df.columns if col not in excluded]
+        values = df[self.scale_columns].to_numpy(dtype=np.float64)
+        self.mean = np.nanmean(values, axis=0)
+        scale = np.nanstd(values, axis=0)
+        # Colunas constantes não são escaladas, como no StandardScaler
+        self.scale = np.where(scale > 0, scale, 1.0)
+        self.seasons = np.array(sorted(df[self.season_column].dropna().unique()), dtype=object)
+        return self
+
+    def transform(self, df):
+        """
+        Transforms a batch of rows into a float32 matrix with the columns of feature_names.
+        Seasons not seen in the fit are encoded as zeros.
+        Args:
+            df (pd.DataFrame): Gold rows (the label columns are ignored).
+        Returns:
+            np.ndarray: Matrix of shape (rows, features).
+        """
+        if self.scale_columns is None:
+            raise ValueError('Preprocessor is not fitted.')
+        n_scale, n_seasons = len(self.scale_columns), len(self.seasons)
+        output = np.empty((len(df), n_scale + n_seasons + 3), dtype=np.float32)
+        # Cada bloco é escrito direto na matriz de saída, sem concatenar DataFrames
+        values = df[self.scale_columns].to_numpy(dtype=np.float64)
+        output[:, :n_scale] = (values - self.mean) / self.scale
+        season = df[self.season_column].to_numpy(dtype=object)
+        output[:, n_scale:n_scale + n_seasons] = season[:, None] == self.seasons[None, :]
+        dates = pd.to_datetime(df[self.date_column])
+        output[:, -3] = dates.dt.year
+        output[:, -2] = dates.dt.month
+        output[:, -1] = dates.dt.day
+        return output
+
+    def transform_frame(self, df):
+        """
+        Same as transform, as a DataFrame with the feature names and the index of df.
+        """
+        return pd.DataFrame(self.transform(df), columns=self.feature_names, index=df.index)
+
+    def fit_transform_frame(self, df):
+        return self.fit(df).transform_frame(df)
+
+    def save(self, path):
+        """
+        Saves the fitted preprocessor (written to a temporary file and renamed).
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path) or '.', suffix='.tmp', delete=False) as file:
+            joblib.dump(self, file)
+        os.replace(file.name, path)
+
+    @staticmethod
+    def load(path):
+        preprocessor = joblib.load(path)
+        if not isinstance(preprocessor, Preprocessor):
+            raise TypeError(f'{path} does not contain a Preprocessor.')
+        return preprocessor
+
+
+def split_dataset(df, target=TARGET_COLUMN, test_size=0.3, random_state=42):
+    """
+    Splits a gold DataFrame into stratified train/test sets and preprocesses both with a
+    Preprocessor fitted on the training rows only.
+    Args:
+        df (pd.DataFrame): Gold DataFrame.
+        target (str): Target column.
+        test_size (float): Fraction of the rows used for testing.
+        random_state (int): Seed of the split.
+    Returns:
+        tuple: (X_train, X_test, y_train, y_test, preprocessor)
+    """
+    df_train, df_test = train_test_split(df, test_size=test_size, random_state=random_state, stratify=df[target])
+    preprocessor = Preprocessor().fit(df_train)
+    return (preprocessor.transform_frame(df_train), preprocessor.transform_frame(df_test),
+            df_train[target], df_test[target], preprocessor)
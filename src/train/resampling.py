@@ -0,0 +1,207 @@
+import os
+import hashlib
+import tempfile
+import numpy as np
+import pandas as pd
+from imblearn.over_sampling import SMOTE, ADASYN
+from imblearn.under_sampling import RandomUnderSampler
+from imblearn.combine import SMOTEENN
+
+from src.utils.cache import evict_cache
+
+"""
+Balanced Methods:
+- SMOTE
+- ADASYN
+- RandomUnderSampler
+- SMOTEENN
+"""
+# Limites do cache em disco: entradas sem uso há 30 dias e o excedente de 4 GB são removidos
+CACHE_MAX_AGE = 30 * 24 * 60 * 60
+CACHE_MAX_BYTES = 4 * 1024 ** 3
+
+BALANCING_METHODS = {
+    'SMOTE': SMOTE,
+    'ADASYN': ADASYN,
+    'RandomUnderSampler': RandomUnderSampler,
+    'SMOTEENN': SMOTEENN,
+}
+
+
+def get_sampler(balancing_method, random_state=42):
+    """
+    Builds the sampler of a balancing method.
+    Args:
+        balancing_method (str): Name of the method (key of BALANCING_METHODS).
+        random_state (int): Random seed.
+    Returns:
+        Sampler instance, or None if the method is None or unknown.
+    """
+    if balancing_method not in BALANCING_METHODS:
+        return None
+    return BALANCING_METHODS[balancing_method](random_state=random_state)
+
+
+def hash_split(X, y):
+    """
+    Hashes the content of a training split (columns, index and values).
+    Args:
+        X (pd.DataFrame): Features.
+        y (pd.Series): Target.
+    Returns:
+        str: SHA-256 hex digest.
+    """
+    digest = hashlib.sha256()
+    digest.update('|'.join(map(str, X.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(X, index=True).to_numpy().tobytes())
+    digest.update(pd.util.hash_pandas_object(y, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class ResamplingCache:
+    """
+    Cache of resampled training sets, shared by the model families trained on the same split.
+    Entries are keyed by a hash of (base, city, split, method), so a resampled set is computed
+    only once per split and balancing method. If a cache directory is given the arrays are also
+    saved as .npy files and loaded back memory-mapped, which keeps them across runs; evict trims
+    the directory by age and size.
+    """
+    def __init__(self, cache_dir=None, random_state=42, max_age=CACHE_MAX_AGE, max_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.random_state = random_state
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.memory = {}
+        self.hits = 0
+        self.misses = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def get_key(self, X, y, balancing_method, base, city):
+        """
+        Builds the cache key of a resampled set.
+        """
+        parts = [base, city, balancing_method, str(self.random_state), hash_split(X, y)]
+        return hashlib.sha256('|'.join(map(str, parts)).encode()).hexdigest()
+
+    def get_paths(self, key):
+        """
+        Returns the paths of the .npy files of an entry.
+        """
+        return os.path.join(self.cache_dir, f'{key}_X.npy'), os.path.join(self.cache_dir, f'{key}_y.npy')
+
+    def load(self, key):
+        """
+        Loads an entry from memory or, if there is a cache directory, from disk (memory-mapped).
+        Returns:
+            tuple: (X, y) arrays, or None if the entry is not cached.
+        """
+        if key in self.memory:
+            return self.memory[key]
+        if not self.cache_dir:
+            return None
+        try:
+            arrays = self.load_from_disk(key)
+        except (FileNotFoundError, ValueError):
+            # Entrada ausente, removida pela limpeza do cache ou incompleta: é calculada de novo
+            return None
+        # Entradas lidas contam como recentes para a limpeza, que remove as mais antigas primeiro
+        for path in self.get_paths(key):
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        self.memory[key] = arrays
+        return arrays
+
+    def store(self, key, X_values, y_values):
+        """
+        Stores an entry in memory and, if there is a cache directory, on disk.
+        Each writer saves to its own temporary file and renames it, so a partial file is never read.
+        Jobs of the same split may store the same entry at the same time: their files are equal, so
+        whichever rename wins is kept, and a writer whose rename fails uses the file already in place.
+        """
+        if self.cache_dir:
+            for path, values in zip(self.get_paths(key), (X_values, y_values)):
+                with tempfile.NamedTemporaryFile(dir=self.cache_dir, suffix='.tmp', delete=False) as file:
+                    np.save(file, values)
+                try:
+                    os.replace(file.name, path)
+                except OSError:
+                    os.remove(file.name)
+                    if not os.path.exists(path):
+                        raise
+            X_values, y_values = self.load_from_disk(key)
+        self.memory[key] = (X_values, y_values)
+        return X_values, y_values
+
+    def load_from_disk(self, key):
+        """
+        Loads the .npy files of an entry memory-mapped (read-only).
+        """
+        x_path, y_path = self.get_paths(key)
+        return np.load(x_path, mmap_mode='r'), np.load(y_path, mmap_mode='r')
+
+    def resample(self, X_train, y_train, balancing_method, base, city):
+        """
+        Returns the training set balanced with a method, computing it only if it is not cached.
+        Args:
+            X_train (pd.DataFrame): Training features.
+            y_train (pd.Series): Training target.
+            balancing_method (str): Name of the method. If None, the split is returned unchanged.
+            base (str): Base name.
+            city (str): City name.
+        Returns:
+            tuple: (X_train, y_train) resampled.
+        """
+        sampler = get_sampler(balancing_method, self.random_state)
+        if sampler is None:
+            return X_train, y_train
+        key = self.get_key(X_train, y_train, balancing_method, base, city)
+        arrays = self.load(key)
+        if arrays is None:
+            self.misses += 1
+            X_resampled, y_resampled = sampler.fit_resample(X_train, y_train)
+            arrays = self.store(key, np.asarray(X_resampled), np.asarray(y_resampled))
+        else:
+            self.hits += 1
+        X_values, y_values = arrays
+        return pd.DataFrame(X_values, columns=X_train.columns), pd.Series(y_values, name=y_train.name)
+
+    def evict(self):
+        """
+        Removes the files of the cache directory older than max_age, then the least recently
+        used ones until the directory is under max_bytes.
+        Returns:
+            tuple: (number of removed files, bytes freed)
+        """
+        if not self.cache_dir:
+            return 0, 0
+        return evict_cache(self.cache_dir, self.max_age, self.max_bytes)
+
+    def clear(self):
+        """
+        Drops the in-memory entries (the files in the cache directory are kept).
+        """
+        self.memory.clear()
+
+
+def balance_data(X_train, y_train, balancing_method, base, city, cache=None):
+    """
+    Balances a training set, through the cache when one is given.
+    Args:
+        X_train (pd.DataFrame): Training features.
+        y_train (pd.Series): Training target.
+        balancing_method (str): Name of the method, or None.
+        base (str): Base name.
+        city (str): City name.
+        cache (ResamplingCache): Shared cache. If None, the set is resampled directly.
+    Returns:
+        tuple: (X_train, y_train) resampled.
+    """
+    if cache is not None:
+        return cache.resample(X_train, y_train, balancing_method, base, city)
+    sampler = get_sampler(balancing_method)
+    if sampler is None:
+        return X_train, y_train
+    return sampler.fit_resample(X_train, y_train)
@@ -0,0 +1,250 @@
+import os
+import json
+import time
+import hashlib
+import argparse
+
+import src.utils.Utils as utils
+from src.data_transform.manifest import Manifest
+from src.train.main import base_to_cities, Balancing_Methods, TUNING
+from src.train.cross_validation import CV_MODES, cross_validate
+from src.train.preprocessing import split_dataset
+from src.train.resampling import ResamplingCache
+from src.train.tracking import get_experiment_id
+from src.train.trainer import MODEL_FAMILIES, OBJECTIVE_VERSION, train
+from src.train.tuning import VALIDATION_SIZE, EARLY_STOPPING_ROUNDS
+from src.utils.catalog import DataCatalog
+from src.utils.jobs import new_result, capture_job, run_jobs, format_result, print_summary
+
+# Modelos do grid: as famílias registradas no motor de treino (importadas por src.train.main)
+MODELS = list(MODEL_FAMILIES)
+
+
+def method_name(balancing_method):
+    """Name of a balancing method in job ids and CLI filters ('None' for no balancing)."""
+    return balancing_method if balancing_method else 'None'
+
+
+class TrainingScheduler:
+    """
+    Runs the experiment grid (base x city x balancing method x model) as independent jobs.
+    Each job loads the gold file of its city, splits and preprocesses it, balances the training set through the
+    shared resampling cache on disk and trains one model. The jobs run in a process pool whose size
+    and per-job thread count are derived from a CPU budget.
+    Finished jobs leave a small JSON record and are registered in a manifest with the fingerprint of
+    the gold file and of the tuning and cross-validation settings, so a rerun skips them until the
+    gold file or the settings change.
+    With cv (arguments of cross_validate, e.g. {'mode': 'walk_forward', 'n_splits': 5, 'gap': 7}) each job
+    runs a time-aware cross-validation instead of the random train/test split.
+    """
+    def __init__(self, data_path='data', cities_path='configs/citys.json', jobs_path='data/train_jobs',
+                 manifest_path='data/manifest_train.json', cache_dir='data/cache/resampling', tuning=None,
+                 cv=None):
+        self.catalog = DataCatalog(data_path, cities_path, layers=['gold'])
+        self.jobs_path = jobs_path
+        self.manifest = Manifest(manifest_path) if manifest_path else None
+        self.cache_dir = cache_dir
+        self.tuning = dict(TUNING if tuning is None else tuning)
+        self.cv = dict(cv) if cv else None
+        self.config_hash = self.get_config_hash()
+
+    def get_config_hash(self):
+        '''
+        Hashes the settings that change the result of a job: the tuning (trials, pruner, storage,
+        validation and early stopping), the objective version and the cross-validation (mode, splits, gap).
+        The number of Optuna workers only changes the resources of a job and is left out.
+        Returns:
+            str: Short hex digest.
+        '''
+        tuning = {'validation_size': VALIDATION_SIZE, 'early_stopping_rounds': EARLY_STOPPING_ROUNDS,
+                  **{key: value for key, value in self.tuning.items() if key != 'n_workers'}}
+        config = {'tuning': tuning, 'objective_version': OBJECTIVE_VERSION, 'cv': self.cv}
+        return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+    def plan_jobs(self, bases=None, cities=None, methods=None, models=None):
+        '''
+        Expands the grid into jobs, optionally filtered.
+        Args:
+            bases (list): Bases to keep. Default is every base.
+            cities (list): Cities to keep. Default is every city of each base.
+            methods (list): Balancing method names to keep ('None' for no balancing). Default is every method.
+            models (list): Models to keep (names of MODEL_FAMILIES). Default is every model.
+        Returns:
+            list: Jobs (dict with base, city, balancing method, model, manifest processor name, gold file
+                path and record path).
+        '''
+        jobs = []
+        for base, base_cities in base_to_cities.items():
+            if bases and base not in bases:
+                continue
+            for city in base_cities:
+                if cities and city not in cities:
+                    continue
+                gold_path = self.catalog.get_path('gold', base, city)
+                if gold_path is None:
+                    print(f'Arquivo da cidade {city} não encontrado na {base}.')
+                    continue
+                for balancing_method in Balancing_Methods:
+                    if methods and method_name(balancing_method) not in methods:
+                        continue
+                    for model in MODELS:
+                        if models and model not in models:
+                            continue
+                        job_id = f'{base}/{city}/{method_name(balancing_method)}/{model}'
+                        if self.cv:
+                            job_id += f"/cv_{self.cv.get('mode', 'walk_forward')}"
+                        jobs.append({
+                            'id': job_id,
+                            'base': base,
+                            'city': city,
+                            'balancing_method': balancing_method,
+                            'model': model,
+                            # Nome do processador no manifesto: o job é refeito se as configurações mudarem
+                            'processor': f'{model}@{self.config_hash}',
+                            'gold_path': gold_path,
+                            'record_path': os.path.join(self.jobs_path, f'{job_id}.json'),
+                        })
+        return jobs
+
+    def run_job(self, job, n_threads=None, quiet=False, fold_workers=None):
+        '''
+        Trains (or cross-validates) the model of a single job.
+        Args:
+            job (dict): Job returned by plan_jobs.
+            n_threads (int): Threads given to the model (XGBoost/LightGBM).
+            quiet (bool): If True, the output of the training is captured instead of printed.
+            fold_workers (int): Folds running at the same time in cross-validation jobs.
+        Returns:
+            dict: Job id, status, elapsed time, error and captured log of the job.
+        '''
+        result = new_result(id=job['id'])
+        with capture_job(result, quiet):
+            df = utils.read_data_from_parquet(job['gold_path'])
+            print(f"base: {job['base']}, city: {job['city']}, method: {method_name(job['balancing_method'])}, "
+                  f"model: {job['model']}" + (f", cv: {self.cv}" if self.cv else ''))
+            if self.cv:
+                # Folds em ordem temporal, avaliados no lugar da divisão aleatória
+                trained = cross_validate(job['model'], df, 'disaster_occurred', job['base'], job['city'],
+                                         job['balancing_method'], self.cache_dir,
+                                         n_trials=self.tuning.get('n_trials', 50),
+                                         pruner=self.tuning.get('pruner', 'median'), fold_workers=fold_workers,
+                                         n_jobs=n_threads, wait=True, **self.cv)
+            else:
+                # Pré-processamento ajustado só no treino e registrado junto com o modelo
+                X_train, X_test, y_train, y_test, preprocessor = split_dataset(df, 'disaster_occurred')
+                cache = ResamplingCache(self.cache_dir)
+                trained = train(job['model'], X_train, y_train, X_test, y_test, y_test.name, job['base'],
+                                job['city'], job['balancing_method'], cache, n_jobs=n_threads, **self.tuning,
+                                preprocessor=preprocessor, wait=True)
+            # Com wait=True o modelo e os artefatos já estão no MLflow: só então o job é registrado
+            if not trained:
+                raise RuntimeError('training failed, see the log of the job')
+        return result
+
+    def is_finished(self, job):
+        '''
+        Checks whether a job already finished for the current gold file and settings.
+        '''
+        return (self.manifest is not None
+                and self.manifest.is_valid('train', job['record_path'], [job['gold_path']], job['processor']))
+
+    def record_job(self, job, result):
+        '''
+        Writes the record of a successfully finished job and registers it in the manifest.
+        '''
+        if self.manifest is None or result['status'] != 'ok':
+            return
+        os.makedirs(os.path.dirname(job['record_path']), exist_ok=True)
+        record = {key: job[key] for key in ['base', 'city', 'model', 'gold_path']}
+        record.update({'balancing_method': method_name(job['balancing_method']), 'elapsed': result['elapsed'],
+                       'finished_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'tuning': self.tuning, 'cv': self.cv})
+        with open(job['record_path'], 'w') as file:
+            json.dump(record, file, indent=4)
+        self.manifest.record('train', job['record_path'], [job['gold_path']], job['processor'])
+
+    def finish_job(self, job, result):
+        '''
+        Records a finished job and prints its progress line.
+        '''
+        self.record_job(job, result)
+        print(format_result(result, lambda r: r['id']))
+
+    def run(self, jobs, cpu_budget=None, max_workers=None, force=False):
+        '''
+        Runs the jobs that are not finished yet.
+        The CPU budget is split among the worker processes: each job gets cpu_budget // max_workers
+        threads, divided by the number of Optuna workers of its study (or by the folds running at the
+        same time, in cross-validation jobs).
+        Args:
+            jobs (list): Jobs returned by plan_jobs.
+            cpu_budget (int): Number of CPUs to use. Default is every CPU.
+            max_workers (int): Number of jobs running at the same time. Default is cpu_budget // 4.
+            force (bool): If True, finished jobs are run again.
+        Returns:
+            list: Dictionaries with the timing and the errors of each job.
+        '''
+        cpu_budget = cpu_budget or os.cpu_count() or 1
+        max_workers = max_workers or max(1, cpu_budget // 4)
+        n_threads = max(1, cpu_budget // (max_workers * self.tuning.get('n_workers', 1)))
+        fold_workers = None
+        if self.cv:
+            # Na validação cruzada os folds rodam em paralelo, cada um com um estudo de um só processo
+            job_cpus = max(1, cpu_budget // max_workers)
+            fold_workers = min(self.cv.get('n_splits', 5), job_cpus)
+            n_threads = max(1, job_cpus // fold_workers)
+        results = []
+        pending = []
+        for job in jobs:
+            if not force and self.is_finished(job):
+                results.append(new_result('skipped', id=job['id']))
+            else:
+                pending.append(job)
+        # Limpeza do cache de reamostragem antes dos workers, que só escrevem nele
+        removed, freed = ResamplingCache(self.cache_dir).evict()
+        if removed:
+            print(f'Cache de reamostragem: {removed} arquivos removidos ({freed / 1024 ** 2:.1f} MB)')
+        # Experimentos criados antes dos workers, que os criariam em duplicata
+        for base in sorted({job['base'] for job in pending}):
+            get_experiment_id(f'DataBase_{base}')
+        print(f'{len(pending)} jobs pendentes, {len(results)} já concluídos. '
+              f'{max_workers} workers x {n_threads} threads (CPUs: {cpu_budget})')
+        results += run_jobs(self.run_job, pending, max_workers > 1, max_workers, on_result=self.finish_job,
+                            n_threads=n_threads, fold_workers=fold_workers)
+        print_summary(results, lambda r: r['id'])
+        return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Treina o grid base x cidade x balanceamento x modelo.')
+    parser.add_argument('--bases', nargs='+', help='Bases a treinar, ex.: base_1 base_3')
+    parser.add_argument('--cities', nargs='+', help='Cidades a treinar, ex.: miami "new york"')
+    parser.add_argument('--methods', nargs='+', choices=[method_name(m) for m in Balancing_Methods],
+                        help='Métodos de balanceamento (None = sem balanceamento)')
+    parser.add_argument('--models', nargs='+', choices=MODELS, help='Modelos a treinar')
+    parser.add_argument('--cpus', type=int, default=None, help='Orçamento de CPUs (padrão: todas)')
+    parser.add_argument('--workers', type=int, default=None, help='Jobs simultâneos (padrão: CPUs // 4)')
+    parser.add_argument('--trials', type=int, default=TUNING['n_trials'], help='Trials do Optuna por estudo')
+    parser.add_argument('--trial-workers', type=int, default=1, help='Processos do Optuna por estudo')
+    parser.add_argument('--cv', choices=CV_MODES, default=None,
+                        help='Validação cruzada temporal no lugar da divisão aleatória treino/teste')
+    parser.add_argument('--cv-splits', type=int, default=5, help='Folds da validação cruzada')
+    parser.add_argument('--cv-gap', type=int, default=7, help='Dias entre o treino e o bloco de teste de cada fold')
+    parser.add_argument('--force', action='store_true', help='Refaz os jobs já concluídos')
+    parser.add_argument('--dry-run', action='store_true', help='Só lista os jobs')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    tuning = dict(TUNING, n_trials=args.trials, n_workers=args.trial_workers)
+    cv = {'mode': args.cv, 'n_splits': args.cv_splits, 'gap': args.cv_gap} if args.cv else None
+    scheduler = TrainingScheduler(tuning=tuning, cv=cv)
+    jobs = scheduler.plan_jobs(args.bases, args.cities, args.methods, args.models)
+    if args.dry_run:
+        for job in jobs:
+            status = 'concluído' if scheduler.is_finished(job) else 'pendente'
+            print(f"{job['id']}: {status}")
+    else:
+        start_time = time.time()
+        scheduler.run(jobs, cpu_budget=args.cpus, max_workers=args.workers, force=args.force)
+        print(f"Execution Time: {time.time() - start_time:.2f} seconds")
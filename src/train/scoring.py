@@ -0,0 +1,195 @@
+# Os módulos dos modelos registram suas famílias no motor de treino
+import src.train.decision_tree
+import src.train.lightgbm_model
+import src.train.xgboost_model
+import os
+import time
+import argparse
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from mlflow.tracking import MlflowClient
+
+from src.train.preprocessing import Preprocessor, PREPROCESSOR_FILE
+from src.train.trainer import MODEL_FAMILIES, get_family
+from src.utils.catalog import FILE_NAME_PATTERN, CITY_ALIASES
+from src.utils.jobs import new_result, capture_job, run_jobs, format_result, print_summary
+
+BATCH_SIZE = 65536
+OUTPUT_SCHEMA = pa.schema([
+    ('date', pa.timestamp('ns')),
+    ('base', pa.string()),
+    ('city', pa.string()),
+    ('disaster_probability', pa.float32()),
+])
+
+# Modelo carregado uma vez por processo de scoring
+_SCORER = {}
+
+
+def download_run(run_id, destination, client=None):
+    """
+    Downloads the model and the preprocessor logged by a training run.
+    Args:
+        run_id (str): MLflow run id.
+        destination (str): Local directory.
+        client (MlflowClient): MLflow client.
+    Returns:
+        tuple: (family name, local model path, local preprocessor path)
+    """
+    client = client or MlflowClient()
+    artifacts = {artifact.path for artifact in client.list_artifacts(run_id)}
+    families = [family for family in MODEL_FAMILIES.values() if family.artifact_path in artifacts]
+    if not families:
+        raise ValueError(f"Run {run_id} has no model of the families {list(MODEL_FAMILIES)}.")
+    if 'preprocessing' not in artifacts:
+        raise ValueError(f"Run {run_id} has no preprocessing artifact (trained before the fitted preprocessing).")
+    family = families[0]
+    os.makedirs(destination, exist_ok=True)
+    model_path = client.download_artifacts(run_id, family.artifact_path, destination)
+    preprocessor_path = client.download_artifacts(run_id, f'preprocessing/{PREPROCESSOR_FILE}', destination)
+    return family.name, model_path, preprocessor_path
+
+
+class Scorer:
+    """
+    A trained model and its fitted preprocessing, loaded once and applied to batches of gold rows.
+    """
+    def __init__(self, family_name, model_path, preprocessor_path, n_jobs=None):
+        self.family = get_family(family_name)
+        self.model = self.family.flavor.load_model(model_path)
+        self.preprocessor = Preprocessor.load(preprocessor_path)
+        self.n_jobs = n_jobs
+        self.columns = [self.preprocessor.date_column, self.preprocessor.season_column,
+                        *self.preprocessor.scale_columns]
+
+    def predict(self, df):
+        """
+        Returns the disaster probability (float32) of each row of a DataFrame of gold rows.
+        """
+        X = self.preprocessor.transform_frame(df)
+        return np.asarray(self.family.predict_proba(self.model, X, self.n_jobs), dtype=np.float32)
+
+    def score_file(self, input_path, output_path, base, city, batch_size=BATCH_SIZE):
+        """
+        Streams a gold parquet file through the model in row-group batches and writes the probabilities
+        of each date to a parquet file, so memory is bounded by the batch size and not by the file size.
+        Returns:
+            int: Number of scored rows.
+        """
+        parquet_file = pq.ParquetFile(input_path)
+        missing = [col for col in self.columns if col not in parquet_file.schema_arrow.names]
+        if missing:
+            raise ValueError(f"{input_path} has no columns {missing}.")
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        temp_path = f'{output_path}.tmp'
+        n_rows = 0
+        with pq.ParquetWriter(temp_path, OUTPUT_SCHEMA, compression='zstd') as writer:
+            for batch in parquet_file.iter_batches(batch_size=batch_size, columns=self.columns):
+                df = batch.to_pandas()
+                writer.write_table(pa.table({
+                    'date': pa.array(df[self.preprocessor.date_column].to_numpy('datetime64[ns]')),
+                    'base': pa.array([base] * len(df), pa.string()),
+                    'city': pa.array([city] * len(df), pa.string()),
+                    'disaster_probability': pa.array(self.predict(df)),
+                }, schema=OUTPUT_SCHEMA))
+                n_rows += len(df)
+        # Arquivo incompleto nunca fica no lugar do final
+        os.replace(temp_path, output_path)
+        return n_rows
+
+
+def init_worker(family_name, model_path, preprocessor_path, n_jobs):
+    _SCORER['scorer'] = Scorer(family_name, model_path, preprocessor_path, n_jobs)
+
+
+def score_job(job, batch_size=BATCH_SIZE):
+    """
+    Scores a file with the scorer of the process.
+    Returns:
+        dict: Input path, status, number of rows, elapsed time and error.
+    """
+    result = new_result(input=job['input'], rows=0)
+    with capture_job(result):
+        result['rows'] = _SCORER['scorer'].score_file(job['input'], job['output'], job['base'], job['city'],
+                                                      batch_size)
+    return result
+
+
+def plan_jobs(inputs, output_path):
+    """
+    Lists the gold parquet files to score.
+    Args:
+        inputs (list): Gold parquet files or directories of them (e.g. data/gold/base_1).
+        output_path (str): Output directory; each file is written to <output_path>/<base>/<city>.parquet.
+    Returns:
+        list: Jobs (dict with input, output, base and city).
+    """
+    files = []
+    for path in inputs:
+        if os.path.isdir(path):
+            files += [os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith('.parquet')]
+        else:
+            files.append(path)
+    jobs = []
+    for path in files:
+        base = os.path.basename(os.path.dirname(os.path.abspath(path)))
+        # Cidade pelo padrão de nome da camada gold (<cidade>_<ano inicial>_<ano final>.parquet)
+        match = FILE_NAME_PATTERN.match(os.path.basename(path).lower())
+        city = CITY_ALIASES.get(match['city'], match['city']) if match else os.path.splitext(os.path.basename(path))[0]
+        jobs.append({'input': path, 'output': os.path.join(output_path, base, f'{city}.parquet'),
+                     'base': base, 'city': city})
+    return jobs
+
+
+def score(run_id, inputs, output_path='data/predictions', model_cache='data/cache/models', batch_size=BATCH_SIZE,
+          max_workers=None):
+    """
+    Scores gold parquet files with the model of a training run.
+    The model and its preprocessor are downloaded once; the files are split among worker processes
+    (each loading the model once) and the CPUs among their model threads.
+    Args:
+        run_id (str): MLflow run id of the model.
+        inputs (list): Gold parquet files or directories of them.
+        output_path (str): Output directory of the probabilities.
+        model_cache (str): Local directory of the downloaded models.
+        batch_size (int): Rows per batch.
+        max_workers (int): Files scored at the same time. Default is min(files, CPUs).
+    Returns:
+        list: Dictionaries with the result of each file.
+    """
+    jobs = plan_jobs(inputs, os.path.join(output_path, run_id))
+    if not jobs:
+        print('Nenhum arquivo parquet encontrado.')
+        return []
+    family_name, model_path, preprocessor_path = download_run(run_id, os.path.join(model_cache, run_id))
+    cpus = os.cpu_count() or 1
+    max_workers = min(len(jobs), max_workers or cpus)
+    n_jobs = max(1, cpus // max_workers)
+    print(f'{len(jobs)} arquivos, modelo {family_name}, {max_workers} workers x {n_jobs} threads')
+
+    results = run_jobs(score_job, jobs, max_workers > 1, max_workers,
+                       on_result=lambda job, result: print(format_result(result, lambda r: r['input'])),
+                       initializer=init_worker, initargs=(family_name, model_path, preprocessor_path, n_jobs),
+                       quiet=False, batch_size=batch_size)
+    print_summary(results, lambda r: r['input'], noun='files')
+    print(f"{sum(r['rows'] for r in results)} linhas em {output_path}/{run_id}")
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Calcula a probabilidade de desastre dos arquivos gold.')
+    parser.add_argument('run_id', help='Run do MLflow com o modelo e o pré-processamento')
+    parser.add_argument('inputs', nargs='+', help='Arquivos parquet ou pastas da camada gold, ex.: data/gold/base_1')
+    parser.add_argument('--output', default='data/predictions', help='Pasta de saída')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Linhas por lote')
+    parser.add_argument('--workers', type=int, default=None, help='Arquivos simultâneos (padrão: CPUs)')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    start_time = time.time()
+    score(args.run_id, args.inputs, args.output, batch_size=args.batch_size, max_workers=args.workers)
+    print(f"Execution Time: {time.time() - start_time:.2f} seconds")
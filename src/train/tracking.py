@@ -0,0 +1,194 @@
+import os
+import time
+import shutil
+import tempfile
+import threading
+import multiprocessing.util
+from concurrent.futures import ThreadPoolExecutor
+
+import seaborn as sns
+from matplotlib.figure import Figure
+from mlflow.entities import Metric, Param, RunStatus
+from mlflow.exceptions import MlflowException
+from mlflow.models import Model
+from mlflow.tracking import MlflowClient
+from sklearn.metrics import confusion_matrix
+
+# Worker de fundo do processo para artefatos e modelos (um só, para as escritas não disputarem disco)
+_EXECUTOR = None
+_EXECUTOR_LOCK = threading.Lock()
+_PENDING = []
+
+
+def get_executor():
+    """
+    Returns the background worker of the process, creating it on the first call
+    (so each process of a pool gets its own). The pending tasks are awaited when the process
+    exits, including the worker processes of a pool, which skip the normal interpreter shutdown.
+    """
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix='mlflow-logger')
+            multiprocessing.util.Finalize(None, wait_for_logging, exitpriority=10)
+        return _EXECUTOR
+
+
+def wait_for_logging():
+    """
+    Waits until every background logging task of the process has finished.
+    """
+    while _PENDING:
+        _PENDING.pop(0).result()
+
+
+def get_experiment_id(experiment_name, client=None):
+    """
+    Returns the id of an experiment, creating it if it does not exist.
+    With the file store, processes creating the same experiment at the same time get duplicates,
+    so a process pool must create its experiments before starting the workers.
+    """
+    client = client or MlflowClient()
+    experiment = client.get_experiment_by_name(experiment_name)
+    if experiment is not None:
+        return experiment.experiment_id
+    try:
+        return client.create_experiment(experiment_name)
+    except MlflowException:
+        # Criado por outro processo entre a busca e a criação
+        return client.get_experiment_by_name(experiment_name).experiment_id
+
+
+class RunLogger:
+    """
+    MLflow logging layer of a training run.
+    Params and metrics are buffered and sent in a single log_batch call. The confusion matrix
+    rendering, the model serialization and their upload run in a background worker, followed by the
+    end of the run, so the training does not wait for the file store or tracking server.
+    Use as a context manager: the batch is flushed when the block ends and the run is marked as
+    FINISHED (or FAILED, if the block raised) once its background tasks are done. Callers that must
+    know the run was fully logged (e.g. before recording a job as finished) call wait after the block.
+    """
+    def __init__(self, experiment_name, run_name, client=None):
+        self.client = client or MlflowClient()
+        experiment_id = get_experiment_id(experiment_name, self.client)
+        self.run_id = self.client.create_run(experiment_id, run_name=run_name).info.run_id
+        self.params = {}
+        self.metrics = {}
+        self.tasks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close(RunStatus.to_string(RunStatus.FAILED if exc_type else RunStatus.FINISHED))
+        return False
+
+    def log_param(self, key, value):
+        self.params[key] = value
+
+    def log_params(self, params):
+        self.params.update(params)
+
+    def log_metric(self, key, value, step=0):
+        self.metrics[(key, step)] = value
+
+    def log_metrics(self, metrics, step=0):
+        for key, value in metrics.items():
+            self.log_metric(key, value, step)
+
+    def flush(self):
+        """
+        Sends the buffered params and metrics in a single log_batch call.
+        """
+        timestamp = int(time.time() * 1000)
+        params = [Param(key, str(value)) for key, value in self.params.items()]
+        metrics = [Metric(key, float(value), timestamp, step) for (key, step), value in self.metrics.items()]
+        if params or metrics:
+            self.client.log_batch(self.run_id, metrics=metrics, params=params)
+        self.params, self.metrics = {}, {}
+
+    def submit(self, function, *args):
+        """
+        Runs a logging task in the background worker.
+        """
+        future = get_executor().submit(self.run_task, function, *args)
+        self.tasks.append(future)
+        _PENDING[:] = [task for task in _PENDING if not task.done()] + [future]
+        return future
+
+    def run_task(self, function, *args):
+        try:
+            function(*args)
+        except Exception as e:
+            print(f"Erro ao registrar no MLflow (run {self.run_id}): {e}")
+            return False
+        return True
+
+    def log_model(self, flavor, model, artifact_path):
+        """
+        Serializes a model in the background with an MLflow flavor module (e.g. mlflow.sklearn)
+        and uploads it to the artifact path of the run.
+        """
+        self.submit(self._log_model, flavor, model, artifact_path)
+
+    def _log_model(self, flavor, model, artifact_path):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            model_path = os.path.join(temp_dir, artifact_path)
+            flavor.save_model(model, model_path, mlflow_model=Model(artifact_path=artifact_path, run_id=self.run_id))
+            self.client.log_artifacts(self.run_id, model_path, artifact_path)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def log_preprocessor(self, preprocessor, artifact_path='preprocessing', file_name='preprocessor.joblib'):
+        """
+        Saves a fitted preprocessor (an object with a save(path) method) in the background and uploads
+        it next to the model, so the model can score new data without refitting the preprocessing.
+        """
+        self.submit(self._log_preprocessor, preprocessor, artifact_path, file_name)
+
+    def _log_preprocessor(self, preprocessor, artifact_path, file_name):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, file_name)
+            preprocessor.save(path)
+            self.client.log_artifact(self.run_id, path, artifact_path=artifact_path)
+
+    def log_confusion_matrix(self, y_true, y_pred, labels=('0', '1'), file_name='confusion_matrix.png'):
+        """
+        Renders the confusion matrix in the background and uploads it to the 'plots' artifact path.
+        """
+        self.submit(self._log_confusion_matrix, confusion_matrix(y_true, y_pred), list(labels), file_name)
+
+    def _log_confusion_matrix(self, cm, labels, file_name):
+        # Figure direto (sem pyplot), que pode ser usado fora da thread principal
+        figure = Figure(figsize=(6, 4))
+        ax = figure.subplots()
+        sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', xticklabels=labels, yticklabels=labels, ax=ax)
+        ax.set_xlabel('Predito')
+        ax.set_ylabel('Real')
+        ax.set_title('Matriz de Confusão')
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cm_path = os.path.join(temp_dir, file_name)
+            figure.savefig(cm_path)
+            self.client.log_artifact(self.run_id, cm_path, artifact_path='plots')
+
+    def wait(self):
+        """
+        Waits for the background tasks of the run, including its end when the run is closed.
+        Returns:
+            bool: True if every task succeeded (the model and artifacts are logged).
+        """
+        return all([task.result() for task in self.tasks])
+
+    def close(self, status='FINISHED'):
+        """
+        Flushes the buffered params and metrics and ends the run after its background tasks.
+        """
+        self.flush()
+        tasks = list(self.tasks)
+
+        def terminate():
+            ok = all(task.result() for task in tasks)
+            self.client.set_terminated(self.run_id, status if ok else RunStatus.to_string(RunStatus.FAILED))
+        self.submit(terminate)
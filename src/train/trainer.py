@@ -0,0 +1,304 @@
+import os
+import abc
+import time
+import inspect
+import hashlib
+import threading
+import contextlib
+from functools import partial
+
+import optuna
+from dotenv import load_dotenv
+from sklearn.metrics import roc_auc_score, precision_score, recall_score, f1_score
+
+from src.train.resampling import balance_data, hash_split
+from src.train.tracking import RunLogger
+from src.train.tuning import optimize, split_validation, VALIDATION_SIZE, EARLY_STOPPING_ROUNDS
+
+load_dotenv()
+
+# Versão do objetivo dos estudos: incrementar quando a métrica ou a validação dos trials mudarem,
+# para que estudos gravados com o objetivo antigo não sejam retomados
+OBJECTIVE_VERSION = 2
+
+# Famílias de modelos registradas (nome -> ModelFamily)
+MODEL_FAMILIES = {}
+
+# Dados de treino de cada família no processo, construídos uma vez por estudo e reusados em todos os trials
+_TRAINING_DATA = {}
+_TRAINING_DATA_LOCK = threading.Lock()
+
+
+def register_family(family):
+    """
+    Registers a model family, making it available to train, main.py and the scheduler.
+    A family missing one of the abstract hooks of ModelFamily cannot be instantiated, so it fails here,
+    when its module is imported, and not in the middle of a training run.
+    Args:
+        family (ModelFamily): Model family instance.
+    Returns:
+        ModelFamily: The registered family.
+    Raises:
+        TypeError: If family is not a ModelFamily instance.
+        ValueError: If the family has no name.
+    """
+    if not isinstance(family, ModelFamily):
+        raise TypeError(f"{family!r} is not a ModelFamily instance.")
+    if not family.name:
+        raise ValueError(f"{type(family).__name__} has no name.")
+    MODEL_FAMILIES[family.name] = family
+    return family
+
+
+def get_family(name):
+    """
+    Returns a registered model family.
+    """
+    if name not in MODEL_FAMILIES:
+        raise ValueError(f"Unknown model family {name}. Use {list(MODEL_FAMILIES)}.")
+    return MODEL_FAMILIES[name]
+
+
+class ModelFamily(abc.ABC):
+    """
+    A model family plugged into the training engine.
+    A family only describes its search space and how to fit and use its estimator; the engine
+    (train) provides the validation split, the resampling cache, the Optuna study, thread control,
+    timing and the batched MLflow logging.
+
+    Every family implements search_space and create_estimator, which is all a sklearn-like estimator
+    needs. Families with their own data format (e.g. native boosting matrices) also override
+    build_data, fit_trial, fit_final and predict_proba.
+    """
+    name = None
+    run_name = None
+    artifact_path = None
+    flavor = None
+    plot_labels = ['0', '1']
+    # Famílias com rodadas de treino usam early stopping e relatam scores intermediários para a poda
+    early_stopping = False
+
+    @abc.abstractmethod
+    def search_space(self, trial):
+        """Suggests the hyperparameters of a trial."""
+
+    @abc.abstractmethod
+    def create_estimator(self, params, n_jobs=None):
+        """Builds an unfitted sklearn-like estimator with the given hyperparameters."""
+
+    def build_data(self, X_fit, y_fit, X_val, y_val, n_jobs=None):
+        """Builds the training data reused by every trial of a study."""
+        return X_fit, y_fit, X_val, y_val
+
+    def fit_trial(self, trial, params, data, n_jobs=None, early_stopping_rounds=None):
+        """
+        Fits the model of a trial.
+        Returns:
+            tuple: Validation probabilities of the positive class and best iteration (None without early stopping).
+        """
+        X_fit, y_fit, X_val, _ = data
+        model = self.create_estimator(params, n_jobs).fit(X_fit, y_fit)
+        return self.predict_proba(model, X_val, n_jobs), None
+
+    def fit_final(self, params, X_train, y_train, n_jobs=None, n_rounds=None):
+        """Fits the final model on the whole (balanced) training set."""
+        return self.create_estimator(params, n_jobs).fit(X_train, y_train)
+
+    def predict_proba(self, model, X, n_jobs=None):
+        """Returns the probabilities of the positive class."""
+        return model.predict_proba(X)[:, 1]
+
+
+def get_training_data(family, key, X_fit, y_fit, X_val, y_val, n_jobs=None):
+    """
+    Returns the training data of a study, building it only on the first call for a key.
+    Only the data of the current study is kept.
+    """
+    with _TRAINING_DATA_LOCK:
+        if key not in _TRAINING_DATA:
+            _TRAINING_DATA.clear()
+            _TRAINING_DATA[key] = family.build_data(X_fit, y_fit, X_val, y_val, n_jobs)
+        return _TRAINING_DATA[key]
+
+
+def objective(trial, family, key, X_fit, y_fit, X_val, y_val, n_jobs=None, early_stopping_rounds=None):
+    """
+    Optuna objective shared by every family: recall on the validation fold.
+    """
+    params = family.search_space(trial)
+    data = get_training_data(family, key, X_fit, y_fit, X_val, y_val, n_jobs)
+    proba, best_iteration = family.fit_trial(trial, params, data, n_jobs, early_stopping_rounds)
+    if best_iteration is not None:
+        trial.set_user_attr('best_iteration', best_iteration)
+    return recall_score(y_val, (proba >= 0.5).astype(int))
+
+
+def study_fingerprint(family, X_train, y_train, balancing_method=None, validation_size=VALIDATION_SIZE,
+                      early_stopping_rounds=None, time_ordered=False):
+    """
+    Identifies what a study was tuned on: the training data, the search space of the family, the
+    objective version and the validation settings.
+    The fingerprint is part of the study name, so a study kept in the storage is only resumed by a
+    run with the same data and search space; a changed gold file or search space starts a new study.
+    Returns:
+        str: Short hex digest.
+    """
+    try:
+        search_space = inspect.getsource(type(family).search_space)
+    except (OSError, TypeError):
+        search_space = type(family).search_space.__qualname__
+    parts = [hash_split(X_train, y_train), search_space, OBJECTIVE_VERSION, balancing_method, validation_size,
+             early_stopping_rounds, time_ordered]
+    return hashlib.sha256('|'.join(map(str, parts)).encode()).hexdigest()[:12]
+
+
+@contextlib.contextmanager
+def timer(timings, name):
+    """
+    Measures the time of a block, stored in timings[name].
+    """
+    start_time = time.time()
+    try:
+        yield
+    finally:
+        timings[name] = time.time() - start_time
+
+
+def fit_model(family, X_train, y_train, study_name, base, city, balancing_method=None, cache=None, n_trials=50,
+              n_workers=1, storage=None, pruner='median', n_jobs=None, validation_size=VALIDATION_SIZE,
+              early_stopping_rounds=EARLY_STOPPING_ROUNDS, time_ordered=False, timings=None):
+    """
+    Tunes a family on a validation fold of the training data and refits the best model on the
+    whole (balanced) training data.
+    Args:
+        family (ModelFamily): Model family.
+        X_train, y_train: Training data (not balanced).
+        study_name (str): Prefix of the name of the Optuna study, completed with study_fingerprint.
+        time_ordered (bool): If True, the validation fold is the end of the training data (rows in time order).
+        timings (dict): If given, receives the balancing, tuning and refit times.
+        The other arguments are described in train.
+    Returns:
+        tuple: (best model, study, best iteration or None)
+    """
+    timings = {} if timings is None else timings
+    if not family.early_stopping:
+        early_stopping_rounds = None
+    # Estudo identificado pelos dados e pelo espaço de busca: um estudo antigo no storage não é retomado
+    fingerprint = study_fingerprint(family, X_train, y_train, balancing_method, validation_size,
+                                    early_stopping_rounds, time_ordered)
+    study_name = f"{study_name}_{fingerprint}"
+    with timer(timings, 'balancing_time'):
+        # Validação separada antes do balanceamento; o teste fica só para as métricas finais
+        X_fit, X_val, y_fit, y_val = split_validation(X_train, y_train, validation_size, time_ordered)
+        X_fit, y_fit = balance_data(X_fit, y_fit, balancing_method, base, city, cache)
+        X_train, y_train = balance_data(X_train, y_train, balancing_method, base, city, cache)
+
+    with timer(timings, 'tuning_time'):
+        study = optimize(study_name,
+                         partial(objective, family=family, key=study_name, X_fit=X_fit, y_fit=y_fit,
+                                 X_val=X_val, y_val=y_val, n_jobs=n_jobs,
+                                 early_stopping_rounds=early_stopping_rounds),
+                         n_trials=n_trials, n_workers=n_workers, storage=storage, pruner=pruner)
+    _TRAINING_DATA.pop(study_name, None)
+
+    # Melhor modelo, retreinado no treino completo (com o número de rodadas escolhido, se houver)
+    best_iteration = study.best_trial.user_attrs.get('best_iteration')
+    with timer(timings, 'refit_time'):
+        best_model = family.fit_final(study.best_params, X_train, y_train, n_jobs, best_iteration)
+    return best_model, study, best_iteration
+
+
+def evaluate(family, model, X_test, y_test, n_jobs=None):
+    """
+    Computes the test metrics of a model.
+    Returns:
+        tuple: (dict of metrics, predicted labels)
+    """
+    proba = family.predict_proba(model, X_test, n_jobs)
+    y_pred = (proba >= 0.5).astype(int)
+    metrics = {
+        "precision": precision_score(y_test, y_pred, zero_division=0),
+        "recall": recall_score(y_test, y_pred, zero_division=0),
+        "f1_score": f1_score(y_test, y_pred, zero_division=0),
+        "auc_roc": roc_auc_score(y_test, proba),
+    }
+    return metrics, y_pred
+
+
+def train(family_name, X_train, y_train, X_test, y_test, collumn_target, base, city, balancing_method=None,
+          cache=None, n_trials=50, n_workers=1, storage=None, pruner='median', n_jobs=None,
+          validation_size=VALIDATION_SIZE, early_stopping_rounds=EARLY_STOPPING_ROUNDS, preprocessor=None,
+          wait=True):
+    """
+    Tunes, trains and logs a model of a family.
+    Args:
+        family_name (str): Name of a registered family.
+        X_train, y_train: Training data (not balanced).
+        X_test, y_test: Test data, only used for the final metrics.
+        collumn_target (str): Name of the target column.
+        base (str): Base name.
+        city (str): City name.
+        balancing_method (str): Balancing method, or None.
+        cache (ResamplingCache): Shared resampling cache.
+        n_trials (int): Number of Optuna trials.
+        n_workers (int): Number of Optuna workers.
+        storage (str): Optuna storage path.
+        pruner (str): 'median', 'hyperband' or None.
+        n_jobs (int): Threads per model. Default is the number of CPUs divided by n_workers.
+        validation_size (float): Fraction of the training data used to score the trials.
+        early_stopping_rounds (int): Patience of the early stopping (families with training rounds).
+        preprocessor (Preprocessor): Preprocessing fitted on the training rows, logged with the model.
+        wait (bool): If True, waits until the model, the artifacts and the end of the run are logged
+            in the background. If False they keep running while the next model trains (see wait_for_logging),
+            and a failed upload does not change the result.
+    Returns:
+        bool: True if the model was trained and logged.
+    """
+    try:
+        family = get_family(family_name)
+        timings = {}
+        start_time = time.time()
+        # Threads por modelo, para os workers não disputarem os mesmos núcleos
+        if n_jobs is None:
+            n_jobs = max(1, (os.cpu_count() or 1) // n_workers)
+
+        with RunLogger(f"DataBase_{base}", f"{family.run_name} - {city}") as run:
+            study_name = f"{family.name}_{base}_{city}_{balancing_method}"
+            best_model, study, best_iteration = fit_model(
+                family, X_train, y_train, study_name, base, city, balancing_method, cache, n_trials, n_workers,
+                storage, pruner, n_jobs, validation_size, early_stopping_rounds, timings=timings)
+            metrics, y_pred = evaluate(family, best_model, X_test, y_test, n_jobs)
+
+            run.log_params({
+                "balancing_method": balancing_method if balancing_method else "None",
+                **study.best_params,
+                "collumn_target": collumn_target,
+                "base": base,
+                "city": city,
+                "n_trials": n_trials,
+                "study_name": study.study_name,
+            })
+            run.log_metrics({
+                "pruned_trials": len(study.get_trials(states=(optuna.trial.TrialState.PRUNED,))),
+                "training_time": time.time() - start_time,
+                **timings,
+                **metrics,
+            })
+            if best_iteration is not None:
+                run.log_param("early_stopping_rounds", early_stopping_rounds)
+                run.log_metric("best_iteration", best_iteration)
+
+            # Modelo, pré-processamento e matriz de confusão são gravados em segundo plano
+            run.log_model(family.flavor, best_model, family.artifact_path)
+            if preprocessor is not None:
+                run.log_preprocessor(preprocessor)
+            run.log_confusion_matrix(y_test, y_pred, labels=family.plot_labels,
+                                     file_name=f"confusion_matrix_{int(time.time())}.png")
+
+        if wait and not run.wait():
+            raise RuntimeError(f"MLflow logging failed (run {run.run_id})")
+        return True
+
+    except Exception as e:
+        print(f"Erro ao treinar o modelo {family_name}: {e}")
+        return False
@@ -0,0 +1,159 @@
+import os
+import optuna
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from optuna.storages import JournalStorage
+from optuna.storages.journal import JournalFileBackend
+from optuna.trial import TrialState
+from sklearn.model_selection import train_test_split
+
+PRUNERS = ['median', 'hyperband', None]
+# Intervalo (em rodadas de boosting) entre os relatos de score intermediário
+REPORT_INTERVAL = 10
+# Fração do treino separada para validação dos trials
+VALIDATION_SIZE = 0.2
+# Limite de rodadas de boosting e paciência do early stopping
+MAX_ROUNDS = 1000
+EARLY_STOPPING_ROUNDS = 50
+
+
+def get_storage(storage=None):
+    """
+    Resolves the Optuna storage.
+    Args:
+        storage (str): None for an in-memory study, a SQLite file ('*.db' or 'sqlite:///...')
+            or any other path for a journal file, which supports concurrent writers without a database server.
+    Returns:
+        Storage accepted by optuna.create_study, or None.
+    """
+    if storage is None:
+        return None
+    if storage.startswith('sqlite:///'):
+        return storage
+    directory = os.path.dirname(storage)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if storage.endswith('.db'):
+        return f'sqlite:///{storage}'
+    return JournalStorage(JournalFileBackend(storage))
+
+
+def split_validation(X_train, y_train, validation_size=VALIDATION_SIZE, time_ordered=False):
+    """
+    Splits a validation fold from the training data, used to score the trials and for
+    early stopping, so the test set is only used for the final metrics.
+    The split must be done before balancing, so the validation fold keeps the real class distribution.
+    Args:
+        X_train (pd.DataFrame): Training features.
+        y_train (pd.Series): Training target.
+        validation_size (float): Fraction of the training data used for validation.
+        time_ordered (bool): If True, the rows are in time order and the validation fold is the last
+            part of the training data (no shuffling); otherwise it is a stratified random split.
+    Returns:
+        tuple: (X_fit, X_val, y_fit, y_val)
+    """
+    if time_ordered:
+        return train_test_split(X_train, y_train, test_size=validation_size, shuffle=False)
+    return train_test_split(X_train, y_train, test_size=validation_size, random_state=42, stratify=y_train)
+
+
+def get_pruner(pruner='median'):
+    """
+    Builds the pruner of a study.
+    Args:
+        pruner (str): 'median', 'hyperband' or None (no pruning).
+    Returns:
+        optuna.pruners.BasePruner
+    """
+    if pruner not in PRUNERS:
+        raise ValueError(f"Invalid pruner {pruner}. Use {PRUNERS}.")
+    if pruner == 'median':
+        return optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=REPORT_INTERVAL * 2,
+                                           interval_steps=REPORT_INTERVAL)
+    if pruner == 'hyperband':
+        return optuna.pruners.HyperbandPruner(min_resource=REPORT_INTERVAL)
+    return optuna.pruners.NopPruner()
+
+
+def report_intermediate(trial, step, value, interval=REPORT_INTERVAL):
+    """
+    Reports an intermediate validation score of a trial every `interval` steps and
+    stops the trial if the pruner decides so.
+    Args:
+        trial (optuna.Trial): Current trial.
+        step (int): Step (boosting round) of the score.
+        value (float): Validation score (higher is better).
+        interval (int): Number of steps between reports.
+    Raises:
+        optuna.TrialPruned: If the trial must be pruned.
+    """
+    if (step + 1) % interval != 0:
+        return
+    trial.report(value, step)
+    if trial.should_prune():
+        raise optuna.TrialPruned(f'Trial pruned at step {step}.')
+
+
+def count_finished_trials(study):
+    """
+    Returns the number of finished (complete or pruned) trials of a study.
+    """
+    return len(study.get_trials(deepcopy=False, states=(TrialState.COMPLETE, TrialState.PRUNED)))
+
+
+def split_trials(n_trials, n_workers):
+    """
+    Splits a trial budget between workers, e.g. 10 trials on 4 workers -> [3, 3, 2, 2].
+    """
+    return [n_trials // n_workers + (i < n_trials % n_workers) for i in range(n_workers)]
+
+
+def run_worker(study_name, storage, objective, n_trials, pruner, seed):
+    """
+    Runs n_trials trials (the share of this worker in the budget) of a shared study.
+    Executed in a worker process, which opens the study from the storage.
+    """
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    study = optuna.load_study(study_name=study_name, storage=get_storage(storage),
+                              sampler=optuna.samplers.TPESampler(seed=seed), pruner=get_pruner(pruner))
+    study.optimize(objective, n_trials=n_trials)
+    return count_finished_trials(study)
+
+
+def optimize(study_name, objective, n_trials=50, n_workers=1, storage=None, pruner='median', seed=42):
+    """
+    Runs an Optuna study (direction 'maximize') with a trial budget shared by several workers.
+    With a storage, the workers are processes that run trials on the same study, each with a fixed
+    share of the remaining budget, and a study that already exists in the storage is resumed
+    (its finished trials count toward the budget).
+    Without a storage, the study is in memory and the workers are threads.
+    Args:
+        study_name (str): Name of the study.
+        objective (callable): Objective function. Must be picklable (a module-level function or a
+            functools.partial of one) when a storage is used with more than one worker.
+        n_trials (int): Total number of finished trials of the study.
+        n_workers (int): Number of workers.
+        storage (str): Storage path (see get_storage).
+        pruner (str): 'median', 'hyperband' or None.
+        seed (int): Seed of the sampler. Each worker uses seed + worker index.
+    Returns:
+        optuna.Study
+    """
+    study = optuna.create_study(study_name=study_name, storage=get_storage(storage), direction='maximize',
+                                load_if_exists=True, sampler=optuna.samplers.TPESampler(seed=seed),
+                                pruner=get_pruner(pruner))
+    remaining = n_trials - count_finished_trials(study)
+    if remaining <= 0:
+        return study
+    if storage is None or n_workers <= 1:
+        # Com threads, o próprio optimize não passa de n_trials
+        study.optimize(objective, n_trials=remaining, n_jobs=n_workers)
+        return study
+
+    # Cada processo roda sua parte do orçamento: o total de trials não passa de n_trials
+    shares = split_trials(remaining, min(n_workers, remaining))
+    with ProcessPoolExecutor(max_workers=len(shares)) as executor:
+        futures = [executor.submit(run_worker, study_name, storage, objective, share, pruner, seed + i)
+                   for i, share in enumerate(shares)]
+        for future in as_completed(futures):
+            future.result()
+    return optuna.load_study(study_name=study_name, storage=get_storage(storage))
@@ -1,112 +1,81 @@
-import time
-import os
-import tempfile
-import optuna
-import matplotlib.pyplot as plt
-import seaborn as sns
-
-import mlflow 
+import mlflow.xgboost
 import xgboost as xgb
-from sklearn.metrics import (
-classification_report, 
-roc_auc_score, 
-confusion_matrix, 
-precision_score, 
-recall_score,
-f1_score
-)
-from imblearn.over_sampling import SMOTE, ADASYN
-from imblearn.under_sampling import RandomUnderSampler
-from imblearn.combine import SMOTEENN
+
+from src.train.trainer import ModelFamily, register_family
+from src.train.tuning import report_intermediate, MAX_ROUNDS
+
+
+class XGBoostPruningCallback(xgb.callback.TrainingCallback):
+    '''
+    XGBoost callback that reports the validation score of each boosting round to the trial.
+    '''
+    def __init__(self, trial, metric='auc'):
+        super().__init__()
+        self.trial = trial
+        self.metric = metric
+
+    def after_iteration(self, model, epoch, evals_log):
+        report_intermediate(self.trial, epoch, evals_log['validation'][self.metric][-1])
+        return False
 
 
+class XGBoostFamily(ModelFamily):
+    '''
+    XGBoost trained with the native API on QuantileDMatrix, built once per study.
+    '''
+    name = 'xgboost'
+    run_name = 'XGBoost Classifier Optuna'
+    artifact_path = 'xgboost_model'
+    flavor = mlflow.xgboost
+    early_stopping = True
 
-from dotenv import load_dotenv
-"""
-Balanced Methods:
-- SMOTE
-- ADASYN
-- RandomUnderSampler
-- SMOTEENN
-"""
-load_dotenv()
-mlflow_tracking_uri = os.getenv('MLFLOW_TRACKING_URI')
-def train_xgboost(X_train, y_train, X_test, y_test,collumn_target,base,city, balancing_method=None):
-    metodos_balanceamento = {
-        'SMOTE': SMOTE(random_state=42),
-        'ADASYN': ADASYN(random_state=42),
-        'RandomUnderSampler': RandomUnderSampler(random_state=42),
-        'SMOTEENN': SMOTEENN(random_state=42)
-    }
-    try:
-        if balancing_method  in metodos_balanceamento:
-            X_train, y_train = metodos_balanceamento[balancing_method].fit_resample(X_train, y_train)
+    def search_space(self, trial):
+        return {
+            'max_depth': trial.suggest_int('max_depth', 3, 10),
+            'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.3),
+            'subsample': trial.suggest_float('subsample', 0.3, 1.0),
+            'colsample_bytree': trial.suggest_float('colsample_bytree', 0.5, 1.0),
+        }
 
-        
-        def objective(trial):
-            params = {
-                'n_estimators': trial.suggest_categorical('n_estimators', [100, 200, 300]),
-                'max_depth': trial.suggest_int('max_depth', 3, 10),
-                'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.3),
-                'subsample': trial.suggest_float('subsample', 0.3, 1.0),
-                'colsample_bytree': trial.suggest_float('colsample_bytree', 0.5, 1.0),
-                'use_label_encoder': False,
-                'eval_metric': 'logloss'
-            }
+    def get_params(self, params, n_jobs=None):
+        '''
+        Completes the hyperparameters of a trial with the fixed parameters of the native API.
+        '''
+        return {**params, 'objective': 'binary:logistic', 'eval_metric': 'auc', 'tree_method': 'hist',
+                'seed': 42, 'nthread': n_jobs}
 
-            model = xgb.XGBClassifier(**params, random_state=42)
-            model.fit(X_train, y_train)
-            preds = model.predict(X_test)
-            return recall_score(y_test, preds)
-        experiment_name = f"DataBase_{base}"
-        mlflow.set_experiment(experiment_name)
-        start_time = time.time()
-        with mlflow.start_run(run_name=f"XGBoost Classifier Optuna - {city}"):
-            study = optuna.create_study(direction='maximize')
-            study.optimize(objective, n_trials=50)
+    def create_estimator(self, params, n_jobs=None):
+        '''
+        Equivalent sklearn-API classifier, for use outside the engine (e.g. in a sklearn pipeline);
+        the engine trains the native booster.
+        '''
+        return xgb.XGBClassifier(**params, n_estimators=MAX_ROUNDS, objective='binary:logistic', eval_metric='auc',
+                                 tree_method='hist', random_state=42, n_jobs=n_jobs)
 
-            # Melhor modelo
-            best_params = study.best_params
-            best_model = xgb.XGBClassifier(**best_params, use_label_encoder=False, eval_metric='logloss', random_state=42)
-            best_model.fit(X_train, y_train)
+    def build_data(self, X_fit, y_fit, X_val, y_val, n_jobs=None):
+        # A matriz de validação usa os mesmos cortes de quantis do treino
+        dtrain = xgb.QuantileDMatrix(X_fit, y_fit, nthread=n_jobs)
+        dval = xgb.QuantileDMatrix(X_val, y_val, ref=dtrain, nthread=n_jobs)
+        return dtrain, dval
 
-            # Previsões e métricas
-            y_pred = best_model.predict(X_test)
-            auc_roc = roc_auc_score(y_test, best_model.predict_proba(X_test)[:, 1])
-            precision = precision_score(y_test, y_pred)
-            recall = recall_score(y_test, y_pred)
-            f1 = f1_score(y_test, y_pred)
+    def fit_trial(self, trial, params, data, n_jobs=None, early_stopping_rounds=None):
+        dtrain, dval = data
+        # O número de rodadas é escolhido pelo early stopping na validação
+        booster = xgb.train(self.get_params(params, n_jobs), dtrain, num_boost_round=MAX_ROUNDS,
+                            evals=[(dval, 'validation')], early_stopping_rounds=early_stopping_rounds,
+                            callbacks=[XGBoostPruningCallback(trial)], verbose_eval=False)
+        if early_stopping_rounds is None:
+            # Sem early stopping não há best_iteration: a previsão usa todas as rodadas
+            return booster.predict(dval), None
+        proba = booster.predict(dval, iteration_range=(0, booster.best_iteration + 1))
+        return proba, booster.best_iteration + 1
 
-            # Log no MLflow
-            mlflow.log_param("balancing_method", balancing_method if balancing_method else "None")
-            mlflow.log_params(best_params)
-            mlflow.log_param("collumn_target", collumn_target)
-            mlflow.log_param("base", base)
-            mlflow.log_param("city", city)
-            mlflow.log_metric("training_time", time.time() - start_time)
-            mlflow.log_metric("precision", precision)
-            mlflow.log_metric("recall", recall)
-            mlflow.log_metric("f1_score", f1)
-            mlflow.log_metric("auc_roc", auc_roc)
+    def fit_final(self, params, X_train, y_train, n_jobs=None, n_rounds=None):
+        dtrain = xgb.QuantileDMatrix(X_train, y_train, nthread=n_jobs)
+        return xgb.train(self.get_params(params, n_jobs), dtrain, num_boost_round=n_rounds or MAX_ROUNDS)
 
-            # Log do modelo
-            mlflow.sklearn.log_model(best_model, "xgboost_model")
+    def predict_proba(self, model, X, n_jobs=None):
+        return model.predict(xgb.DMatrix(X, nthread=n_jobs))
 
-            # Matriz de confusão
-            cm = confusion_matrix(y_test, y_pred)
-            plt.figure(figsize=(6, 4))
-            sns.heatmap(cm, annot=True, fmt='d', cmap='Blues',
-                        xticklabels=['0', '1'],
-                        yticklabels=['0', '1'])
-            plt.xlabel('Predito')
-            plt.ylabel('Real')
-            plt.title('Matriz de Confusão')
-            with tempfile.TemporaryDirectory() as temp_dir:
-                timestamp = int(time.time())
-                cm_path = os.path.join(temp_dir, f"confusion_matrix_{timestamp}.png")
-                plt.savefig(cm_path)
-                mlflow.log_artifact(cm_path, artifact_path="plots")
-            plt.close()
 
-    except Exception as e:
-        print(f"Erro ao treinar o modelo: {e}")
+register_family(XGBoostFamily())
@@ -2,8 +2,17 @@ import os
 import seaborn as sns
 import matplotlib.pyplot as plt
 import pandas as pd
+import numpy as np
 import abc
 
+# Estações do hemisfério norte por mês
+NORTHERN_SEASONS = {
+    'Inverno': [12, 1, 2],
+    'Primavera': [3, 4, 5],
+    'Verão': [6, 7, 8],
+    'Outono': [9, 10, 11],
+}
+
 def extract_date_components(df: pd.DataFrame, date_column: str) -> pd.DataFrame:
     if date_column not in df.columns:
         raise ValueError(f"Column '{date_column}' not found in DataFrame.")
@@ -46,6 +55,42 @@ def get_season(date: pd.Timestamp) -> str:
     else:  
         return 'Outono'
 
+def build_season_lookup(seasons: dict, hemisphere: str = 'north') -> np.ndarray:
+    """
+    Build a lookup table from month (1-12) to season code.
+    Args:
+        seasons (dict): Season name -> list of months, for the northern hemisphere.
+        hemisphere (str): 'north' or 'south'. In the south the months are shifted by six.
+    Returns:
+        np.ndarray: Array of 13 codes indexed by month; index 0 and unmapped months are -1.
+    """
+    if hemisphere not in ('north', 'south'):
+        raise ValueError(f"Invalid hemisphere '{hemisphere}'. Use 'north' or 'south'.")
+    lookup = np.full(13, -1, dtype=np.int8)
+    for code, months in enumerate(seasons.values()):
+        months = np.asarray(months)
+        if hemisphere == 'south':
+            months = (months + 5) % 12 + 1
+        lookup[months] = code
+    return lookup
+
+def encode_season(dates, hemisphere: str = 'north', seasons: dict = None) -> pd.Categorical:
+    """
+    Vectorized version of get_season: maps the month of each date to its season with a NumPy lookup table.
+    Args:
+        dates (pd.Series | array-like): Dates to determine the season.
+        hemisphere (str): 'north' or 'south'. Default is 'north'.
+        seasons (dict): Custom season definition (season name -> list of months of the northern hemisphere).
+            Default is NORTHERN_SEASONS.
+    Returns:
+        pd.Categorical: Season name of each date, with the seasons as categories. Missing dates are NaN.
+    """
+    seasons = seasons or NORTHERN_SEASONS
+    lookup = build_season_lookup(seasons, hemisphere)
+    months = np.asarray(pd.DatetimeIndex(dates).month, dtype=float)
+    months = np.nan_to_num(months, nan=0).astype(np.int64)
+    return pd.Categorical.from_codes(lookup[months], categories=list(seasons))
+
 def add_moving_average(df, column: str, window: int = 3)-> pd.DataFrame: 
     """add moving average columns to the dataframe
     Args:
@@ -92,11 +137,15 @@ def save_data_to_parquet(df: pd.DataFrame, file_path: str)-> None:
     Args:
         df (pd.DataFrame): DataFrame to save.
         file_path (str): Path to save the parquet file.
+    Returns:
+        bool: True if the file was saved, False otherwise.
     """
     dir_path = os.path.dirname(file_path)
     if not os.path.exists(dir_path):
         os.makedirs(dir_path)
     try:
         df.to_parquet(file_path, index=False)
+        return True
     except Exception as e:
-        print(f"Erro ao salvar o arquivo {file_path}: {e}")
\ No newline at end of file
+        print(f"Erro ao salvar o arquivo {file_path}: {e}")
+        return False
\ No newline at end of file
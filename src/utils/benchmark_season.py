@@ -0,0 +1,20 @@
+import timeit
+import pandas as pd
+import src.utils.Utils as utils
+
+# Micro-benchmark: apply(get_season) x encode_season em 50+ anos de dados diários
+if __name__ == '__main__':
+    repeat = 5
+    for freq in ['D', 'h']:
+        dates = pd.Series(pd.date_range('1973-01-01', '2024-12-31', freq=freq))
+        print(f'Datas: {len(dates)} (freq={freq})')
+
+        expected = dates.apply(utils.get_season)
+        encoded = utils.encode_season(dates)
+        assert (expected.to_numpy() == encoded.astype(str)).all(), 'encode_season difere de get_season'
+
+        time_apply = min(timeit.repeat(lambda: dates.apply(utils.get_season), number=1, repeat=repeat))
+        time_vectorized = min(timeit.repeat(lambda: utils.encode_season(dates), number=1, repeat=repeat))
+        print(f'    apply(get_season): {time_apply * 1000:.2f} ms')
+        print(f'    encode_season:     {time_vectorized * 1000:.2f} ms')
+        print(f'    Speedup: {time_apply / time_vectorized:.1f}x\n')
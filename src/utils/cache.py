@@ -0,0 +1,44 @@
+import os
+import time
+
+
+def evict_cache(cache_dir, max_age=None, max_bytes=None, now=None):
+    """
+    Remove old files from a cache directory.
+    Files older than max_age are removed first; then, while the directory is larger than
+    max_bytes, the least recently modified files are removed. Files that disappear or cannot be
+    removed (e.g. open in another process on Windows) are skipped.
+    Args:
+        cache_dir (str): Cache directory (searched recursively).
+        max_age (float): Time to live of a file, in seconds. None keeps files of any age.
+        max_bytes (int): Maximum size of the directory. None keeps any size.
+        now (float): Current time (time.time() by default).
+    Returns:
+        tuple: (number of removed files, bytes freed)
+    """
+    now = now or time.time()
+    files = []
+    for root, _, names in os.walk(cache_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+    # Mais antigos primeiro
+    files.sort()
+    total = sum(size for _, size, _ in files)
+    removed, freed = 0, 0
+    for mtime, size, path in files:
+        expired = max_age is not None and now - mtime > max_age
+        if not expired and (max_bytes is None or total - freed <= max_bytes):
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        removed += 1
+        freed += size
+    return removed, freed
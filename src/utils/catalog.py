@@ -0,0 +1,154 @@
+import os
+import re
+import json
+from collections import defaultdict, namedtuple
+
+LAYERS = ['raw', 'silver', 'gold']
+
+# Grafias alternativas encontradas nos nomes dos arquivos
+CITY_ALIASES = {'alburqueque': 'albuquerque'}
+
+# <cidade>_[daily|hourly_]<ano inicial>_<ano final>[_disaster].<csv|parquet>
+FILE_NAME_PATTERN = re.compile(
+    r'^(?P<city>.+?)_(?:(?P<granularity>daily|hourly)_)?(?P<start_year>\d{4})_(?P<end_year>\d{4})'
+    r'(?:_(?P<kind>disaster))?\.(?P<extension>csv|parquet)$'
+)
+
+CatalogEntry = namedtuple(
+    'CatalogEntry',
+    ['layer', 'base', 'city', 'granularity', 'start_year', 'end_year', 'file_name', 'path']
+)
+
+
+def load_cities(file_path):
+    """Load the list of cities from the cities JSON file (configs/citys.json)."""
+    with open(file_path, 'r') as file:
+        return [entry['city'] for entry in json.load(file)]
+
+
+class DataCatalog:
+    """
+    Index of the data files of the raw, silver and gold layers.
+    The layer folders are scanned once and each file is indexed by
+    (layer, base, city, granularity), with its year range, so lookups are dictionary accesses
+    instead of substring matches over repeated os.listdir calls. The index keys are also grouped
+    by (layer, base, city), with None for any base or city, so the filtered lookups are dictionary
+    accesses too.
+    Only files whose city (or one of its aliases) is in configs/citys.json are indexed.
+    """
+    def __init__(self, data_path='data', cities_path='configs/citys.json', layers=None):
+        self.data_path = data_path
+        self.cities = load_cities(cities_path)
+        self.layers = layers or LAYERS
+        self.index = defaultdict(list)
+        # (layer, base ou None, city ou None) -> chaves do índice, na ordem da varredura
+        self.keys_by_group = defaultdict(list)
+        # layer -> bases e (layer, base) -> cidades com arquivos indexados
+        self.bases_by_layer = defaultdict(set)
+        self.cities_by_base = defaultdict(set)
+        self.unmatched = []
+        self.scan()
+
+    def parse_file_name(self, file_name):
+        """
+        Parses a data file name.
+        Args:
+            file_name (str): File name, e.g. 'new york_daily_1973_2024.parquet'.
+        Returns:
+            tuple: (city, granularity, start_year, end_year), or None if the name is not recognized.
+        """
+        match = FILE_NAME_PATTERN.match(file_name.lower())
+        if match is None:
+            return None
+        city = CITY_ALIASES.get(match['city'], match['city'])
+        if city not in self.cities:
+            return None
+        if match['kind'] == 'disaster':
+            granularity = 'disaster'
+        else:
+            granularity = match['granularity'] or 'daily'
+        return city, granularity, int(match['start_year']), int(match['end_year'])
+
+    def scan(self):
+        """
+        Scans the layer folders and rebuilds the index.
+        """
+        self.index.clear()
+        self.keys_by_group.clear()
+        self.bases_by_layer.clear()
+        self.cities_by_base.clear()
+        self.unmatched = []
+        for layer in self.layers:
+            layer_path = os.path.join(self.data_path, layer)
+            if not os.path.isdir(layer_path):
+                continue
+            for base in sorted(os.listdir(layer_path)):
+                base_path = os.path.join(layer_path, base)
+                if not os.path.isdir(base_path):
+                    continue
+                for file_name in sorted(os.listdir(base_path)):
+                    parsed = self.parse_file_name(file_name)
+                    path = os.path.join(base_path, file_name)
+                    if parsed is None:
+                        self.unmatched.append(path)
+                        continue
+                    city, granularity, start_year, end_year = parsed
+                    entry = CatalogEntry(layer, base, city, granularity, start_year, end_year, file_name, path)
+                    key = (layer, base, city, granularity)
+                    if key not in self.index:
+                        for group in [(layer, None, None), (layer, base, None), (layer, None, city),
+                                      (layer, base, city)]:
+                            self.keys_by_group[group].append(key)
+                        self.bases_by_layer[layer].add(base)
+                        self.cities_by_base[(layer, base)].add(city)
+                    self.index[key].append(entry)
+        # Arquivos com a grafia oficial da cidade têm prioridade sobre os com alias
+        for entries in self.index.values():
+            entries.sort(key=lambda entry: not entry.file_name.lower().startswith(entry.city))
+
+    def get(self, layer, base, city, granularity=None):
+        """
+        Returns the entries of a city in a base of a layer.
+        Args:
+            layer (str): 'raw', 'silver' or 'gold'.
+            base (str): Base name, e.g. 'base_1'.
+            city (str): City name.
+            granularity (str): 'daily', 'hourly' or 'disaster'. If None, every granularity is returned.
+        Returns:
+            list: CatalogEntry list.
+        """
+        if granularity is not None:
+            return list(self.index.get((layer, base, city, granularity), []))
+        return [entry for key in self.keys_by_group.get((layer, base, city), []) for entry in self.index[key]]
+
+    def get_path(self, layer, base, city, granularity='daily'):
+        """
+        Returns the path of the file of a city, or None if there is no such file.
+        """
+        entries = self.index.get((layer, base, city, granularity))
+        return entries[0].path if entries else None
+
+    def get_disaster_path(self, city, layer='silver'):
+        """
+        Returns the path of the disaster file of a city, or None if there is no such file.
+        """
+        return self.get_path(layer, 'base_disaster', city, 'disaster')
+
+    def keys(self, layer, base=None, city=None):
+        """
+        Returns the index keys of a layer, optionally filtered by base and city.
+        """
+        return list(self.keys_by_group.get((layer, base, city), []))
+
+    def bases(self, layer):
+        """
+        Returns the bases of a layer that have indexed files.
+        """
+        return sorted(self.bases_by_layer.get(layer, ()))
+
+    def cities_in(self, layer, base):
+        """
+        Returns the cities with files in a base of a layer, in the order of configs/citys.json.
+        """
+        found = self.cities_by_base.get((layer, base), ())
+        return [city for city in self.cities if city in found]
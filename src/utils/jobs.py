@@ -0,0 +1,102 @@
+import io
+import time
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Largura da coluna de status nas linhas de progresso (o maior status é 'skipped')
+STATUS_WIDTH = len('skipped')
+
+
+def new_result(status='ok', **fields):
+    """
+    Builds the result of a job: its identifying fields plus status, elapsed time, error and captured log.
+    """
+    return {**fields, 'status': status, 'elapsed': 0.0, 'error': None, 'log': ''}
+
+
+@contextlib.contextmanager
+def capture_job(result, quiet=False):
+    """
+    Runs the body of a job, filling its result: the elapsed time, the captured output (if quiet)
+    and, if the body raised, the 'error' status and message. The exception is not propagated, so
+    one failed job does not stop the others.
+    Args:
+        result (dict): Result of the job (see new_result).
+        quiet (bool): If True, the output of the job is captured in result['log'] instead of printed.
+    """
+    buffer = io.StringIO()
+    start_time = time.time()
+    with contextlib.redirect_stdout(buffer) if quiet else contextlib.nullcontext():
+        try:
+            yield result
+        except Exception as e:
+            result['status'] = 'error'
+            result['error'] = f'{type(e).__name__}: {e}'
+    result['elapsed'] = time.time() - start_time
+    result['log'] = buffer.getvalue()
+
+
+def run_jobs(function, jobs, parallel=False, max_workers=None, on_result=None, initializer=None, initargs=(),
+             quiet=True, **kwargs):
+    """
+    Runs function(job, **kwargs) for each job, in a process pool or in the current process.
+    Args:
+        function (callable): Job function returning a result dict. Must be picklable when parallel.
+        jobs (list): Jobs, passed one at a time to function.
+        parallel (bool): If True, the jobs run in a process pool.
+        max_workers (int): Number of worker processes. Default is the number of CPUs.
+        on_result (callable): Called as on_result(job, result) in the current process when a job
+            finishes, e.g. to record it in a manifest or print its progress.
+        initializer (callable): Run once in each worker (or once here, if not parallel) with initargs.
+        quiet (bool): If True, function also gets quiet=True in the pool, so the output of concurrent
+            jobs is captured in their results instead of interleaved.
+    Returns:
+        list: Results, in the order the jobs finished.
+    """
+    results = []
+
+    def finish(job, result):
+        if on_result is not None:
+            on_result(job, result)
+        results.append(result)
+
+    if parallel:
+        pool_kwargs = dict(kwargs, quiet=True) if quiet else kwargs
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=initializer, initargs=initargs) as executor:
+            futures = {executor.submit(function, job, **pool_kwargs): job for job in jobs}
+            for future in as_completed(futures):
+                finish(futures[future], future.result())
+    else:
+        if initializer is not None:
+            initializer(*initargs)
+        for job in jobs:
+            finish(job, function(job, **kwargs))
+    return results
+
+
+def format_result(result, label, width=STATUS_WIDTH):
+    """
+    Formats the progress line of a job: status, elapsed time and label.
+    """
+    return f"  [{result['status']:>{width}}] {result['elapsed']:8.2f}s  {label(result)}"
+
+
+def print_summary(results, label, noun='jobs'):
+    """
+    Prints the timing and the errors of the jobs, the slowest first.
+    Args:
+        results (list): Result dicts of the jobs.
+        label (callable): Returns the name of a job from its result.
+        noun (str): Name of the jobs in the summary line.
+    """
+    errors = [r for r in results if r['status'] == 'error']
+    skipped = [r for r in results if r['status'] == 'skipped']
+    print(f'Summary: {len(results)} {noun}, {len(results) - len(errors) - len(skipped)} ok, '
+          f'{len(skipped)} skipped, {len(errors)} errors')
+    width = max((len(r['status']) for r in results), default=0)
+    for r in sorted(results, key=lambda r: r['elapsed'], reverse=True):
+        print(format_result(r, label, width))
+    for r in errors:
+        print(f"Error in {label(r)}: {r['error']}")
+        if r.get('log'):
+            print(r['log'])
@@ -0,0 +1,58 @@
+import json
+import os
+import tempfile
+import unittest
+
+from src.data_transform.silver_to_gold import SilverToGold
+from src.utils.catalog import DataCatalog
+
+FILES = {
+    'silver/base_1': ['miami_daily_1973_2024.parquet', 'miami_hourly_1973_2024.parquet',
+                      'dallas_daily_1973_2024.parquet', 'notes.txt'],
+    'silver/base_3': ['alburqueque_daily_1973_2024.parquet'],
+    'silver/base_disaster': ['miami_1973_2023_disaster.parquet', 'dallas_1973_2023_disaster.parquet'],
+    'gold/base_1': ['miami_1973_2024.parquet'],
+}
+
+
+class DataCatalogTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_path = os.path.join(self.temp_dir.name, 'lake')
+        for folder, names in FILES.items():
+            os.makedirs(os.path.join(self.data_path, folder))
+            for name in names:
+                open(os.path.join(self.data_path, folder, name), 'w').close()
+        self.cities_path = os.path.join(self.temp_dir.name, 'citys.json')
+        with open(self.cities_path, 'w') as file:
+            json.dump([{'city': city} for city in ['dallas', 'miami', 'albuquerque']], file)
+        self.catalog = DataCatalog(self.data_path, self.cities_path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_lookups(self):
+        self.assertEqual(self.catalog.bases('silver'), ['base_1', 'base_3', 'base_disaster'])
+        self.assertEqual(self.catalog.cities_in('silver', 'base_1'), ['dallas', 'miami'])
+        self.assertEqual(self.catalog.cities_in('silver', 'base_3'), ['albuquerque'])
+        self.assertEqual([entry.granularity for entry in self.catalog.get('silver', 'base_1', 'miami')],
+                         ['daily', 'hourly'])
+        self.assertEqual(len(self.catalog.keys('silver', city='miami')), 3)
+        self.assertEqual(self.catalog.get_path('gold', 'base_1', 'miami'),
+                         os.path.join(self.data_path, 'gold', 'base_1', 'miami_1973_2024.parquet'))
+        self.assertIsNone(self.catalog.get_path('gold', 'base_1', 'dallas'))
+        self.assertEqual(self.catalog.unmatched, [os.path.join(self.data_path, 'silver', 'base_1', 'notes.txt')])
+
+    def test_disaster_file_is_taken_from_the_silver_path(self):
+        silver_to_gold = SilverToGold(os.path.join(self.data_path, 'silver'), os.path.join(self.data_path, 'gold'),
+                                      cities_path=self.cities_path)
+        self.assertEqual(silver_to_gold.get_disaster('dallas'),
+                         os.path.join(self.data_path, 'silver', 'base_disaster', 'dallas_1973_2023_disaster.parquet'))
+        self.assertIsNone(silver_to_gold.get_disaster('albuquerque'))
+        jobs = {(job['base'], job['city']): job for job in silver_to_gold.plan_jobs()}
+        self.assertEqual(set(jobs), {('base_1', 'dallas'), ('base_1', 'miami'), ('base_3', 'albuquerque')})
+        self.assertIn(silver_to_gold.get_disaster('miami'), jobs[('base_1', 'miami')]['input_paths'])
+
+
+if __name__ == '__main__':
+    unittest.main()
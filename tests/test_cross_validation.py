@@ -0,0 +1,53 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.train.cross_validation import time_series_folds
+
+
+class TimeSeriesFoldsTest(unittest.TestCase):
+    def setUp(self):
+        self.dates = pd.Series(pd.date_range('2000-01-01', periods=120, freq='D'))
+
+    def assert_gap(self, train, test, dates, gap):
+        train_dates, test_dates = dates.iloc[train], dates.iloc[test]
+        distance = np.abs(train_dates.to_numpy()[:, None] - test_dates.to_numpy()[None, :]).min()
+        self.assertGreater(distance, np.timedelta64(gap, 'D'))
+
+    def test_walk_forward_trains_only_on_the_past(self):
+        folds = time_series_folds(self.dates, n_splits=5, gap=7, mode='walk_forward')
+        self.assertEqual(len(folds), 5)
+        tests = [test for _, test in folds]
+        # Blocos de teste contíguos, em ordem, cobrindo tudo menos o primeiro bloco
+        np.testing.assert_array_equal(np.concatenate(tests), np.arange(20, 120))
+        for train, test in folds:
+            np.testing.assert_array_equal(test, np.arange(test[0], test[-1] + 1))
+            self.assertTrue((train < test[0]).all())
+            self.assert_gap(train, test, self.dates, 7)
+            # Tudo antes do gap entra no treino (janela crescente)
+            self.assertEqual(len(train), test[0] - 7)
+        self.assertTrue(all(len(a) < len(b) for (a, _), (b, _) in zip(folds, folds[1:])))
+
+    def test_blocked_trains_on_both_sides_apart_from_the_block(self):
+        folds = time_series_folds(self.dates, n_splits=4, gap=3, mode='blocked')
+        np.testing.assert_array_equal(np.concatenate([test for _, test in folds]), np.arange(120))
+        for train, test in folds:
+            self.assert_gap(train, test, self.dates, 3)
+            self.assertEqual(len(train) + len(test), 120 - 3 * (int(test[0] > 0) + int(test[-1] < 119)))
+        self.assertTrue((folds[1][0] > folds[1][1][-1]).any())
+
+    def test_gap_is_in_days_with_several_rows_per_day(self):
+        dates = pd.Series(np.repeat(pd.date_range('2000-01-01', periods=40, freq='D'), 3))
+        for mode in ['walk_forward', 'blocked']:
+            for train, test in time_series_folds(dates, n_splits=3, gap=2, mode=mode):
+                self.assert_gap(train, test, dates, 2)
+                self.assertFalse(set(dates.iloc[train]) & set(dates.iloc[test]))
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            time_series_folds(self.dates, mode='random')
+
+
+if __name__ == '__main__':
+    unittest.main()
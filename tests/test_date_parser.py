@@ -0,0 +1,51 @@
+import unittest
+
+import pandas as pd
+
+from src.data_transform.date_parser import DateParser
+
+
+class DateParserTest(unittest.TestCase):
+    def setUp(self):
+        self.parser = DateParser()
+
+    def test_daily_series_with_repeated_dates_stays_daily(self):
+        # Arquivos com várias estações (NOAA) ou eventos repetem a mesma data
+        parsed, unparsed = self.parser.parse(pd.Series(['1973-01-01', '1973-01-01', '1973-01-02']))
+        self.assertEqual(parsed.dtype, 'datetime64[ns]')
+        self.assertEqual(parsed.tolist(), [pd.Timestamp('1973-01-01')] * 2 + [pd.Timestamp('1973-01-02')])
+        self.assertEqual(unparsed, 0)
+
+    def test_multi_station_daily_series_stays_daily(self):
+        dates = pd.date_range('1973-01-01', periods=30, freq='D').strftime('%Y-%m-%d')
+        series = pd.Series([date for date in dates for _ in range(3)])
+        self.assertFalse(self.parser.is_sub_daily(series))
+        self.assertEqual(self.parser.parse(series)[0].dtype, 'datetime64[ns]')
+
+    def test_daily_series_with_a_constant_time_keeps_only_the_date(self):
+        # Datas diárias da OpenMeteo: meia-noite de São Paulo em UTC
+        series = pd.Series(['1973-01-01 03:00:00+00:00', '1973-01-02 03:00:00+00:00'])
+        parsed, _ = self.parser.parse(series)
+        self.assertEqual(parsed.tolist(), [pd.Timestamp('1973-01-01'), pd.Timestamp('1973-01-02')])
+
+    def test_hourly_series_keeps_utc_timestamps(self):
+        series = pd.Series(pd.date_range('2000-01-01', periods=48, freq='h').strftime('%Y-%m-%d %H:%M:%S'))
+        parsed, unparsed = self.parser.parse(series)
+        self.assertEqual(str(parsed.dtype), 'datetime64[ns, UTC]')
+        self.assertEqual(parsed.iloc[1], pd.Timestamp('2000-01-01 01:00', tz='UTC'))
+        self.assertEqual(unparsed, 0)
+
+    def test_hourly_series_with_gaps_and_repeats_is_sub_daily(self):
+        timestamps = pd.Series(pd.to_datetime(['2000-01-01 00:00', '2000-01-01 00:00', '2000-01-01 01:00',
+                                               '2000-01-01 03:00', '2000-01-02 00:00']))
+        self.assertTrue(self.parser.is_sub_daily(timestamps))
+
+    def test_formats_are_detected_per_row(self):
+        parsed, unparsed = self.parser.parse(pd.Series(['08/10/1979', '08/11/1983', None, 'not a date']))
+        self.assertEqual(parsed.iloc[0], pd.Timestamp('1979-08-10'))
+        self.assertTrue(pd.isna(parsed.iloc[2]))
+        self.assertEqual(unparsed, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from src.data_transform.raw_to_silver import DataProcessor
+
+MAPPING_PATH = 'configs/dataframe_column_mapping.json'
+HEADER = 'EVENT_ID,CZ_NAME_STR,BEGIN_DATE,EVENT_TYPE,SOURCE,EVENT_NARRATIVE'
+
+
+def storm_events_csv(n_rows=40):
+    """Storm Events file with a quoted multi-line narrative, lines with extra fields and lines with missing fields."""
+    lines = [HEADER]
+    for i in range(n_rows):
+        day = i % 28 + 1
+        event = ['Hail', 'Heavy Rain', 'Flood'][i % 3]
+        if i % 9 == 4:
+            # Vírgulas sem aspas na fonte: campos a mais, linha descartada
+            lines.append(f'{i},NEW YORK CO.,05/{day:02d}/1998,{event},AWOS,ASOS,MESONET,""')
+        elif i % 7 == 3:
+            lines.append(f'{i},NEW YORK CO.,06/{day:02d}/1999,{event},TRAINED SPOTTER,"Rain.\nStreets flooded, cars stalled."')
+        elif i % 11 == 8:
+            # Aspas soltas na fonte: o registro termina na quebra de linha, com campos a menos
+            lines.append(f'{i},NEW YORK CO.,08/{day:02d}/2001,Tornado,"AMATEUR "RADIO\nAND SPOTTERS",A funnel.')
+        elif i % 13 == 10:
+            # Sem a narrativa: campos a menos, linha mantida
+            lines.append(f'{i},NEW YORK CO.,09/{day:02d}/2002,Thunderstorm Wind,BROADCAST MEDIA')
+        else:
+            lines.append(f'{i},NEW YORK CO.,07/{day:02d}/2000,{event},LAW ENFORCEMENT,"Narrative {i}."')
+    return '\n'.join(lines) + '\n'
+
+
+class ChunkedIngestionTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.raw_path = os.path.join(self.temp_dir.name, 'raw', 'base_disaster')
+        os.makedirs(self.raw_path)
+        self.file_name = 'new york_1973_2023_disaster.csv'
+        with open(os.path.join(self.raw_path, self.file_name), 'w') as file:
+            file.write(storm_events_csv())
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_chunks_have_the_rows_of_the_whole_file(self):
+        processor = DataProcessor(os.path.join(self.temp_dir.name, 'raw'), self.temp_dir.name, MAPPING_PATH)
+        schema = processor.schema
+        file_path = os.path.join(self.raw_path, self.file_name)
+        with contextlib.redirect_stdout(io.StringIO()):
+            whole = schema.read_csv_records(file_path, 'base_disaster')
+            # Blocos pequenos: vários blocos no arquivo e registros com quebra de linha na fronteira
+            chunks = list(schema.read_csv_chunks(file_path, 'base_disaster', chunksize=1, block_size=256))
+        self.assertGreater(len(chunks), 3)
+        chunked = pd.concat(chunks, ignore_index=True)
+        pd.testing.assert_frame_equal(whole.astype(str), chunked.astype(str))
+        self.assertEqual(list(whole.columns), ['CZ_NAME_STR', 'BEGIN_DATE', 'EVENT_TYPE'])
+        # Linhas com campos a mais não entram; com campos a menos, sim
+        self.assertFalse(whole['BEGIN_DATE'].str.startswith('05/', na=False).any())
+        self.assertTrue(whole['BEGIN_DATE'].str.startswith('06/', na=False).any())
+        self.assertEqual(chunked['BEGIN_DATE'].str.startswith('08/', na=False).sum(), 3)
+
+    def test_rows_with_missing_fields_are_kept_like_pandas(self):
+        processor = DataProcessor(os.path.join(self.temp_dir.name, 'raw'), self.temp_dir.name, MAPPING_PATH)
+        file_path = os.path.join(self.raw_path, self.file_name)
+        with contextlib.redirect_stdout(io.StringIO()) as log:
+            whole = processor.schema.read_csv_records(file_path, 'base_disaster')
+        self.assertIn('4 rows with extra fields skipped, 8 rows with missing fields read with engine c', log.getvalue())
+        columns = list(whole.columns)
+        # Mesmas linhas do leitor original, sem projeção
+        expected = pd.read_csv(file_path, dtype=str, on_bad_lines='skip')[columns]
+        self.assertEqual(sorted(map(tuple, whole.dropna().astype(str).values)),
+                         sorted(map(tuple, expected.dropna().values)))
+        self.assertEqual(set(whole.loc[whole['BEGIN_DATE'].str.startswith('08/', na=False), 'EVENT_TYPE']), {'Tornado'})
+        self.assertEqual((whole['BEGIN_DATE'].str.startswith('09/', na=False)).sum(), 2)
+
+    def test_chunked_and_whole_file_silver_are_equal(self):
+        outputs = {}
+        for chunksize in [None, 5]:
+            output_path = os.path.join(self.temp_dir.name, f'silver_{chunksize}')
+            os.makedirs(os.path.join(output_path, 'base_disaster'))
+            processor = DataProcessor(os.path.join(self.temp_dir.name, 'raw'), output_path, MAPPING_PATH,
+                                      chunksize=chunksize)
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = processor.process_file('base_disaster', self.file_name)
+            self.assertEqual(result['status'], 'ok', result['error'])
+            _, output_file = processor.get_task_paths('base_disaster', self.file_name)
+            outputs[chunksize] = pd.read_parquet(output_file).astype(str)
+        pd.testing.assert_frame_equal(outputs[None], outputs[5])
+        self.assertGreater(len(outputs[None]), 0)
+        # Linhas com campos a menos, mas válidas nas colunas projetadas, entram nas duas saídas
+        events = outputs[5].groupby('eventType', observed=True)['date'].apply(lambda dates: dates.str[:7].unique().tolist())
+        self.assertEqual(events['Tornado'], ['2001-08'])
+        self.assertEqual(events['Thunderstorm Wind'], ['2002-09'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import contextlib
+import io
+import unittest
+
+from src.utils.jobs import new_result, capture_job, run_jobs, print_summary
+
+
+def square(job, quiet=False):
+    result = new_result(job=job)
+    with capture_job(result, quiet):
+        print(f'job {job}')
+        if job < 0:
+            raise ValueError('negative job')
+        result['value'] = job * job
+    return result
+
+
+class JobsTest(unittest.TestCase):
+    def test_capture_job_records_errors_and_output(self):
+        ok, error = square(3, quiet=True), square(-1, quiet=True)
+        self.assertEqual((ok['status'], ok['value'], ok['log']), ('ok', 9, 'job 3\n'))
+        self.assertEqual((error['status'], error['error']), ('error', 'ValueError: negative job'))
+        self.assertEqual(error['log'], 'job -1\n')
+
+    def test_serial_and_parallel_runs_give_the_same_results(self):
+        finished = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            serial = run_jobs(square, [1, 2, -3], on_result=lambda job, result: finished.append(job))
+        parallel = run_jobs(square, [1, 2, -3], parallel=True, max_workers=2)
+        self.assertEqual(finished, [1, 2, -3])
+        by_job = lambda results: {r['job']: (r['status'], r.get('value')) for r in results}
+        self.assertEqual(by_job(serial), by_job(parallel))
+        # Saída dos workers capturada no resultado
+        self.assertTrue(all(r['log'] for r in parallel))
+
+    def test_summary_fits_the_longest_status(self):
+        results = [new_result(job=1), new_result('skipped', job=2), square(-1, quiet=True)]
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            print_summary(results, lambda r: f"job {r['job']}")
+        lines = output.getvalue().splitlines()
+        self.assertEqual(lines[0], 'Summary: 3 jobs, 1 ok, 1 skipped, 1 errors')
+        self.assertEqual(len({line.index(']') for line in lines[1:4]}), 1)
+        self.assertIn('Error in job -1: ValueError: negative job', lines)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.train.preprocessing import Preprocessor, split_dataset
+
+
+def gold_frame(n_rows=100, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2000-01-01', periods=n_rows, freq='D')
+    return pd.DataFrame({
+        'date': dates,
+        'temp': rng.normal(20, 5, n_rows),
+        'prcp': np.where(rng.random(n_rows) < 0.1, np.nan, rng.gamma(1, 2, n_rows)),
+        'pres': np.full(n_rows, 1013.0),
+        'season': np.where(dates.month < 3, 'Inverno', 'Primavera'),
+        'eventType': ['Flood' if i % 10 == 0 else '' for i in range(n_rows)],
+        'disaster_occurred': (np.arange(n_rows) % 10 == 0).astype(int),
+    })
+
+
+class PreprocessorTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_features_exclude_labels_and_are_standardized(self):
+        df = gold_frame()
+        preprocessor = Preprocessor().fit(df)
+        self.assertEqual(preprocessor.feature_names, ['temp', 'prcp', 'pres', 'season_Inverno', 'season_Primavera',
+                                                      'year', 'month', 'day'])
+        X = preprocessor.transform_frame(df)
+        self.assertEqual(X.dtypes.unique().tolist(), [np.float32])
+        self.assertAlmostEqual(float(X['temp'].mean()), 0.0, places=5)
+        self.assertAlmostEqual(float(np.nanstd(X['prcp'])), 1.0, places=5)
+        # Coluna constante não é escalada; valores ausentes continuam ausentes
+        self.assertTrue((X['pres'] == 0).all())
+        self.assertEqual(int(X['prcp'].isna().sum()), int(df['prcp'].isna().sum()))
+        self.assertEqual(X.loc[0, ['year', 'month', 'day']].tolist(), [2000, 1, 1])
+
+    def test_saved_preprocessor_transforms_new_rows_the_same_way(self):
+        preprocessor = Preprocessor().fit(gold_frame())
+        path = os.path.join(self.temp_dir.name, 'preprocessing', 'preprocessor.joblib')
+        preprocessor.save(path)
+        self.assertEqual(os.listdir(os.path.dirname(path)), ['preprocessor.joblib'])
+        new_rows = gold_frame(30, seed=1)
+        new_rows.loc[0, 'season'] = 'Verão'
+        loaded = Preprocessor.load(path)
+        pd.testing.assert_frame_equal(loaded.transform_frame(new_rows), preprocessor.transform_frame(new_rows))
+        # Estação não vista no ajuste vira zeros
+        self.assertEqual(loaded.transform_frame(new_rows).loc[0, ['season_Inverno', 'season_Primavera']].sum(), 0)
+
+    def test_load_rejects_other_objects(self):
+        import joblib
+        path = os.path.join(self.temp_dir.name, 'other.joblib')
+        joblib.dump({'mean': 0}, path)
+        with self.assertRaises(TypeError):
+            Preprocessor.load(path)
+
+    def test_split_fits_on_the_training_rows_only(self):
+        df = gold_frame()
+        X_train, X_test, y_train, y_test, preprocessor = split_dataset(df, test_size=0.3)
+        self.assertEqual((len(X_train), len(X_test)), (70, 30))
+        self.assertEqual(y_train.mean(), y_test.mean())
+        train_rows = df.loc[X_train.index]
+        np.testing.assert_allclose(preprocessor.mean[0], train_rows['temp'].mean())
+        self.assertNotAlmostEqual(preprocessor.mean[0], df['temp'].mean(), places=6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from src.train.resampling import ResamplingCache
+from src.utils.cache import evict_cache
+
+
+def training_split(n_rows=60, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({'temp': rng.normal(size=n_rows), 'rain': rng.normal(size=n_rows)})
+    y = pd.Series((np.arange(n_rows) % 6 == 0).astype(int), name='disaster_occurred')
+    return X, y
+
+
+class ResamplingCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.temp_dir.name, 'resampling')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_keys_depend_on_split_method_and_location(self):
+        cache = ResamplingCache()
+        X, y = training_split()
+        key = cache.get_key(X, y, 'SMOTE', 'base_1', 'miami')
+        self.assertEqual(key, ResamplingCache().get_key(X.copy(), y.copy(), 'SMOTE', 'base_1', 'miami'))
+        self.assertNotEqual(key, cache.get_key(X, y, 'ADASYN', 'base_1', 'miami'))
+        self.assertNotEqual(key, cache.get_key(X, y, 'SMOTE', 'base_2', 'miami'))
+        self.assertNotEqual(key, cache.get_key(X, y, 'SMOTE', 'base_1', 'dallas'))
+        self.assertNotEqual(key, cache.get_key(*training_split(seed=1), 'SMOTE', 'base_1', 'miami'))
+        self.assertNotEqual(key, ResamplingCache(random_state=0).get_key(X, y, 'SMOTE', 'base_1', 'miami'))
+
+    def test_entries_are_reused_across_instances(self):
+        X, y = training_split()
+        first = ResamplingCache(self.cache_dir)
+        X_resampled, y_resampled = first.resample(X, y, 'RandomUnderSampler', 'base_1', 'miami')
+        self.assertEqual(first.misses, 1)
+        second = ResamplingCache(self.cache_dir)
+        X_cached, y_cached = second.resample(X, y, 'RandomUnderSampler', 'base_1', 'miami')
+        self.assertEqual((second.hits, second.misses), (1, 0))
+        pd.testing.assert_frame_equal(X_resampled, X_cached)
+        pd.testing.assert_series_equal(y_resampled, y_cached)
+        # Só os arquivos finais ficam no diretório
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+    def test_losing_the_rename_race_keeps_the_winner(self):
+        X, y = training_split()
+        cache = ResamplingCache(self.cache_dir)
+        key = cache.get_key(X, y, 'SMOTE', 'base_1', 'miami')
+        cache.store(key, X.to_numpy(), y.to_numpy())
+        # Outro processo já gravou a entrada e o rename deste falha (ex.: arquivo aberto no Windows)
+        with mock.patch('src.train.resampling.os.replace', side_effect=PermissionError):
+            X_values, y_values = ResamplingCache(self.cache_dir).store(key, X.to_numpy(), y.to_numpy())
+        np.testing.assert_array_equal(X_values, X.to_numpy())
+        np.testing.assert_array_equal(y_values, y.to_numpy())
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+    def test_missing_or_partial_entries_are_computed_again(self):
+        X, y = training_split()
+        cache = ResamplingCache(self.cache_dir)
+        cache.resample(X, y, 'RandomUnderSampler', 'base_1', 'miami')
+        key = cache.get_key(X, y, 'RandomUnderSampler', 'base_1', 'miami')
+        x_path, y_path = cache.get_paths(key)
+        os.remove(y_path)
+        self.assertIsNone(ResamplingCache(self.cache_dir).load(key))
+        with open(x_path, 'wb') as file:
+            file.write(b'\x93NUMPY')
+        other = ResamplingCache(self.cache_dir)
+        other.resample(X, y, 'RandomUnderSampler', 'base_1', 'miami')
+        self.assertEqual(other.misses, 1)
+
+    def test_evict_removes_the_least_recently_used_entries(self):
+        X, y = training_split()
+        cache = ResamplingCache(self.cache_dir, max_age=None)
+        keys = [cache.get_key(X, y, method, 'base_1', 'miami') for method in ['SMOTE', 'ADASYN']]
+        for key in keys:
+            cache.store(key, X.to_numpy(), y.to_numpy())
+        entry_size = sum(os.path.getsize(path) for path in cache.get_paths(keys[0]))
+        old = time.time() - 60
+        for path in cache.get_paths(keys[0]) + cache.get_paths(keys[1]):
+            os.utime(path, (old, old))
+        # A primeira entrada foi lida por último e fica
+        ResamplingCache(self.cache_dir).load(keys[0])
+        cache.max_bytes = entry_size
+        self.assertEqual(cache.evict(), (2, entry_size))
+        self.assertTrue(all(os.path.exists(path) for path in cache.get_paths(keys[0])))
+        self.assertFalse(any(os.path.exists(path) for path in cache.get_paths(keys[1])))
+
+
+class EvictCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.now = time.time()
+        for name, size, age in [('old.bin', 10, 100), ('a/older.bin', 20, 50), ('b.bin', 30, 5), ('c.bin', 40, 1)]:
+            path = os.path.join(self.temp_dir.name, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                file.write(b'x' * size)
+            os.utime(path, (self.now - age, self.now - age))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def remaining(self):
+        return sorted(os.path.relpath(os.path.join(root, name), self.temp_dir.name)
+                      for root, _, names in os.walk(self.temp_dir.name) for name in names)
+
+    def test_age_limit(self):
+        self.assertEqual(evict_cache(self.temp_dir.name, max_age=60, now=self.now), (1, 10))
+        self.assertEqual(self.remaining(), [os.path.join('a', 'older.bin'), 'b.bin', 'c.bin'])
+
+    def test_size_limit_removes_oldest_first(self):
+        self.assertEqual(evict_cache(self.temp_dir.name, max_bytes=75, now=self.now), (2, 30))
+        self.assertEqual(self.remaining(), ['b.bin', 'c.bin'])
+
+    def test_no_limits_keep_everything(self):
+        self.assertEqual(evict_cache(self.temp_dir.name, now=self.now), (0, 0))
+        self.assertEqual(len(self.remaining()), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from src.train.scheduler import TrainingScheduler
+from src.utils.jobs import new_result
+
+TUNING = {'n_trials': 10, 'n_workers': 1, 'storage': None, 'pruner': 'median'}
+
+
+class SchedulerManifestTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_path = os.path.join(self.temp_dir.name, 'data')
+        os.makedirs(os.path.join(self.data_path, 'gold', 'base_1'))
+        self.gold_path = os.path.join(self.data_path, 'gold', 'base_1', 'miami_1973_2024.parquet')
+        with open(self.gold_path, 'wb') as file:
+            file.write(b'gold rows')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def scheduler(self, tuning=TUNING, cv=None):
+        return TrainingScheduler(self.data_path, jobs_path=os.path.join(self.temp_dir.name, 'jobs'),
+                                 manifest_path=os.path.join(self.temp_dir.name, 'manifest.json'),
+                                 cache_dir=os.path.join(self.temp_dir.name, 'cache'), tuning=tuning, cv=cv)
+
+    def job(self, scheduler):
+        with contextlib.redirect_stdout(io.StringIO()):
+            jobs = scheduler.plan_jobs(bases=['base_1'], cities=['miami'], methods=['SMOTE'], models=['decision_tree'])
+        self.assertEqual(len(jobs), 1)
+        return jobs[0]
+
+    def finish(self, scheduler):
+        job = self.job(scheduler)
+        scheduler.record_job(job, new_result(id=job['id']))
+        return job
+
+    def test_finished_job_is_skipped_until_the_settings_change(self):
+        self.finish(self.scheduler())
+        self.assertTrue(self.scheduler().is_finished(self.job(self.scheduler())))
+        # Recursos de execução não mudam o resultado
+        resources = self.scheduler(dict(TUNING, n_workers=4))
+        self.assertTrue(resources.is_finished(self.job(resources)))
+        for tuning in [dict(TUNING, n_trials=50), dict(TUNING, pruner='hyperband'), dict(TUNING, validation_size=0.3)]:
+            scheduler = self.scheduler(tuning)
+            self.assertFalse(scheduler.is_finished(self.job(scheduler)), tuning)
+
+    def test_cross_validation_settings_are_part_of_the_job(self):
+        cv = {'mode': 'walk_forward', 'n_splits': 5, 'gap': 7}
+        self.finish(self.scheduler(cv=cv))
+        for other in [dict(cv, n_splits=3), dict(cv, gap=0)]:
+            scheduler = self.scheduler(cv=other)
+            self.assertFalse(scheduler.is_finished(self.job(scheduler)), other)
+        self.assertTrue(self.scheduler(cv=dict(cv)).is_finished(self.job(self.scheduler(cv=dict(cv)))))
+
+    def test_changed_gold_file_invalidates_the_job(self):
+        self.finish(self.scheduler())
+        with open(self.gold_path, 'ab') as file:
+            file.write(b' and more rows')
+        self.assertFalse(self.scheduler().is_finished(self.job(self.scheduler())))
+
+    def test_failed_jobs_are_not_recorded(self):
+        scheduler = self.scheduler()
+        job = self.job(scheduler)
+        scheduler.record_job(job, new_result('error', id=job['id']))
+        self.assertFalse(scheduler.is_finished(job))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+
+import mlflow.sklearn
+import numpy as np
+import pandas as pd
+
+from src.train.decision_tree import DecisionTreeFamily
+from src.train.preprocessing import Preprocessor
+from src.train.scoring import Scorer, plan_jobs
+
+
+def gold_frame(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2000-01-01', periods=n_rows, freq='D')
+    temp = rng.normal(20, 5, n_rows)
+    return pd.DataFrame({'date': dates, 'temp': temp, 'prcp': rng.gamma(1, 2, n_rows),
+                         'season': np.where(dates.month < 4, 'Inverno', 'Primavera'),
+                         'disaster_occurred': (temp > 25).astype(int)})
+
+
+class ScoringTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Modelo gravado uma vez, como o baixado de uma run do MLflow
+        cls.model_dir = tempfile.TemporaryDirectory()
+        df = gold_frame(200)
+        cls.preprocessor = Preprocessor().fit(df)
+        cls.model = DecisionTreeFamily().create_estimator({'max_depth': 3}).fit(
+            cls.preprocessor.transform_frame(df), df['disaster_occurred'])
+        cls.model_path = os.path.join(cls.model_dir.name, 'decision_tree_model')
+        mlflow.sklearn.save_model(cls.model, cls.model_path)
+        cls.preprocessor_path = os.path.join(cls.model_dir.name, 'preprocessor.joblib')
+        cls.preprocessor.save(cls.preprocessor_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.model_dir.cleanup()
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.gold_path = os.path.join(self.temp_dir.name, 'gold', 'base_1', 'miami_1973_2024.parquet')
+        os.makedirs(os.path.dirname(self.gold_path))
+        self.gold = gold_frame(250, seed=3)
+        self.gold.to_parquet(self.gold_path, row_group_size=40)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_batches_give_the_probabilities_of_the_whole_file(self):
+        scorer = Scorer('decision_tree', self.model_path, self.preprocessor_path, n_jobs=1)
+        output_path = os.path.join(self.temp_dir.name, 'predictions', 'base_1', 'miami.parquet')
+        self.assertEqual(scorer.score_file(self.gold_path, output_path, 'base_1', 'miami', batch_size=32), 250)
+        scored = pd.read_parquet(output_path)
+        expected = self.model.predict_proba(self.preprocessor.transform_frame(self.gold))[:, 1]
+        np.testing.assert_allclose(scored['disaster_probability'], expected, rtol=1e-6)
+        self.assertEqual(scored['date'].tolist(), self.gold['date'].tolist())
+        self.assertEqual(set(scored['city']), {'miami'})
+        self.assertEqual(os.listdir(os.path.dirname(output_path)), ['miami.parquet'])
+
+    def test_missing_feature_columns_are_reported(self):
+        scorer = Scorer('decision_tree', self.model_path, self.preprocessor_path)
+        self.gold.drop(columns='temp').to_parquet(self.gold_path)
+        with self.assertRaises(ValueError):
+            scorer.score_file(self.gold_path, os.path.join(self.temp_dir.name, 'out.parquet'), 'base_1', 'miami')
+
+    def test_jobs_are_named_after_the_base_and_city(self):
+        jobs = plan_jobs([os.path.dirname(self.gold_path)], 'predictions')
+        self.assertEqual(jobs, [{'input': self.gold_path, 'output': os.path.join('predictions', 'base_1', 'miami.parquet'),
+                                 'base': 'base_1', 'city': 'miami'}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from API.storage import write_partitioned_parquet
+
+
+def daily_frame(start, periods):
+    return pd.DataFrame({'date': pd.date_range(start, periods=periods, freq='D'),
+                         'tavg': [float(i) for i in range(periods)]})
+
+
+class PartitionedParquetTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'miami_daily_1973_2024.parquet')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def read(self):
+        return pd.read_parquet(self.path).sort_values('date').reset_index(drop=True)
+
+    def test_rewrite_replaces_the_years(self):
+        self.assertEqual(write_partitioned_parquet(daily_frame('1999-12-01', 60), self.path), 60)
+        self.assertEqual(sorted(os.listdir(self.path)), ['year=1999', 'year=2000'])
+        write_partitioned_parquet(daily_frame('2001-01-01', 10), self.path)
+        self.assertEqual(sorted(os.listdir(self.path)), ['year=2001'])
+        self.assertEqual(len(self.read()), 10)
+        self.assertEqual(str(self.read()['tavg'].dtype), 'float32')
+        self.assertEqual(sorted(os.listdir(self.temp_dir.name)), ['miami_daily_1973_2024.parquet'])
+
+    def test_failed_swap_keeps_the_old_dataset(self):
+        write_partitioned_parquet(daily_frame('1999-12-01', 60), self.path)
+        replace = os.replace
+
+        def fail_on_new_dataset(source, destination):
+            if source.endswith('.tmp'):
+                raise PermissionError('dataset in use')
+            replace(source, destination)
+
+        with mock.patch('API.storage.os.replace', side_effect=fail_on_new_dataset):
+            with self.assertRaises(PermissionError):
+                write_partitioned_parquet(daily_frame('2001-01-01', 10), self.path)
+        self.assertEqual(len(self.read()), 60)
+
+    def test_interrupted_swap_is_recovered_from_the_backup(self):
+        write_partitioned_parquet(daily_frame('1999-12-01', 60), self.path)
+        # Execução interrompida entre as duas trocas: só o backup existe
+        os.replace(self.path, f'{self.path}.old')
+        write_partitioned_parquet(daily_frame('2001-01-01', 10), self.path)
+        self.assertEqual(len(self.read()), 10)
+        self.assertFalse(os.path.exists(f'{self.path}.old'))
+
+
+if __name__ == '__main__':
+    unittest.main()
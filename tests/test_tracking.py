@@ -0,0 +1,98 @@
+import contextlib
+import io
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+import optuna
+import pandas as pd
+
+from src.train.decision_tree import DecisionTreeFamily
+from src.train.tracking import RunLogger, wait_for_logging
+from src.train.trainer import train
+
+
+class FakeClient:
+    """MlflowClient in memory; log_artifacts fails when fail_uploads is set."""
+    def __init__(self, fail_uploads=False):
+        self.fail_uploads = fail_uploads
+        self.batches = []
+        self.artifacts = []
+        self.status = None
+
+    def get_experiment_by_name(self, name):
+        return SimpleNamespace(experiment_id='1')
+
+    def create_run(self, experiment_id, run_name=None):
+        return SimpleNamespace(info=SimpleNamespace(run_id='run'))
+
+    def log_batch(self, run_id, metrics=(), params=()):
+        self.batches.append((list(metrics), list(params)))
+
+    def log_artifact(self, run_id, path, artifact_path=None):
+        self.log_artifacts(run_id, path, artifact_path)
+
+    def log_artifacts(self, run_id, path, artifact_path=None):
+        if self.fail_uploads:
+            raise OSError('artifact store unavailable')
+        self.artifacts.append(artifact_path)
+
+    def set_terminated(self, run_id, status):
+        self.status = status
+
+
+def training_split(n_rows=80, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({'temp': rng.normal(size=n_rows), 'rain': rng.normal(size=n_rows)})
+    y = pd.Series((X['rain'] > 0.5).astype(int), name='disaster_occurred')
+    return X, y
+
+
+class RunLoggerTest(unittest.TestCase):
+    def test_wait_reports_failed_background_tasks(self):
+        client = FakeClient(fail_uploads=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            with RunLogger('DataBase_base_1', 'run', client) as run:
+                run.log_params({'base': 'base_1'})
+                run.submit(client.log_artifacts, 'run', 'path', 'plots')
+            self.assertFalse(run.wait())
+        self.assertEqual(client.status, 'FAILED')
+        self.assertEqual(len(client.batches), 1)
+
+    def test_wait_after_a_logged_run(self):
+        client = FakeClient()
+        with RunLogger('DataBase_base_1', 'run', client) as run:
+            run.submit(client.log_artifacts, 'run', 'path', 'plots')
+        self.assertTrue(run.wait())
+        self.assertEqual((client.status, client.artifacts), ('FINISHED', ['plots']))
+
+
+class TrainLoggingTest(unittest.TestCase):
+    def setUp(self):
+        optuna.logging.set_verbosity(optuna.logging.WARNING)
+
+    def train(self, client, wait):
+        X, y = training_split()
+        X_test, y_test = training_split(seed=1)
+        with mock.patch('src.train.tracking.MlflowClient', return_value=client), \
+                contextlib.redirect_stdout(io.StringIO()):
+            trained = train(DecisionTreeFamily.name, X, y, X_test, y_test, y.name, 'base_1', 'miami', n_trials=2,
+                            pruner=None, n_jobs=1, wait=wait)
+            wait_for_logging()
+        return trained
+
+    def test_train_fails_when_the_model_upload_fails(self):
+        client = FakeClient(fail_uploads=True)
+        self.assertFalse(self.train(client, wait=True))
+        self.assertEqual(client.status, 'FAILED')
+
+    def test_train_waits_for_the_end_of_the_run(self):
+        client = FakeClient()
+        self.assertTrue(self.train(client, wait=True))
+        self.assertEqual(client.status, 'FINISHED')
+        self.assertIn('decision_tree_model', client.artifacts)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import optuna
+import pandas as pd
+
+from src.train.decision_tree import DecisionTreeFamily
+from src.train.trainer import MODEL_FAMILIES, ModelFamily, fit_model, register_family
+from src.train.tuning import get_storage, count_finished_trials
+
+
+def training_split(n_rows=120, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({'temp': rng.normal(size=n_rows), 'rain': rng.normal(size=n_rows)})
+    y = pd.Series((X['rain'] + rng.normal(scale=0.5, size=n_rows) > 0.8).astype(int), name='disaster_occurred')
+    return X, y
+
+
+class StudyResumeTest(unittest.TestCase):
+    def setUp(self):
+        optuna.logging.set_verbosity(optuna.logging.WARNING)
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.storage = os.path.join(self.temp_dir.name, 'studies.log')
+        self.family = DecisionTreeFamily()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def fit(self, X, y, n_trials=3):
+        return fit_model(self.family, X, y, 'decision_tree_base_1_miami_None', 'base_1', 'miami',
+                         n_trials=n_trials, storage=self.storage, pruner=None)
+
+    def study_names(self):
+        return sorted(study.study_name for study in optuna.get_all_study_summaries(get_storage(self.storage)))
+
+    def test_study_of_an_older_run_is_not_resumed(self):
+        # Estudo antigo, com o mesmo nome base, já concluído com outro espaço de busca
+        stale = optuna.create_study(study_name='decision_tree_base_1_miami_None', storage=get_storage(self.storage),
+                                    direction='maximize')
+        stale.optimize(lambda trial: trial.suggest_int('n_estimators', 100, 1000) and 1.0, n_trials=5)
+        _, study, _ = self.fit(*training_split())
+        self.assertNotEqual(study.study_name, 'decision_tree_base_1_miami_None')
+        self.assertEqual(count_finished_trials(study), 3)
+        self.assertNotIn('n_estimators', study.best_params)
+
+    def test_same_data_resumes_and_new_data_starts_a_new_study(self):
+        X, y = training_split()
+        _, first, _ = self.fit(X, y)
+        _, resumed, _ = self.fit(X, y, n_trials=4)
+        self.assertEqual(resumed.study_name, first.study_name)
+        self.assertEqual(count_finished_trials(resumed), 4)
+        _, other, _ = self.fit(*training_split(seed=1))
+        self.assertNotEqual(other.study_name, first.study_name)
+        self.assertEqual(len(self.study_names()), 2)
+
+
+class FamilyRegistrationTest(unittest.TestCase):
+    def test_family_without_a_hook_fails_at_registration(self):
+        class NoEstimatorFamily(ModelFamily):
+            name = 'no_estimator'
+
+            def search_space(self, trial):
+                return {}
+
+        with self.assertRaises(TypeError):
+            register_family(NoEstimatorFamily())
+        self.assertNotIn('no_estimator', MODEL_FAMILIES)
+
+    def test_invalid_families_are_rejected(self):
+        class UnnamedFamily(DecisionTreeFamily):
+            name = None
+
+        with self.assertRaises(ValueError):
+            register_family(UnnamedFamily())
+        with self.assertRaises(TypeError):
+            register_family(object())
+
+    def test_registered_families_build_estimators(self):
+        import src.train.lightgbm_model  # noqa: F401
+        import src.train.xgboost_model  # noqa: F401
+        X, y = training_split()
+        for name in ['decision_tree', 'lightgbm', 'xgboost']:
+            family = MODEL_FAMILIES[name]
+            params = optuna.trial.FixedTrial({'max_depth': 3, 'min_samples_split': 2, 'min_samples_leaf': 1,
+                                              'max_features': None, 'num_leaves': 20, 'learning_rate': 0.1,
+                                              'min_gain_to_split': 0.0, 'subsample': 0.8,
+                                              'colsample_bytree': 0.8})
+            estimator = family.create_estimator(family.search_space(params), n_jobs=1)
+            self.assertEqual(estimator.fit(X, y).predict_proba(X).shape, (len(X), 2), name)
+
+
+class EarlyStoppingTest(unittest.TestCase):
+    def test_boosting_families_train_without_early_stopping(self):
+        import src.train.lightgbm_model  # noqa: F401
+        import src.train.xgboost_model  # noqa: F401
+        from src.train.tuning import MAX_ROUNDS
+        optuna.logging.set_verbosity(optuna.logging.WARNING)
+        X, y = training_split()
+        X_val, y_val = training_split(seed=1)
+        params = {'lightgbm': {'num_leaves': 20, 'max_depth': 3, 'learning_rate': 0.1, 'min_gain_to_split': 0.0},
+                  'xgboost': {'max_depth': 3, 'learning_rate': 0.1, 'subsample': 0.8, 'colsample_bytree': 0.8}}
+        for name in ['lightgbm', 'xgboost']:
+            family = MODEL_FAMILIES[name]
+            data = family.build_data(X, y, X_val, y_val, n_jobs=1)
+            trial = optuna.create_study(direction='maximize', pruner=optuna.pruners.NopPruner()).ask()
+            proba, best_iteration = family.fit_trial(trial, family.search_space(optuna.trial.FixedTrial(params[name])),
+                                                     data, n_jobs=1, early_stopping_rounds=None)
+            self.assertEqual(proba.shape, (len(X_val),), name)
+            self.assertIsNone(best_iteration, name)
+            _, stopped_at = family.fit_trial(trial, family.search_space(optuna.trial.FixedTrial(params[name])),
+                                             data, n_jobs=1, early_stopping_rounds=5)
+            self.assertLess(stopped_at, MAX_ROUNDS, name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import os
+import tempfile
+import time
+import unittest
+
+import optuna
+
+from src.train.tuning import optimize, split_trials
+
+
+def slow_objective(trial):
+    x = trial.suggest_float('x', -1.0, 1.0)
+    time.sleep(0.05)
+    return -x * x
+
+
+class OptimizeBudgetTest(unittest.TestCase):
+    def setUp(self):
+        optuna.logging.set_verbosity(optuna.logging.WARNING)
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.storage = os.path.join(self.temp_dir.name, 'studies.log')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_split_trials(self):
+        self.assertEqual(split_trials(10, 4), [3, 3, 2, 2])
+        self.assertEqual(split_trials(2, 2), [1, 1])
+        self.assertEqual(sum(split_trials(7, 3)), 7)
+
+    def test_parallel_workers_run_exactly_n_trials(self):
+        study = optimize('budget', slow_objective, n_trials=5, n_workers=4, storage=self.storage, pruner=None)
+        self.assertEqual(len(study.trials), 5)
+        # Estudo retomado completa só o que falta
+        study = optimize('budget', slow_objective, n_trials=7, n_workers=4, storage=self.storage, pruner=None)
+        self.assertEqual(len(study.trials), 7)
+
+    def test_in_memory_threads_run_exactly_n_trials(self):
+        study = optimize('budget', slow_objective, n_trials=5, n_workers=3, storage=None, pruner=None)
+        self.assertEqual(len(study.trials), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from API.windows import split_date_range, stitch, WindowCheckpoint
+
+STATION = {'station': '72202'}
+
+
+class SplitDateRangeTest(unittest.TestCase):
+    def test_windows_cover_the_range_aligned_to_years(self):
+        windows = split_date_range('1973-03-15', '1984-06-30', window_years=5)
+        self.assertEqual(windows, [
+            (pd.Timestamp('1973-03-15'), pd.Timestamp('1977-12-31')),
+            (pd.Timestamp('1978-01-01'), pd.Timestamp('1982-12-31')),
+            (pd.Timestamp('1983-01-01'), pd.Timestamp('1984-06-30')),
+        ])
+        # Sem buracos nem sobreposição entre janelas
+        for (_, end), (start, _) in zip(windows, windows[1:]):
+            self.assertEqual(start - end, pd.Timedelta(days=1))
+
+    def test_single_day_and_empty_ranges(self):
+        self.assertEqual(split_date_range('2000-01-01', '2000-01-01'),
+                         [(pd.Timestamp('2000-01-01'), pd.Timestamp('2000-01-01'))])
+        self.assertEqual(split_date_range('2000-01-02', '2000-01-01'), [])
+
+
+class StitchTest(unittest.TestCase):
+    def test_windows_are_concatenated_keeping_the_last_copy(self):
+        first = pd.DataFrame({'date': pd.to_datetime(['2000-12-30', '2000-12-31']), 'tavg': [1.0, 2.0]})
+        second = pd.DataFrame({'date': pd.to_datetime(['2000-12-31', '2001-01-01']), 'tavg': [3.0, 4.0]})
+        stitched = stitch([first, second], 'date')
+        self.assertEqual(stitched['date'].tolist(), pd.to_datetime(['2000-12-30', '2000-12-31', '2001-01-01']).tolist())
+        self.assertEqual(stitched['tavg'].tolist(), [1.0, 3.0, 4.0])
+
+    def test_dates_in_the_index(self):
+        first = pd.DataFrame({'tavg': [1.0, 2.0]}, index=pd.to_datetime(['2000-01-01', '2000-01-02']))
+        second = pd.DataFrame({'tavg': [5.0]}, index=pd.to_datetime(['2000-01-02']))
+        self.assertEqual(stitch([first, second])['tavg'].tolist(), [1.0, 5.0])
+
+
+class WindowCheckpointTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.checkpoint = WindowCheckpoint(self.temp_dir.name, lag_days=7)
+        self.window = (pd.Timestamp('2000-01-01'), pd.Timestamp('2004-12-31'))
+        self.df = pd.DataFrame({'tavg': [1.0, 2.0]})
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_path_depends_on_the_request_params(self):
+        path = self.checkpoint.path('miami', 'daily', self.window, STATION)
+        self.assertEqual(path, self.checkpoint.path('miami', 'daily', self.window, {'station': '72202'}))
+        self.assertNotEqual(path, self.checkpoint.path('miami', 'daily', self.window, {'station': '72203'}))
+        self.assertNotEqual(path, self.checkpoint.path('miami', 'hourly', self.window, STATION))
+        coordinates = {'coordinates': (25.76, -80.19), 'timezone': 'America/Sao_Paulo', 'daily': ('rain_sum',)}
+        self.assertNotEqual(self.checkpoint.path('miami', 'daily', self.window, coordinates),
+                            self.checkpoint.path('miami', 'daily', self.window,
+                                                 dict(coordinates, timezone='America/New_York')))
+
+    def test_saved_window_is_only_loaded_with_the_same_params(self):
+        self.checkpoint.save('miami', 'daily', self.window, STATION, self.df)
+        pd.testing.assert_frame_equal(self.checkpoint.load('miami', 'daily', self.window, STATION), self.df)
+        self.assertIsNone(self.checkpoint.load('miami', 'daily', self.window, {'station': '72203'}))
+        self.assertFalse(any(name.endswith('.tmp') for _, _, names in os.walk(self.temp_dir.name) for name in names))
+
+    def test_windows_within_the_lag_are_not_final(self):
+        today = pd.Timestamp('2005-01-05')
+        self.assertFalse(self.checkpoint.is_final(self.window, today))
+        self.assertTrue(self.checkpoint.is_final(self.window, pd.Timestamp('2005-01-08')))
+        self.assertTrue(WindowCheckpoint(self.temp_dir.name, lag_days=0).is_final(self.window, pd.Timestamp('2005-01-01')))
+        # Janela recente salva é baixada de novo
+        self.checkpoint.save('miami', 'daily', self.window, STATION, self.df)
+        with mock.patch('pandas.Timestamp.today', return_value=today):
+            self.assertIsNone(self.checkpoint.load('miami', 'daily', self.window, STATION))
+
+
+if __name__ == '__main__':
+    unittest.main()